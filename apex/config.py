@@ -58,7 +58,12 @@ class Config:
     apex_image_name: str = "zhuoyli/apex_amd64"
     group_size: int = None
     pool_size: int = None
+    make_pool_size: int = None
+    run_pool_size: int = None
+    task_cache_dir: str = None
     upload_python_packages: list = field(default_factory=list)
+    upload_mode: str = "full"
+    download_workers: int = 4
     exclude_upload_files: list = field(default_factory=list)
     lammps_image_name: str = None
     lammps_run_command: str = None
@@ -17,6 +17,12 @@ from apex.core.calculator.lib.lammps_utils import (
     inter_mace,
     inter_nep
 )
+from apex.core.lib.model_store import link_model, model_store_root, store_model
+from apex.core.reproduce import (
+    REPRO_TRAJECTORY_DUMP,
+    reprod_trajectory_requested,
+    write_repro_frames,
+)
 from .Task import Task
 from dflow.python import upload_packages
 from . import LAMMPS_INTER_TYPE
@@ -136,10 +142,16 @@ class Lammps(Task):
         self.inter_type = inter_parameter["type"]
         self.type_map = inter_parameter["type_map"]
         self.in_lammps = inter_parameter.get("in_lammps", "auto")
+        # "all" keeps every dumped frame in the result, "last" reads only the final one
+        self.dump_frames = inter_parameter.get("dump_frames", "all")
         if self.inter_type in MULTI_MODELS_INTER_TYPE:
             self.model = list(map(os.path.abspath, inter_parameter["model"]))
         else:
             self.model = os.path.abspath(inter_parameter["model"])
+        # models are deduplicated in a store next to them, independent of the cwd
+        first_model = self.model[0] if isinstance(self.model, list) else self.model
+        self.model_store = model_store_root(first_model)
+        self.model_link = inter_parameter.get("model_link", "symlink")
         self.path_to_poscar = path_to_poscar
         assert self.inter_type in LAMMPS_INTER_TYPE
         self.set_inter_type_func()
@@ -213,28 +225,25 @@ class Lammps(Task):
             os.chdir(old_dir)
 
     def symlink_force(self, target, link_name):
-        if os.path.islink(link_name) or os.path.exists(link_name):
-            os.remove(link_name)
-        os.symlink(target, link_name)
+        # replace atomically, tasks generated in parallel share the conf-level links
+        tmp_link = "%s.tmp%d" % (link_name, os.getpid())
+        if os.path.islink(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(target, tmp_link)
+        os.replace(tmp_link, link_name)
 
     def make_potential_files(self, output_dir):
         parent_dir = os.path.join(output_dir, "../../")
         if self.inter_type in MULTI_MODELS_INTER_TYPE:
-            model_file = map(os.path.basename, self.model)
             targets = self.model
-            link_names = list(model_file)
         else:
-            model_file = os.path.basename(self.model)
             targets = [self.model]
-            link_names = [model_file]
-
-        with self.change_dir(parent_dir):
-            for target, link_name in zip(targets, link_names):
-                self.symlink_force(os.path.relpath(target), link_name)
+        link_names = list(map(os.path.basename, targets))
+        stored = [store_model(target, self.model_store) for target in targets]
 
-        with self.change_dir(output_dir):
-            for link_name in link_names:
-                self.symlink_force(os.path.join("../../", link_name), link_name)
+        for stored_model, link_name in zip(stored, link_names):
+            link_model(stored_model, os.path.join(parent_dir, link_name), self.model_link)
+            link_model(stored_model, os.path.join(output_dir, link_name), self.model_link)
 
         dumpfn(self.inter, os.path.join(output_dir, "inter.json"), indent = 4)
 
@@ -297,7 +306,16 @@ class Lammps(Task):
                 )
                 maxeval = cal_setting["maxeval"]
 
-            if cal_type == "relaxation":
+            if reprod_trajectory_requested(task_param):
+                fc = lammps_utils.make_lammps_rerun(
+                    "conf.lmp",
+                    self.type_map,
+                    self.inter_func,
+                    self.model_param,
+                    REPRO_TRAJECTORY_DUMP,
+                )
+
+            elif cal_type == "relaxation":
                 relax_pos = cal_setting["relax_pos"]
                 relax_shape = cal_setting["relax_shape"]
                 relax_vol = cal_setting["relax_vol"]
@@ -462,7 +480,10 @@ class Lammps(Task):
             return None
 
         box, coord, vol, energy, force, virial, stress = [], [], [], [], [], [], []
-        dumptime, type_list = self._parse_dump_file(dump_lammps, box, coord, vol, force)
+        # a trajectory rerun needs every frame whatever dump_frames says
+        dumptime, type_list = self._parse_dump_file(
+            dump_lammps, box, coord, vol, force, all_frames=reprod_trajectory_requested(task_param)
+        )
         
         if not self._check_lammps_finished(log_lammps):
             return None
@@ -472,6 +493,16 @@ class Lammps(Task):
         type_map_list = lammps_utils.element_list(self.type_map)
         atom_numbs = self._calculate_atom_numbers(type_list, len(type_map_list))
 
+        if reprod_trajectory_requested(task_param):
+            if len(energy) != len(dumptime):
+                warnings.warn(f"{len(energy)} energies for {len(dumptime)} rerun frames in {output_dir} skip")
+                return None
+            # per-frame results go to the array file, result_task.json keeps the last frame
+            write_repro_frames(output_dir, energy, force, virial, box)
+            box, coord, energy, force, virial, stress = (
+                box[-1:], coord[-1:], energy[-1:], force[-1:], virial[-1:], stress[-1:]
+            )
+
         result_dict = self._prepare_result_dict(atom_numbs, type_map_list, type_list, box, coord, energy, force, virial, stress)
         contcar = os.path.join(output_dir, "CONTCAR")
         dumpfn(result_dict, contcar, indent=4)
@@ -480,134 +511,46 @@ class Lammps(Task):
 
         return result_dict
     
-    def _parse_dump_file(self, dump_lammps, box, coord, vol, force):
-        with open(dump_lammps, "r") as fin:
-            dump = fin.read().split("\n")
+    def _parse_dump_file(self, dump_lammps, box, coord, vol, force, all_frames=False):
+        if not all_frames and self.dump_frames == "last":
+            frames = [lammps_utils.read_last_dump_frame(dump_lammps)]
+        else:
+            frames = lammps_utils.iter_dump_frames(dump_lammps)
         dumptime = []
-        for idx, ii in enumerate(dump):
-            if ii == "ITEM: TIMESTEP":
-                box.append([])
-                coord.append([])
-                force.append([])
-                dumptime.append(int(dump[idx + 1]))
-                natom = int(dump[idx + 3])
-                xlo_bound = float(dump[idx + 5].split()[0])
-                xhi_bound = float(dump[idx + 5].split()[1])
-                xy = float(dump[idx + 5].split()[2])
-                ylo_bound = float(dump[idx + 6].split()[0])
-                yhi_bound = float(dump[idx + 6].split()[1])
-                xz = float(dump[idx + 6].split()[2])
-                zlo = float(dump[idx + 7].split()[0])
-                zhi = float(dump[idx + 7].split()[1])
-                yz = float(dump[idx + 7].split()[2])
-                xx = (
-                    xhi_bound
-                    - max([0, xy, xz, xy + xz])
-                    - (xlo_bound - min([0, xy, xz, xy + xz]))
-                )
-                yy = yhi_bound - max([0, yz]) - (ylo_bound - min([0, yz]))
-                zz = zhi - zlo
-                box[-1].append([xx, 0.0, 0.0])
-                box[-1].append([xy, yy, 0.0])
-                box[-1].append([xz, yz, zz])
-                vol.append(xx * yy * zz)
-                type_list = []
-                for jj in range(natom):
-                    type_list.append(int(dump[idx + 9 + jj].split()[1]) - 1)
-                    if "xs ys zs" in dump[idx + 8]:
-                        a_x = (
-                            float(dump[idx + 9 + jj].split()[2]) * xx
-                            + float(dump[idx + 9 + jj].split()[3]) * xy
-                            + float(dump[idx + 9 + jj].split()[4]) * xz
-                        )
-                        a_y = (
-                            float(dump[idx + 9 + jj].split()[3]) * yy
-                            + float(dump[idx + 9 + jj].split()[4]) * yz
-                        )
-                        a_z = float(dump[idx + 9 + jj].split()[4]) * zz
-                    else:
-                        a_x = float(dump[idx + 9 + jj].split()[2])
-                        a_y = float(dump[idx + 9 + jj].split()[3])
-                        a_z = float(dump[idx + 9 + jj].split()[4])
-                    coord[-1].append([a_x, a_y, a_z])
-                    fx = float(dump[idx + 9 + jj].split()[5])
-                    fy = float(dump[idx + 9 + jj].split()[6])
-                    fz = float(dump[idx + 9 + jj].split()[7])
-                    force[-1].append([fx, fy, fz])
-        
+        type_list = []
+        for frame in frames:
+            dumptime.append(frame["timestep"])
+            box.append(frame["cell"].tolist())
+            coord.append(frame["coords"].tolist())
+            force.append(frame["forces"].tolist())
+            vol.append(frame["volume"])
+            type_list = frame["types"].tolist()
+
         return dumptime, type_list
     
     def _check_lammps_finished(self, log_lammps):
-        with open(log_lammps, "r") as fp:
-            if "Total wall time:" not in fp.read():
-                warnings.warn("lammps not finished " + log_lammps + " skip")
-                return False
+        if not lammps_utils.check_finished(log_lammps):
+            warnings.warn("lammps not finished " + log_lammps + " skip")
+            return False
         return True
 
     def _parse_log_file(self, log_lammps, dumptime, energy, stress, virial, vol):
-        with open(log_lammps, "r") as fp:
-            fp.seek(0)
-            lines = fp.read().split("\n")
-            idid = -1
-            for ii in dumptime:
-                idid += 1
-                for jj in lines:
-                    line = jj.split()
-                    if len(line) and str(ii) == line[0]:
-                        try:
-                            [float(kk) for kk in line]
-                        except Exception:
-                            continue
-                        stress.append([])
-                        virial.append([])
-                        energy.append(float(line[1]))
-                        # virials = stress * vol * 1e5 *1e-30 * 1e19/1.6021766208
-                        stress[-1].append(
-                            [
-                                float(line[2]) / 1000.0,
-                                float(line[5]) / 1000.0,
-                                float(line[6]) / 1000.0,
-                            ]
-                        )
-                        stress[-1].append(
-                            [
-                                float(line[5]) / 1000.0,
-                                float(line[3]) / 1000.0,
-                                float(line[7]) / 1000.0,
-                            ]
-                        )
-                        stress[-1].append(
-                            [
-                                float(line[6]) / 1000.0,
-                                float(line[7]) / 1000.0,
-                                float(line[4]) / 1000.0,
-                            ]
-                        )
-                        stress_to_virial = (
-                            vol[idid] * 1e5 * 1e-30 * 1e19 / 1.6021766208
-                        )
-                        virial[-1].append(
-                            [
-                                float(line[2]) * stress_to_virial,
-                                float(line[5]) * stress_to_virial,
-                                float(line[6]) * stress_to_virial,
-                            ]
-                        )
-                        virial[-1].append(
-                            [
-                                float(line[5]) * stress_to_virial,
-                                float(line[3]) * stress_to_virial,
-                                float(line[7]) * stress_to_virial,
-                            ]
-                        )
-                        virial[-1].append(
-                            [
-                                float(line[6]) * stress_to_virial,
-                                float(line[7]) * stress_to_virial,
-                                float(line[4]) * stress_to_virial,
-                            ]
-                        )
-                        break
+        rows = lammps_utils.read_lammps_log(log_lammps)["rows"]
+        for idid, ii in enumerate(dumptime):
+            if ii not in rows:
+                continue
+            line = rows[ii]
+            energy.append(line[1])
+            # virials = stress * vol * 1e5 *1e-30 * 1e19/1.6021766208
+            stress_to_virial = vol[idid] * 1e5 * 1e-30 * 1e19 / 1.6021766208
+            voigt = [line[2], line[3], line[4], line[5], line[6], line[7]]
+            matrix = [
+                [voigt[0], voigt[3], voigt[4]],
+                [voigt[3], voigt[1], voigt[5]],
+                [voigt[4], voigt[5], voigt[2]],
+            ]
+            stress.append([[jj / 1000.0 for jj in kk] for kk in matrix])
+            virial.append([[jj * stress_to_virial for jj in kk] for kk in matrix])
 
     def _calculate_atom_numbers(self, type_list, type_map_length):
         atom_numbs = [0] * type_map_length
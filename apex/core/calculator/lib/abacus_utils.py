@@ -7,6 +7,7 @@ import numpy as np
 from pymatgen.core import Structure
 
 from . import abacus_scf
+from apex.core.lib import util
 from dflow.python import upload_packages
 upload_packages.append(__file__)
 
@@ -393,8 +394,7 @@ def make_kspacing_kpt(struf, kspacing):
 
 
 def check_finished(fname):
-    with open(fname, "r") as fp:
-        return "Total  Time  :" in fp.read()
+    return util.file_contains_marker(fname, "Total  Time  :")
 
 
 def final_stru(abacus_path):
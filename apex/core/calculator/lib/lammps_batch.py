@@ -0,0 +1,188 @@
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from monty.serialization import loadfn
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+# property types whose LAMMPS tasks are short static evaluations or relaxations
+IN_PROCESS_PROPERTY_TYPES = [
+    "eos",
+    "elastic",
+    "vacancy",
+    "interstitial",
+    "surface",
+    "cohesive",
+    "decohesive",
+    "gamma",
+    "gamma_surface",
+]
+
+
+def lammps_module_available() -> bool:
+    try:
+        import lammps  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def in_process_requested(task_param) -> bool:
+    """
+    Whether a property parameter dict asks for in-process LAMMPS evaluation
+    via ``cal_setting.lammps_in_process``.
+    """
+    if not isinstance(task_param, dict):
+        return False
+    if task_param.get("type") not in IN_PROCESS_PROPERTY_TYPES:
+        return False
+    cal_setting = task_param.get("cal_setting", {}) or {}
+    return bool(cal_setting.get("lammps_in_process", False))
+
+
+def task_in_process(task_dir) -> bool:
+    """
+    Whether a prepared task directory should be evaluated in-process.
+    Tasks carrying an injected ``run_command`` file always keep their own command.
+    """
+    if os.path.isfile(os.path.join(task_dir, "run_command")):
+        return False
+    task_json = os.path.join(task_dir, "task.json")
+    if not os.path.isfile(task_json):
+        return False
+    try:
+        task_param = loadfn(task_json)
+    except Exception:
+        return False
+    return in_process_requested(task_param)
+
+
+def _format_wall_time(seconds):
+    seconds = int(seconds)
+    return "%d:%02d:%02d" % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+class InProcessLammps:
+    """
+    A long-lived LAMMPS instance (``lammps`` Python module) that evaluates the
+    ``in.lammps`` of many task directories one after another.
+
+    Every task writes ``log.lammps`` and its dump files into its own directory,
+    and the log is terminated by a ``Total wall time:`` line as the ``lmp``
+    binary would do, so ``Lammps.compute`` and ``check_finished`` work unchanged.
+    Process startup, library loading and dispatcher bookkeeping are paid once;
+    note that ``clear`` in the input script still re-creates the pair style.
+    """
+
+    def __init__(self, cmdargs=None):
+        from lammps import lammps
+
+        if cmdargs is None:
+            cmdargs = ["-log", "none", "-screen", "none", "-nocite"]
+        self.lmp = lammps(cmdargs=cmdargs)
+
+    def run(self, task_dir, input_file="in.lammps") -> int:
+        cwd = os.getcwd()
+        start = time.time()
+        exit_code = 0
+        os.chdir(task_dir)
+        try:
+            self.lmp.command("clear")
+            self.lmp.command("log log.lammps")
+            self.lmp.file(input_file)
+        except Exception as exc:
+            exit_code = 1
+            logging.warning(f"In-process LAMMPS failed in {task_dir}: {exc}")
+            with open("errlog", "a") as fp:
+                fp.write(f"{exc}\n")
+        finally:
+            try:
+                # close dump files and the task log before leaving the directory
+                self.lmp.command("clear")
+                self.lmp.command("log none")
+            except Exception as exc:
+                exit_code = 1
+                logging.warning(f"Could not reset in-process LAMMPS after {task_dir}: {exc}")
+            if exit_code == 0:
+                with open("log.lammps", "a") as fp:
+                    fp.write("Total wall time: %s\n" % _format_wall_time(time.time() - start))
+            os.chdir(cwd)
+        return exit_code
+
+    def close(self):
+        if self.lmp is not None:
+            self.lmp.close()
+            self.lmp = None
+
+
+_ENGINE = None
+
+
+def get_engine() -> InProcessLammps:
+    """
+    Return the engine shared by all tasks executed in this interpreter,
+    e.g. every slice of a grouped RunLAMMPS step.
+    """
+    global _ENGINE
+    if _ENGINE is None or _ENGINE.lmp is None:
+        _ENGINE = InProcessLammps()
+    return _ENGINE
+
+
+def run_tasks_in_process(work_path, run_tasks) -> list:
+    """
+    Evaluate ``work_path/<task>`` for every task name in ``run_tasks``
+    within one LAMMPS instance and return the exit codes.
+    """
+    engine = get_engine()
+    exit_codes = []
+    for ii in run_tasks:
+        exit_codes.append(engine.run(os.path.join(work_path, ii)))
+    return exit_codes
+
+
+def run_tasks_in_child(work_path, run_tasks) -> list:
+    """
+    ``run_tasks_in_process`` in a child interpreter, so that a LAMMPS library
+    built without exception support, which exits on an input error, cannot
+    take down the caller. The task the child died in is reported failed and
+    the remaining tasks are resumed in a new child.
+    """
+    exit_codes = {}
+    pending = list(run_tasks)
+    while pending:
+        fd, result_file = tempfile.mkstemp(prefix="apex_lammps_", suffix=".txt")
+        os.close(fd)
+        try:
+            subprocess.call([sys.executable, os.path.abspath(__file__), result_file, work_path] + pending)
+            with open(result_file) as fp:
+                for line in fp:
+                    code, name = line.rstrip("\n").split("\t", 1)
+                    exit_codes[name] = int(code)
+        finally:
+            os.remove(result_file)
+        pending = [ii for ii in pending if ii not in exit_codes]
+        if pending:
+            crashed = pending.pop(0)
+            exit_codes[crashed] = 1
+            logging.warning(f"In-process LAMMPS exited in {os.path.join(work_path, crashed)}")
+            with open(os.path.join(work_path, crashed, "errlog"), "a") as fp:
+                fp.write("LAMMPS process exited while running this task\n")
+    return [exit_codes[ii] for ii in run_tasks]
+
+
+def _child_main(result_file, work_path, *run_tasks):
+    engine = get_engine()
+    for ii in run_tasks:
+        code = engine.run(os.path.join(work_path, ii))
+        # one line per task, so the parent knows where a crash happened
+        with open(result_file, "a") as fp:
+            fp.write("%d\t%s\n" % (code, ii))
+
+
+if __name__ == "__main__":
+    _child_main(*sys.argv[1:])
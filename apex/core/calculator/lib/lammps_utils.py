@@ -5,6 +5,7 @@ import os
 import re
 
 import dpdata
+import numpy as np
 from dpdata.periodic_table import Element
 from packaging.version import Version
 
@@ -301,6 +302,72 @@ def make_lammps_eval(conf, type_map, interaction, param):
     return ret
 
 
+def make_lammps_rerun(conf, type_map, interaction, param, dump_file):
+    type_map_list = element_list(type_map)
+
+    """
+    make lammps input that evaluates every frame of dump_file with `rerun`
+    """
+    ret = ""
+    ret += "clear\n"
+    ret += "units 	metal\n"
+    ret += "dimension	3\n"
+    ret += "boundary	p p p\n"
+    ret += "atom_style	atomic\n"
+    if param["type"] == "mace":
+        ret += "atom_modify map yes\n"
+        ret += "newton on\n"
+    ret += "box         tilt large\n"
+    ret += "read_data   %s\n" % conf
+    for ii in range(len(type_map)):
+        ret += "mass            %d %.3f\n" % (ii + 1, Element(type_map_list[ii]).mass)
+    ret += "neigh_modify    every 1 delay 0 check no\n"
+    ret += interaction(param)
+    ret += "compute         mype all pe\n"
+    ret += "thermo          1\n"
+    ret += (
+        "thermo_style    custom step pe pxx pyy pzz pxy pxz pyz lx ly lz vol c_mype\n"
+    )
+    ret += "thermo_modify   format float %.10g\n"
+    ret += "dump            1 all custom 1 dump.relax id type xs ys zs fx fy fz\n"
+    ret += "dump_modify     1 sort id\n"
+    ret += "rerun           %s dump x y z box yes\n" % dump_file
+    ret += 'print "All done"\n'
+    return ret
+
+
+def write_rerun_dump(system, frame_indices, dump_file, type_map):
+    """
+    Write frames of a dpdata system to a lammps dump read by `rerun`, frame
+    ii at timestep ii. Cells are rotated to the lammps lower-triangular form
+    and atoms keep the type-sorted order of the POSCAR written from the system.
+    """
+    type_map_list = element_list(type_map)
+    atom_types = np.asarray(system["atom_types"])
+    order = np.lexsort((np.arange(len(atom_types)), atom_types))
+    lmp_types = [type_map_list.index(system["atom_names"][tt]) + 1 for tt in atom_types[order]]
+    with open(dump_file, "w") as fp:
+        for step, idx in enumerate(frame_indices):
+            qq, rr = np.linalg.qr(np.asarray(system["cells"][idx]).T)
+            sign = np.sign(np.diag(rr))
+            sign[sign == 0] = 1
+            cell = (rr * sign[:, None]).T
+            coords = np.asarray(system["coords"][idx])[order] @ (qq * sign[None, :])
+            xx, yy, zz = cell[0, 0], cell[1, 1], cell[2, 2]
+            xy, xz, yz = cell[1, 0], cell[2, 0], cell[2, 1]
+            fp.write("ITEM: TIMESTEP\n%d\n" % step)
+            fp.write("ITEM: NUMBER OF ATOMS\n%d\n" % len(lmp_types))
+            fp.write("ITEM: BOX BOUNDS xy xz yz pp pp pp\n")
+            fp.write("%.16e %.16e %.16e\n" % (min(0, xy, xz, xy + xz), xx + max(0, xy, xz, xy + xz), xy))
+            fp.write("%.16e %.16e %.16e\n" % (min(0, yz), yy + max(0, yz), xz))
+            fp.write("%.16e %.16e %.16e\n" % (0, zz, yz))
+            fp.write("ITEM: ATOMS id type x y z\n")
+            fp.write("".join(
+                "%d %d %.16e %.16e %.16e\n" % (ii + 1, tt, *xyz)
+                for ii, (tt, xyz) in enumerate(zip(lmp_types, coords))
+            ))
+
+
 def make_lammps_equi(
     conf,
     type_map,
@@ -912,83 +979,231 @@ def make_lammps_phonon(
     return ret
 """
 
-def _get_epa(lines):
-    for ii in lines:
-        if ("Final energy per atoms" in ii) and (not "print" in ii):
-            return float(ii.split("=")[1].split()[0])
-    raise RuntimeError(
-        'cannot find key "Final energy per atoms" in lines, something wrong'
-    )
-
+_LOG_PRINT_KEYS = ("Final ", "Total number of atoms")
 
-def _get_vpa(lines):
-    for ii in lines:
-        if ("Final volume per atoms" in ii) and (not "print" in ii):
-            return float(ii.split("=")[1].split()[0])
-    raise RuntimeError(
-        'cannot find key "Final volume per atoms" in lines, something wrong'
-    )
 
-
-def _get_natoms(lines):
-    for ii in lines:
-        if ("Total number of atoms" in ii) and (not "print" in ii):
-            return int(ii.split("=")[1].split()[0])
-    raise RuntimeError(
-        'cannot find key "Total number of atoms" in lines, something wrong'
-    )
+def _parse_lammps_log(log):
+    thermo = []
+    rows = {}
+    final = {}
+    columns = None
+    block = []
+    with open(log, "r") as fp:
+        for line in fp:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] == "Step":
+                if columns is not None:
+                    thermo.append({"columns": columns, "data": np.array(block)})
+                columns, block = words, []
+                continue
+            if words[0] == "Loop" and columns is not None:
+                thermo.append({"columns": columns, "data": np.array(block)})
+                columns, block = None, []
+                continue
+            if line.startswith(_LOG_PRINT_KEYS) and "=" in line and "print" not in line:
+                key, value = line.split("=", 1)
+                final.setdefault(key.strip(), []).append(value.split())
+                continue
+            if not (words[0].isdigit() and len(words) > 1):
+                continue
+            try:
+                values = [float(jj) for jj in words]
+            except ValueError:
+                continue
+            rows.setdefault(int(words[0]), values)
+            if columns is not None and len(values) == len(columns):
+                block.append(values)
+    if columns is not None:
+        thermo.append({"columns": columns, "data": np.array(block)})
+    return {"thermo": thermo, "rows": rows, "final": final}
+
+
+_LOG_CACHE = {}
+
+
+def read_lammps_log(log):
+    """
+    read a lammps log in a single pass, indexing
+    thermo: list of thermo blocks, each {"columns": header, "data": 2D array}
+    rows: numeric thermo row by step (first occurrence of each step)
+    final: printed "Final xxx = ..." values by key, in order of appearance
+    The parsed log is cached on (path, mtime, size) so that get_nev, get_stress
+    and get_base_area read each log only once.
+    """
+    st = os.stat(log)
+    key = os.path.abspath(log)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _LOG_CACHE.get(key)
+    if cached is None or cached[0] != stamp:
+        if len(_LOG_CACHE) >= 64:
+            _LOG_CACHE.clear()
+        cached = (stamp, _parse_lammps_log(log))
+        _LOG_CACHE[key] = cached
+    return cached[1]
+
+
+def get_thermo(log, steps=None):
+    """
+    per-step thermo data of a lammps log written with
+    "thermo_style custom step pe pxx pyy pzz pxy pxz pyz lx ly lz ..."
+    for the given steps (default all), steps missing in the log are dropped.
+    Returns numpy arrays step, energy, stress (3x3, kBar) and box (lx ly lz)
+    """
+    rows = read_lammps_log(log)["rows"]
+    if steps is None:
+        steps = sorted(rows)
+    steps = [ii for ii in steps if ii in rows]
+    data = np.array([rows[ii][:11] for ii in steps]).reshape(len(steps), -1)
+    voigt = data[:, 2:8] / 1000.0
+    stress = voigt[:, [0, 3, 4, 3, 1, 5, 4, 5, 2]].reshape(-1, 3, 3)
+    box = data[:, 8:11] if data.shape[1] >= 11 else np.zeros((len(steps), 0))
+    return {
+        "step": np.array(steps, dtype=int),
+        "energy": data[:, 1],
+        "stress": stress,
+        "box": box,
+    }
+
+
+def _get_final(log, key, first=True):
+    values = read_lammps_log(log)["final"].get(key)
+    if not values:
+        return None
+    return values[0] if first else values[-1]
 
 
 def get_nev(log):
     """
     get natoms, energy_per_atom and volume_per_atom from lammps log
     """
-    with open(log, "r") as fp:
-        lines = fp.read().split("\n")
-    epa = _get_epa(lines)
-    vpa = _get_vpa(lines)
-    natoms = _get_natoms(lines)
-    return natoms, epa, vpa
+    ret = []
+    for key in ["Total number of atoms", "Final energy per atoms", "Final volume per atoms"]:
+        value = _get_final(log, key)
+        if value is None:
+            raise RuntimeError(
+                'cannot find key "%s" in lines, something wrong' % key
+            )
+        ret.append(value[0])
+    natoms, epa, vpa = ret
+    return int(natoms), float(epa), float(vpa)
 
 
 def get_base_area(log):
     """
     get base area
     """
-    with open(log, "r") as fp:
-        lines = fp.read().split("\n")
-    for ii in lines:
-        if ("Final Base area" in ii) and (not "print" in ii):
-            return float(ii.split("=")[1].split()[0])
+    value = _get_final(log, "Final Base area")
+    if value is not None:
+        return float(value[0])
 
 
 def get_stress(log):
     """
     get stress from lammps log
     """
-    with open(log, "r") as fp:
-        lines = fp.read().split("\n")
-    for ii in lines:
-        if ("Final Stress" in ii) and (not "print" in ii):
-            vstress = [float(jj) for jj in ii.split("=")[1].split()]
+    vstress = [float(jj) for jj in _get_final(log, "Final Stress (xx yy zz xy xz yz)", first=False)]
     stress = util.voigt_to_stress(vstress)
     return stress
 
 
+DUMP_FRAME_MARKER = b"ITEM: TIMESTEP"
+
+
+def _read_dump_frame(fp):
+    """
+    read one dump frame from fp positioned right after "ITEM: TIMESTEP"
+    """
+    timestep = int(fp.readline())
+    fp.readline()  # ITEM: NUMBER OF ATOMS
+    natoms = int(fp.readline())
+    fp.readline()  # ITEM: BOX BOUNDS ...
+    bounds = np.zeros((3, 3))
+    for ii in range(3):
+        words = fp.readline().split()
+        bounds[ii, :len(words)] = [float(jj) for jj in words]
+    columns = fp.readline().decode().split()[2:]
+    block = b"".join(fp.readline() for _ in range(natoms))
+    atoms = np.fromstring(block, sep=" ").reshape(natoms, len(columns))
+
+    xlo_bound, xhi_bound, xy = bounds[0]
+    ylo_bound, yhi_bound, xz = bounds[1]
+    zlo, zhi, yz = bounds[2]
+    xx = (
+        xhi_bound
+        - max([0, xy, xz, xy + xz])
+        - (xlo_bound - min([0, xy, xz, xy + xz]))
+    )
+    yy = yhi_bound - max([0, yz]) - (ylo_bound - min([0, yz]))
+    zz = zhi - zlo
+    cell = np.array([[xx, 0.0, 0.0], [xy, yy, 0.0], [xz, yz, zz]])
+
+    def _col(names, default):
+        for name in names:
+            if name in columns:
+                return atoms[:, columns.index(name)]
+        return atoms[:, default]
+
+    if "xs" in columns:
+        xs, ys, zs = _col(["xs"], 2), _col(["ys"], 3), _col(["zs"], 4)
+        coords = np.stack(
+            [xs * xx + ys * xy + zs * xz, ys * yy + zs * yz, zs * zz], axis=1
+        )
+    else:
+        coords = np.stack(
+            [_col(["x", "xu"], 2), _col(["y", "yu"], 3), _col(["z", "zu"], 4)], axis=1
+        )
+    forces = np.stack([_col(["fx"], 5), _col(["fy"], 6), _col(["fz"], 7)], axis=1)
+    return {
+        "timestep": timestep,
+        "natoms": natoms,
+        "cell": cell,
+        "volume": xx * yy * zz,
+        "types": _col(["type"], 1).astype(int) - 1,
+        "coords": coords,
+        "forces": forces,
+    }
+
+
+def iter_dump_frames(dump):
+    """
+    iterate over the frames of a lammps dump (custom style with box bounds),
+    holding a single frame in memory at a time.
+    Each frame is a dict of timestep, natoms, cell, volume and numpy arrays
+    of 0-based types, cartesian coords and forces.
+    """
+    with open(dump, "rb") as fp:
+        for line in iter(fp.readline, b""):
+            if line.startswith(DUMP_FRAME_MARKER):
+                yield _read_dump_frame(fp)
+
+
+def read_last_dump_frame(dump):
+    """
+    read only the last frame of a lammps dump by seeking to its last timestep
+    """
+    with open(dump, "rb") as fp:
+        offset = util.rfind_in_file(fp, DUMP_FRAME_MARKER, block_size=1 << 20)
+        if offset == -1:
+            raise RuntimeError("cannot find timestep in lammps dump, something wrong")
+        fp.seek(offset)
+        fp.readline()
+        return _read_dump_frame(fp)
+
+
 def poscar_from_last_dump(dump, poscar_out, deepmd_type_map):
     """
     get poscar from the last frame of a lammps MD traj (dump format)
     """
-    with open(dump, "r") as fp:
-        lines = fp.read().split("\n")
-    step_idx = -1
-    for idx, ii in enumerate(lines):
-        if "ITEM: TIMESTEP" in ii:
-            step_idx = idx
-    if step_idx == -1:
-        raise RuntimeError("cannot find timestep in lammps dump, something wrong")
-    with open("tmp_dump", "w") as fp:
-        fp.write("\n".join(lines[step_idx:]))
+    with open(dump, "rb") as fp:
+        step_idx = util.rfind_in_file(fp, DUMP_FRAME_MARKER, block_size=1 << 20)
+        if step_idx == -1:
+            raise RuntimeError("cannot find timestep in lammps dump, something wrong")
+        fp.seek(step_idx)
+        last_frame = fp.read()
+    with open("tmp_dump", "wb") as fp:
+        fp.write(last_frame)
     cvt_lammps_conf("tmp_dump", poscar_out, ofmt="vasp")
     os.remove("tmp_dump")
     with open(poscar_out, "r") as fp:
@@ -1010,5 +1225,4 @@ def check_finished_new(fname, keyword):
 
 
 def check_finished(fname):
-    with open(fname, "r") as fp:
-        return "Total wall time:" in fp.read()
+    return util.file_contains_marker(fname, "Total wall time:")
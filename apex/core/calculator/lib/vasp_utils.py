@@ -192,8 +192,7 @@ def get_stress(fname):
 
 
 def check_finished(fname):
-    with open(fname, "r") as fp:
-        return "Elapsed time (sec):" in fp.read()
+    return util.file_contains_marker(fname, "Elapsed time (sec):")
 
 
 def _get_natoms(lines):
@@ -11,6 +11,13 @@ from apex.core.lib import crys
 from apex.core.calculator.calculator import make_calculator
 from apex.core.lib.utils import create_path
 from apex.core.lib.dispatcher import make_submission
+from apex.core.lib.task_cache import (
+    TaskCache,
+    restore_cached_tasks,
+    store_finished_tasks,
+    task_cache_root,
+    task_io_files,
+)
 from apex.core.mpdb import get_structure
 from apex.core.structure import StructureInfo
 from apex.utils import apex_task_succeeded
@@ -172,6 +179,15 @@ def run_equi(confs, inter_param, mdata):
     resources = mdata.get("resources", None)
     command = mdata.get("run_command", None)
     group_size = mdata.get("group_size", 1)
+
+    cache_root = task_cache_root(mdata)
+    cache = TaskCache(cache_root) if cache_root else None
+    if cache is not None:
+        input_files, output_files = task_io_files(virtual_calculator, inter_param["type"])
+        run_tasks, digests = restore_cached_tasks(cache, run_tasks, input_files, inter_param["type"], command)
+        if not run_tasks:
+            print("All relaxation tasks are restored from the task cache")
+            return
     work_path = os.getcwd()
     print("%s --> Runing... " % (work_path))
 
@@ -188,7 +204,11 @@ def run_equi(confs, inter_param, mdata):
         outlog="outlog",
         errlog="errlog",
     )
-    submission.run_submission()
+    try:
+        submission.run_submission()
+    finally:
+        if cache is not None:
+            store_finished_tasks(cache, digests, output_files, inter_param["type"])
 
 
 def post_equi(confs, inter_param):
@@ -21,6 +21,21 @@ from apex.core.property.Annealing import Annealing
 from apex.core.lib.utils import create_path
 from apex.core.lib.util import collect_task
 from apex.core.lib.dispatcher import make_submission
+from apex.core.lib.task_cache import (
+    TaskCache,
+    restore_cached_tasks,
+    store_finished_tasks,
+    task_cache_root,
+    task_io_files,
+)
+from apex.core.calculator import LAMMPS_INTER_TYPE
+from apex.core.reproduce import REPRO_TRAJECTORY_DUMP, reprod_trajectory_requested
+from apex.core.calculator.lib.lammps_batch import (
+    in_process_requested,
+    lammps_module_available,
+    run_tasks_in_child,
+    task_in_process,
+)
 from apex.utils import (
     sepline,
     get_task_type,
@@ -73,7 +88,32 @@ def make_property_instance(parameters, inter_param):
         raise RuntimeError(f"unknown APEX type {prop_type}")
 
 
-def make_property(confs, inter_param, property_list):
+def make_property_worker(path_to_work, path_to_equi, do_refine, prop_param, inter_param_prop):
+    """
+    Generate all task directories of one property of one configuration.
+    """
+    cwd = os.getcwd()
+    try:
+        prop = make_property_instance(prop_param, inter_param_prop)
+        task_list = prop.make_confs(path_to_work, path_to_equi, do_refine)
+
+        for kk in task_list:
+            poscar = os.path.join(kk, "POSCAR")
+            inter = make_calculator(inter_param_prop, poscar)
+            inter.make_potential_files(kk)
+            inter.make_input_file(kk, prop.task_type(), prop.task_param())
+
+        prop.post_process(task_list)  # generate same KPOINTS file for elastic when doing DFT
+    finally:
+        os.chdir(cwd)
+
+
+def make_property(confs, inter_param, property_list, processes=1):
+    """
+    Make property tasks for all configurations.
+    With processes > 1 every (configuration, property) pair is generated in
+    a process pool; the task directories are identical to serial generation.
+    """
     # find all POSCARs and their name like mp-xxx
     # conf_dirs = glob.glob(confs)
     # conf_dirs.sort()
@@ -82,6 +122,7 @@ def make_property(confs, inter_param, property_list):
         conf_dirs.extend(glob.glob(conf))
     conf_dirs = list(set(conf_dirs))
     conf_dirs.sort()
+    jobs = []
     for ii in conf_dirs:
         sepline(ch=ii, screen=True)
         path_to_equi = os.path.join(ii, "relaxation", "relax_task")
@@ -114,17 +155,22 @@ def make_property(confs, inter_param, property_list):
             create_path(path_to_work)
 
             inter_param_prop = jj.get("cal_setting", {}).get("overwrite_interaction", inter_param)
+            jobs.append((path_to_work, path_to_equi, do_refine, jj, inter_param_prop))
 
-            prop = make_property_instance(jj, inter_param_prop)
-            task_list = prop.make_confs(path_to_work, path_to_equi, do_refine)
-
-            for kk in task_list:
-                poscar = os.path.join(kk, "POSCAR")
-                inter = make_calculator(inter_param_prop, poscar)
-                inter.make_potential_files(kk)
-                inter.make_input_file(kk, prop.task_type(), prop.task_param())
-
-            prop.post_process(task_list)  # generate same KPOINTS file for elastic when doing DFT
+    if processes > 1 and len(jobs) > 1:
+        # refine tasks are made from other properties' tasks, so they go last
+        for phase in [[job for job in jobs if not job[2]], [job for job in jobs if job[2]]]:
+            if not phase:
+                continue
+            n_processes = min(processes, len(phase))
+            print("Make property tasks via %d processes" % n_processes)
+            with Pool(processes=n_processes) as pool:
+                multiple_ret = [pool.apply_async(make_property_worker, job) for job in phase]
+                for ret in multiple_ret:
+                    ret.get()
+    else:
+        for job in jobs:
+            make_property_worker(*job)
 
 
 def worker(
@@ -159,6 +205,92 @@ def worker(
     submission.run_submission()
 
 
+def in_process_worker(work_path, all_task):
+    run_tasks = [os.path.basename(ii) for ii in all_task]
+    exit_codes = run_tasks_in_child(work_path, run_tasks)
+    failed = [ii for ii, code in zip(run_tasks, exit_codes) if code != 0]
+    if failed:
+        raise RuntimeError(f"in-process LAMMPS failed for {work_path}: {failed}")
+
+
+# relative cost of one task, used to submit long-running properties first
+TASK_COST_WEIGHT = {
+    "phonon": 5,
+    "gruneisen": 5,
+    "finite_t_latt": 20,
+    "finite_t_elastic": 20,
+    "annealing": 20,
+}
+
+
+# dpdispatcher contexts that run the tasks on this machine
+LOCAL_CONTEXT_TYPES = ("local", "localcontext", "lazylocal", "lazylocalcontext")
+
+
+def machine_runs_locally(mdata) -> bool:
+    """
+    Whether the dispatcher machine of mdata runs tasks on this host (Shell batch in a local context).
+    """
+    machine = mdata.get("machine") or {}
+    context_type = str(machine.get("context_type") or "local").lower()
+    batch_type = str(machine.get("batch_type") or "shell").lower()
+    return context_type in LOCAL_CONTEXT_TYPES and batch_type == "shell"
+
+
+def run_pool_size(mdata, n_jobs):
+    """
+    Number of worker processes shared by all property jobs of one run_property call:
+    ``run_pool_size`` from mdata (-1 for one process per job). By default the CPU
+    count on a local Shell machine, and one process per job for remote or batch
+    machines, whose workers only wait on their submissions.
+    """
+    pool_size = mdata.get("run_pool_size")
+    if not pool_size:
+        pool_size = (os.cpu_count() or 1) if machine_runs_locally(mdata) else -1
+    if pool_size == -1:
+        pool_size = n_jobs
+    return max(1, min(pool_size, n_jobs))
+
+
+def run_scheduled_jobs(jobs, processes):
+    """
+    Run ``(cost, label, func, args)`` jobs in one bounded pool, most expensive first,
+    reporting every completion as it happens. Raise after all jobs have ended
+    if any of them failed.
+    """
+    jobs = sorted(jobs, key=lambda job: job[0], reverse=True)
+    n_jobs = len(jobs)
+    finished = []
+    failed = []
+
+    def on_success(label):
+        def callback(_):
+            finished.append(label)
+            print("[%d/%d] finished %s" % (len(finished) + len(failed), n_jobs, label))
+        return callback
+
+    def on_error(label):
+        def callback(exc):
+            failed.append((label, exc))
+            print("[%d/%d] ERROR in %s: %s" % (len(finished) + len(failed), n_jobs, label, exc))
+        return callback
+
+    print("Submit %d jobs via %d processes" % (n_jobs, processes))
+    pool = Pool(processes=processes)
+    try:
+        for cost, label, func, args in jobs:
+            pool.apply_async(func, args,
+                             callback=on_success(label),
+                             error_callback=on_error(label))
+        pool.close()
+        pool.join()
+    finally:
+        pool.terminate()
+    if failed:
+        raise RuntimeError("Job %s is not successful!" % failed[0][0])
+    print("%d jobs are finished" % n_jobs)
+
+
 def run_property(confs, inter_param, property_list, mdata):
     # find all POSCARs and their name like mp-xxx
     # conf_dirs = glob.glob(confs)
@@ -169,9 +301,12 @@ def run_property(confs, inter_param, property_list, mdata):
     conf_dirs = list(set(conf_dirs))
     conf_dirs.sort()
 
-    task_list = []
-    work_path_list = []
-    multiple_ret = []
+    cache_root = task_cache_root(mdata)
+    cache = TaskCache(cache_root) if cache_root else None
+
+    # collect the jobs of every property first, then run them in one shared pool
+    jobs = []
+    cached_stores = []
     for ii in conf_dirs:
         sepline(ch=ii, screen=True)
         for jj in property_list:
@@ -192,10 +327,8 @@ def run_property(confs, inter_param, property_list, mdata):
                 print(f"Skip running property tasks for {path_to_work} (all apex_task_status.json state=succeeded)")
                 continue
 
-            work_path_list.append(path_to_work)
             tmp_task_list = glob.glob(os.path.join(path_to_work, "task.[0-9]*[0-9]"))
             tmp_task_list.sort()
-            task_list.append(tmp_task_list)
 
             inter_param_prop = jj.get("cal_setting", {}).get("overwrite_interaction", inter_param)
 
@@ -207,6 +340,9 @@ def run_property(confs, inter_param, property_list, mdata):
                 property_type
             )
             backward_files = virtual_calculator.backward_files(property_type)
+            # trajectory reproduce tasks carry the frames to rerun
+            traj_files = [REPRO_TRAJECTORY_DUMP] if reprod_trajectory_requested(jj) else []
+            forward_files = forward_files + traj_files
             #    backward_files += logs
             # ...
             task_type = get_task_type({"interaction": inter_param})
@@ -218,14 +354,40 @@ def run_property(confs, inter_param, property_list, mdata):
                 all_task = [task for task in tmp_task_list if not apex_task_succeeded(task)]
                 for task in sorted(set(tmp_task_list) - set(all_task)):
                     print(f"Skip completed property task {task} (apex_task_status.json state=succeeded, rerun_finished=False)")
+            if cache is not None:
+                input_files, output_files = task_io_files(virtual_calculator, inter_type, property_type)
+                input_files = input_files + traj_files
+                command = mdata.get(f"{task_type}_run_command", mdata.get("run_command", None))
+                all_task, digests = restore_cached_tasks(cache, all_task, input_files, inter_type, command)
+                cached_stores.append((digests, output_files, inter_type))
             run_tasks = collect_task(all_task, inter_type)
             if len(run_tasks) == 0:
                 continue
-            else:
-                processes = len(run_tasks)
-                pool = Pool(processes=processes)
-                print("Submit job via %d processes" % processes)
-                ret = pool.apply_async(
+            in_process_tasks = []
+            if inter_type in LAMMPS_INTER_TYPE and in_process_requested(jj):
+                if not machine_runs_locally(mdata):
+                    print("Machine is not local, run %s via dispatcher" % path_to_work)
+                elif lammps_module_available():
+                    in_process_all = [ii for ii in all_task if task_in_process(ii)]
+                    # finished tasks are neither rerun in-process nor handed to the dispatcher
+                    in_process_tasks = [ii for ii in in_process_all if os.path.basename(ii) in run_tasks]
+                    all_task = [ii for ii in all_task if ii not in in_process_all]
+                else:
+                    print("LAMMPS Python module not found, run %s via dispatcher" % path_to_work)
+
+            weight = TASK_COST_WEIGHT.get(property_type, 1)
+            if in_process_tasks:
+                print("Evaluate %d tasks of %s in one LAMMPS process" % (len(in_process_tasks), work_path))
+                jobs.append((
+                    weight * len(in_process_tasks),
+                    work_path + " (in-process)",
+                    in_process_worker,
+                    (work_path, in_process_tasks)
+                ))
+            if all_task:
+                jobs.append((
+                    weight * len(all_task),
+                    work_path,
                     worker,
                     (
                         work_path,
@@ -237,15 +399,16 @@ def run_property(confs, inter_param, property_list, mdata):
                         inter_type,
                         task_type
                     )
-                )
-                multiple_ret.append(ret)
-    pool.close()
-    pool.join()
-    for ii in range(len(multiple_ret)):
-        if not multiple_ret[ii].successful():
-            print("ERROR:", multiple_ret[ii].get())
-            raise RuntimeError("Job %d is not successful!" % ii)
-    print("%d jobs are finished" % len(multiple_ret))
+                ))
+
+    if not jobs:
+        print("No property jobs to run")
+        return
+    try:
+        run_scheduled_jobs(jobs, run_pool_size(mdata, len(jobs)))
+    finally:
+        for digests, output_files, inter_type in cached_stores:
+            store_finished_tasks(cache, digests, output_files, inter_type)
 
 
 def post_property(confs, inter_param, property_list):
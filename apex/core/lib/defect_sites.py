@@ -0,0 +1,94 @@
+import numpy as np
+
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+# symmetry tolerances of the defect generators, neighbour cutoff (A) and
+# distance resolution (A) of the local-environment fingerprint
+DEFAULT_SITE_GROUPING = {
+    "symprec": 0.01,
+    "angle_tolerance": 5,
+    "cutoff": 5.0,
+    "tol": 0.05,
+}
+# written to every defect task when site grouping is enabled
+DEFECT_SITE_FILE = "defect_site.json"
+
+
+def site_grouping_param(parameter):
+    """
+    Settings of the ``site_grouping`` property parameter completed with the
+    defaults, None when grouping is disabled.
+    """
+    value = (parameter or {}).get("site_grouping", False)
+    if not value:
+        return None
+    grouping = dict(DEFAULT_SITE_GROUPING)
+    if isinstance(value, dict):
+        unknown = set(value) - set(DEFAULT_SITE_GROUPING)
+        if unknown:
+            raise ValueError(f"unknown site_grouping keys {sorted(unknown)}, expected {list(DEFAULT_SITE_GROUPING)}")
+        grouping.update(value)
+    if grouping["cutoff"] <= 0 or grouping["tol"] <= 0:
+        raise ValueError("site_grouping cutoff and tol must be positive")
+    return grouping
+
+
+def environment_fingerprint(structure, coords, cutoff, tol) -> dict:
+    """
+    Sorted neighbour distances by species around the cartesian point coords,
+    gathered up to cutoff + tol so that matching is not decided at the cutoff.
+    The point itself is left out when it is a site.
+    """
+    fingerprint = {}
+    for neighbor in structure.get_sites_in_sphere(coords, cutoff + tol):
+        if neighbor.nn_distance > 1e-3:
+            fingerprint.setdefault(str(neighbor.specie), []).append(neighbor.nn_distance)
+    return {key: np.sort(value) for key, value in fingerprint.items()}
+
+
+def _covers(fp_a, fp_b, cutoff, tol) -> bool:
+    # every neighbour of a within cutoff has a partner in b within tol
+    for species, dist_a in fp_a.items():
+        dist_a = dist_a[dist_a <= cutoff]
+        dist_b = fp_b.get(species, np.zeros(0))
+        if len(dist_b) < len(dist_a):
+            return False
+        if len(dist_a) and np.max(np.abs(dist_a - dist_b[: len(dist_a)])) > tol:
+            return False
+    return True
+
+
+def same_environment(fp_a, fp_b, cutoff, tol) -> bool:
+    return _covers(fp_a, fp_b, cutoff, tol) and _covers(fp_b, fp_a, cutoff, tol)
+
+
+def group_defect_sites(defects, cutoff, tol):
+    """
+    Group defects of the same species whose sites have the same local
+    environment within tol. Return ``[(representative, multiplicity, size)]``
+    in the order the classes are first met: the first defect of a class
+    represents it, the multiplicity is the summed multiplicity of its members
+    and size their number.
+    """
+    classes = []
+    for defect in defects:
+        species = str(defect.site.specie)
+        fingerprint = environment_fingerprint(defect.structure, defect.site.coords, cutoff, tol)
+        for group in classes:
+            if group[0] == species and same_environment(group[1], fingerprint, cutoff, tol):
+                group[3] += int(defect.multiplicity)
+                group[4] += 1
+                break
+        else:
+            classes.append([species, fingerprint, defect, int(defect.multiplicity), 1])
+    return [(group[2], group[3], group[4]) for group in classes]
+
+
+def defect_site_record(defect, multiplicity, size) -> dict:
+    return {
+        "species": str(defect.site.specie),
+        "frac_coords": [float(ii) for ii in defect.site.frac_coords],
+        "multiplicity": int(multiplicity),
+        "merged_orbits": int(size),
+    }
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+from monty.serialization import dumpfn, loadfn
+from apex.core.lib.phonopy_driver import DEFAULT_DISPLACEMENT_DISTANCE, default_displacement_distance
+from apex.core.lib.task_cache import TaskCache, file_digest
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+# force-constant files kept for a cache entry
+FORCE_CONSTANT_FILES = ["FORCE_CONSTANTS", "force_constants.hdf5"]
+# written to the property work path by make_confs, read back by compute
+FORCE_CONSTANT_KEY = "force_constants_key.json"
+
+
+def _normalize_interaction(value, bases):
+    if isinstance(value, dict):
+        return {str(key): _normalize_interaction(value[key], bases) for key in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_interaction(item, bases) for item in value]
+    if isinstance(value, str):
+        # potential, INCAR, POTCAR and orbital files are addressed by their content
+        for base in bases:
+            path = os.path.join(base, value)
+            if os.path.isfile(path):
+                return "sha256:" + file_digest(path)
+    return value
+
+
+def interaction_digest(inter_param, cal_setting=None, base_dir=None) -> str:
+    """
+    Content address of the interaction: inter_param and cal_setting with every
+    value naming an existing file (relative to base_dir, or to the POTCAR
+    prefix of VASP/ABACUS interactions) replaced by the digest of that file.
+    """
+    base_dir = base_dir or os.getcwd()
+    bases = [base_dir]
+    prefix = (inter_param or {}).get("potcar_prefix")
+    if prefix:
+        bases.append(os.path.join(base_dir, prefix))
+    payload = {
+        "interaction": _normalize_interaction(inter_param or {}, bases),
+        "cal_setting": _normalize_interaction(cal_setting or {}, bases),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def force_constant_displacement_distance(inter_type) -> float:
+    """
+    Displacement amplitude of the force-constant run of an interaction type:
+    the `phonopy -d` default of the ABACUS or VASP interface, used by both
+    phonopy backends, and the phonoLAMMPS default (0.01 A) for LAMMPS.
+    """
+    return default_displacement_distance("abacus" if inter_type == "abacus" else "vasp")
+
+
+def force_constant_digest(
+    unitcell_file,
+    supercell_size,
+    interaction,
+    approach="",
+    displacement_distance=DEFAULT_DISPLACEMENT_DISTANCE,
+) -> str:
+    """
+    Content address of the supercell force constants of a unit cell: the cell
+    file contents, the supercell matrix, the phonon approach, the displacement
+    amplitude and the ``interaction_digest`` of the potential.
+    The band path and mesh do not enter the key.
+    """
+    h = hashlib.sha256()
+    h.update(f"unitcell={file_digest(unitcell_file)}\n".encode())
+    h.update(f"supercell={' '.join(str(int(ii)) for ii in supercell_size)}\n".encode())
+    h.update(f"approach={approach or ''}\ndistance={float(displacement_distance)!r}\n".encode())
+    h.update(f"interaction={interaction}\n".encode())
+    return h.hexdigest()
+
+
+def load_force_constant_key(work_path):
+    """
+    Force-constant key recorded in work_path by make_confs, None when the cache was disabled.
+    """
+    key_path = os.path.join(work_path, FORCE_CONSTANT_KEY)
+    return loadfn(key_path) if os.path.isfile(key_path) else None
+
+
+def dump_force_constant_key(work_path, key) -> None:
+    dumpfn(key, os.path.join(work_path, FORCE_CONSTANT_KEY), indent=4)
+
+
+class ForceConstantCache(TaskCache):
+    """
+    Store of phonon force constants addressed by ``force_constant_digest``,
+    shared by Phonon and Gruneisen. It is enabled by the ``fc_cache_dir``
+    property parameter.
+    """
+
+    @classmethod
+    def from_parameter(cls, parameter):
+        root = (parameter or {}).get("fc_cache_dir")
+        return cls(os.path.abspath(os.path.expanduser(root))) if root else None
+
+    def restore_force_constants(self, digest, dest_dir) -> bool:
+        """
+        Copy the cached FORCE_CONSTANTS into dest_dir; False on a cache miss.
+        """
+        return self.restore(digest, dest_dir)
+
+    def store_force_constants(self, digest, src_dir) -> bool:
+        """
+        Save the force constants found in src_dir; False when there are none or the entry exists.
+        """
+        if not any(os.path.isfile(os.path.join(src_dir, name)) for name in FORCE_CONSTANT_FILES):
+            return False
+        return self.store(digest, src_dir, FORCE_CONSTANT_FILES)
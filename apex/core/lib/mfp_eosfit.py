@@ -6,7 +6,6 @@ import argparse
 import os
 import sys
 
-import matplotlib.pyplot as plt
 import numpy as np
 import scipy.integrate as INT
 from scipy.interpolate import *
@@ -1406,24 +1405,284 @@ def fit_birch_murnaghan(volumes, energies, fixed_bp=None):
     }
 
 
+# ----------------------------------------------------------------------------------------
+# Batch fitting: every model with a closed-form Jacobian is fitted to all E-V
+# datasets at once by a Levenberg-Marquardt iteration vectorized over datasets.
+# Parameters follow the module convention [e0, b0, bp, v0(, bpp)].
+
+
+def _jac_murnaghan(vol, pars):
+    e0, b0, bp, v0 = pars
+    xx = (v0 / vol) ** bp
+    B = b0 * vol / bp
+    C = 1 + xx / (bp - 1)
+    d_bp = (
+        b0 * v0 / (bp - 1) ** 2
+        - b0 * vol / bp**2 * C
+        + B * (xx * np.log(v0 / vol) / (bp - 1) - xx / (bp - 1) ** 2)
+    )
+    d_v0 = b0 / (bp - 1) * (vol * xx / v0 - 1)
+    de = murnaghan(vol, pars) - e0
+    return [np.ones_like(de), de / b0, d_bp, d_v0]
+
+
+def _jac_birch(vol, pars):
+    # birch and BM4 are the same third-order Birch-Murnaghan energy
+    e0, b0, bp, v0 = pars
+    f = (v0 / vol) ** (2.0 / 3.0) - 1.0
+    de = 9.0 / 8.0 * b0 * v0 * f**2 + 9.0 / 16.0 * b0 * v0 * (bp - 4.0) * f**3
+    df_dv0 = 2.0 / 3.0 * (f + 1.0) / v0
+    d_v0 = de / v0 + (
+        9.0 / 4.0 * b0 * v0 * f + 27.0 / 16.0 * b0 * v0 * (bp - 4.0) * f**2
+    ) * df_dv0
+    return [np.ones_like(de), de / b0, 9.0 / 16.0 * b0 * v0 * f**3, d_v0]
+
+
+def _jac_BM5(vol, pars):
+    e0, b0, bp, v0, bpp = pars
+    t2 = (v0 / vol) ** (2.0 / 3.0)
+    t3 = t2 - 1.0
+    t4 = t3**2 / 4.0
+    coef = 9.0 * b0 * bpp + 9.0 * bp**2 - 63.0 * bp + 143.0
+    S = coef * t4 + 6.0 * bp * t3 - 24.0 * t2 + 36.0
+    dt2 = 2.0 / 3.0 * t2 / v0
+    dt4 = 0.5 * t3 * dt2
+    dS = coef * dt4 + 6.0 * bp * dt2 - 24.0 * dt2
+    d_b0 = 3.0 / 8.0 * v0 * t4 * S + 3.0 / 8.0 * b0 * v0 * t4 * 9.0 * t4 * bpp
+    d_bp = 3.0 / 8.0 * b0 * v0 * t4 * (18.0 * t4 * bp - 63.0 * t4 + 6.0 * t3)
+    d_v0 = 3.0 / 8.0 * b0 * (t4 * S + v0 * (dt4 * S + t4 * dS))
+    d_bpp = 3.0 / 8.0 * b0 * v0 * t4 * 9.0 * t4 * b0
+    return [np.ones_like(S), d_b0, d_bp, d_v0, d_bpp]
+
+
+def _jac_vinet(vol, pars):
+    e0, b0, bp, v0 = pars
+    eta = (vol / v0) ** (1 / 3)
+    Y = 1.5 * (bp - 1) * (1 - eta)
+    Z = 4 * b0 * v0 / (bp - 1) ** 2
+    h = 1 - (1 - Y) * np.exp(Y)
+    dh = Y * np.exp(Y)
+    d_bp = -2 * Z / (bp - 1) * h + Z * dh * 1.5 * (1 - eta)
+    d_v0 = Z * h / v0 + Z * dh * 0.5 * (bp - 1) * eta / v0
+    return [np.ones_like(h), Z * h / b0, d_bp, d_v0]
+
+
+def _jac_morse(vol, pars):
+    # morse rewritten as e0 + q/2 (1 - w)**2 with w = exp((bp - 1)(1 - (vol/v0)**(1/3)))
+    e0, b0, bp, v0 = pars
+    q = 9 * b0 * v0 / (bp - 1) ** 2
+    u = np.power(vol, 1.0 / 3)
+    ratio = u / v0 ** (1.0 / 3)
+    w = np.exp((bp - 1) * (1 - ratio))
+    d_bp = -q / (bp - 1) * (1 - w) ** 2 - q * (1 - w) * w * (1 - ratio)
+    d_v0 = q / (2 * v0) * (1 - w) ** 2 - q * (1 - w) * w * (bp - 1) * ratio / (3 * v0)
+    return [np.ones_like(w), q / (2 * b0) * (1 - w) ** 2, d_bp, d_v0]
+
+
+# model name -> (energy, Jacobian); BM5 starts from the BM4 solution
+BATCH_EOS_MODELS = {
+    "murnaghan": (murnaghan, _jac_murnaghan),
+    "birch": (birch, _jac_birch),
+    "BM4": (BM4, _jac_birch),
+    "BM5": (BM5, _jac_BM5),
+    "vinet": (vinet, _jac_vinet),
+    "morse": (morse, _jac_morse),
+}
+
+BATCH_FIT_DTYPE = np.dtype(
+    [
+        ("dataset", np.int64),
+        ("model", "U16"),
+        ("e0", np.float64),
+        ("b0", np.float64),
+        ("bp", np.float64),
+        ("v0", np.float64),
+        ("bpp", np.float64),
+        ("b0_GPa", np.float64),
+        ("rss", np.float64),
+        ("rmse", np.float64),
+        ("n_points", np.int64),
+        ("iterations", np.int64),
+        ("converged", np.bool_),
+    ]
+)
+
+
+def _pad_datasets(datasets):
+    n_max = max(len(vv) for vv, _ in datasets)
+    vol = np.ones((len(datasets), n_max))
+    en = np.zeros((len(datasets), n_max))
+    mask = np.zeros((len(datasets), n_max), dtype=bool)
+    for ii, (vv, ee) in enumerate(datasets):
+        vv = np.asarray(vv, dtype=float)
+        ee = np.asarray(ee, dtype=float)
+        if vv.shape != ee.shape or vv.ndim != 1:
+            raise ValueError(f"dataset {ii}: volumes and energies must be 1-D with the same shape")
+        if len(vv) < 5:
+            raise ValueError(f"dataset {ii}: at least 5 volume-energy points are required for batch EOS fitting")
+        if np.any(vv <= 0.0):
+            raise ValueError(f"dataset {ii}: EOS volumes must be positive")
+        vol[ii, : len(vv)] = vv
+        en[ii, : len(vv)] = ee
+        mask[ii, : len(vv)] = True
+    return vol, en, mask
+
+
+def _batch_init_guess(vol, en, mask):
+    """
+    init_guess_from_data for every dataset: a quadratic fit about the mean volume.
+    """
+    count = mask.sum(axis=1)
+    vmean = (vol * mask).sum(axis=1) / count
+    t = (vol - vmean[:, None]) * mask
+    basis = np.stack([t**2, t, mask.astype(float)], axis=-1)
+    coef = np.linalg.solve(
+        np.einsum("bni,bnj->bij", basis, basis), np.einsum("bni,bn->bi", basis, en * mask)
+    )
+    a, b, c = coef[:, 0], coef[:, 1], coef[:, 2]
+    v0 = np.abs(vmean - b / (2 * a))
+    e0 = a * (v0 - vmean) ** 2 + b * (v0 - vmean) + c
+    b0 = 2 * a * v0
+    return np.stack([e0, b0, np.full_like(e0, 3.0), v0], axis=1)
+
+
+def _batch_levenberg_marquardt(func, jac, vol, en, mask, p0, max_iter=200, tol=1e-12):
+    """
+    Minimize sum((en - func(vol, p))**2) over the masked points of every dataset.
+    Return the parameters, residual sums of squares, iterations and convergence flags.
+    """
+    pars = np.array(p0, dtype=float)
+    nset, npar = pars.shape
+    maskf = mask.astype(float)
+
+    def residual(pp):
+        with np.errstate(all="ignore"):
+            rr = (en - func(vol, [pp[:, [ii]] for ii in range(npar)])) * maskf
+        return rr, np.sum(rr**2, axis=1)
+
+    res, cost = residual(pars)
+    damping = np.full(nset, 1e-3)
+    iterations = np.zeros(nset, dtype=np.int64)
+    converged = np.zeros(nset, dtype=bool)
+    active = np.isfinite(cost)
+    eye = np.eye(npar)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        with np.errstate(all="ignore"):
+            columns = jac(vol, [pars[:, [ii]] for ii in range(npar)])
+        J = np.stack([np.broadcast_to(col, vol.shape) for col in columns], axis=-1) * maskf[..., None]
+        JTJ = np.einsum("bni,bnj->bij", J, J)
+        grad = np.einsum("bni,bn->bi", J, res)
+        scale = np.maximum(np.einsum("bii->bi", JTJ), 1e-30)
+        lhs = JTJ + damping[:, None, None] * scale[:, :, None] * eye
+        ok = active & np.all(np.isfinite(lhs), axis=(1, 2)) & np.all(np.isfinite(grad), axis=1)
+        step = np.zeros_like(pars)
+        if ok.any():
+            try:
+                step[ok] = np.linalg.solve(lhs[ok], grad[ok][..., None])[..., 0]
+            except np.linalg.LinAlgError:
+                for ii in np.flatnonzero(ok):
+                    step[ii] = np.linalg.lstsq(lhs[ii], grad[ii], rcond=None)[0]
+        trial = pars + step
+        trial_res, trial_cost = residual(trial)
+        accept = ok & np.isfinite(trial_cost) & (trial_cost <= cost)
+        small_step = np.all(np.abs(step) <= tol * (np.abs(pars) + tol), axis=1)
+        small_gain = (cost - trial_cost) <= tol * np.maximum(cost, tol**2)
+        pars[accept] = trial[accept]
+        res[accept] = trial_res[accept]
+        cost[accept] = trial_cost[accept]
+        iterations[active] += 1
+        damping[accept] = np.maximum(damping[accept] / 10.0, 1e-12)
+        damping[active & ~accept] *= 10.0
+        done = accept & (small_step | small_gain)
+        converged |= done
+        # give up on datasets whose damping diverges
+        active &= ~done & (damping < 1e12)
+    return pars, cost, iterations, converged
+
+
+def fit_eos_batch(datasets, models=None, max_iter=200):
+    """
+    Fit every model of models (default: all of BATCH_EOS_MODELS) to every
+    ``(volumes, energies)`` dataset, vectorized over the datasets.
+
+    Return a BATCH_FIT_DTYPE structured array with one row per dataset and
+    model, ordered by dataset and then by model. bpp is the fitted value for
+    BM5 and the value implied by the other models (0 for murnaghan). Rows that
+    did not converge keep their last parameters with ``converged`` False.
+    """
+    models = list(BATCH_EOS_MODELS) if models is None else list(models)
+    unknown = [name for name in models if name not in BATCH_EOS_MODELS]
+    if unknown:
+        raise ValueError(f"no batch fit for EOS models {unknown}; supported: {list(BATCH_EOS_MODELS)}")
+    datasets = list(datasets)
+    out = np.zeros(len(datasets) * len(models), dtype=BATCH_FIT_DTYPE)
+    if not datasets or not models:
+        return out
+    vol, en, mask = _pad_datasets(datasets)
+    count = mask.sum(axis=1)
+    p0 = _batch_init_guess(vol, en, mask)
+
+    fitted = {}
+    # BM5 needs a good start, so BM4 is always solved first
+    for name in sorted(set(models) | ({"BM4"} if "BM5" in models else set()), key=lambda nn: nn != "BM4"):
+        func, jac = BATCH_EOS_MODELS[name]
+        if name == "BM5":
+            bm4 = fitted["BM4"][0]
+            start = np.column_stack([bm4, calc_props_BM4(bm4.T)[4]])
+        else:
+            start = p0
+        fitted[name] = _batch_levenberg_marquardt(func, jac, vol, en, mask, start, max_iter=max_iter)
+
+    for jj, name in enumerate(models):
+        pars, cost, iterations, converged = fitted[name]
+        e0, b0, bp, v0 = pars[:, :4].T
+        if name == "BM5":
+            bpp = pars[:, 4]
+        elif name == "murnaghan":
+            bpp = np.zeros_like(b0)
+        else:
+            prop_func = {"vinet": calc_props_vinet, "morse": calc_props_morse}.get(name, calc_props_BM4)
+            bpp = prop_func(pars[:, :4].T)[4]
+        rows = out[jj :: len(models)]
+        rows["dataset"] = np.arange(len(datasets))
+        rows["model"] = name
+        rows["e0"], rows["b0"], rows["bp"], rows["v0"], rows["bpp"] = e0, b0, bp, v0, bpp
+        rows["b0_GPa"] = b0 * eV2GPa
+        rows["rss"] = cost
+        rows["rmse"] = np.sqrt(cost / count)
+        rows["n_points"] = count
+        rows["iterations"] = iterations
+        rows["converged"] = converged
+    return out
+
+
+def _eos_function(func):
+    efunc = globals().get(func)
+    if not callable(efunc):
+        raise ValueError(f"unknown EOS function {func}")
+    return efunc
+
+
 def repro_ve(func, vol_i, p):
-    ndata = len(vol_i)
-    eni = np.zeros(ndata)
-    for i in range(ndata):
-        eni[i] = eval(func)(vol_i[i], p)
+    efunc = _eos_function(func)
+    vol_i = np.asarray(vol_i, dtype=float)
+    try:
+        eni = np.asarray(efunc(vol_i, p), dtype=float)
+    except (TypeError, ValueError):
+        eni = None
+    if eni is None or eni.shape != vol_i.shape:
+        # models written for scalar volumes
+        eni = np.array([efunc(vv, p) for vv in vol_i], dtype=float)
     return eni
 
 
 def repro_vp(func, vol_i, pars):
     dv = 1e-5
-    efunc = eval(func)
-    ndata = len(vol_i)
-    Press = np.zeros(ndata)
-    for i in range(ndata):
-        v = vol_i[i]
-        P = (efunc(v + 0.5 * dv, pars) - efunc(v - 0.5 * dv, pars)) / dv
-        Press[i] = -P * eV2GPa
-    return Press
+    vol_i = np.asarray(vol_i, dtype=float)
+    P = (repro_ve(func, vol_i + 0.5 * dv, pars) - repro_ve(func, vol_i - 0.5 * dv, pars)) / dv
+    return -P * eV2GPa
 
 
 def ext_vec(
@@ -1463,7 +1722,9 @@ def ext_vec(
         fw.flush()
     fw.close()
 
-    # plot the results
+    # plot the results, matplotlib is only needed for the figures
+    import matplotlib.pyplot as plt
+
     vol, en = read_ve(fin)
     plt.plot(vol, en, "o-", vol_ext, en_ext, "rd")
     plt.legend(["dft_calc", func + "_ext"], loc="best")
@@ -1545,6 +1806,9 @@ def ext_velp(
         np.array(cellc) / np.array(cella),
     ]
     lp_ylabel = ["E(eV)", "a(A)", "b(A)", "c(A)", "b/a", "c/a", "c_ext/a_ext"]
+    # matplotlib is only needed for the figures
+    import matplotlib.pyplot as plt
+
     for i in range(nfigure):
         plt.subplot(nfigure, 1, i + 1)
         plt.ylabel(lp_ylabel[i])
@@ -1764,6 +2028,9 @@ def lsqfit_eos(
     # if fit_res > 1e-4:
     #    print("\n>> Residuals seems too large, please refit it by swithing argument --refit 1!\n")
     #    show = 'F'  # reset show tag, not to show the figure.
+    # matplotlib is only needed for the figures
+    import matplotlib.pyplot as plt
+
     plt.plot(vol, en, "o", vol_i, en_i)
     plt.title("EoS fitted by: %s model" % str(func))
     plt.legend(["calc", func + "-fit"], loc="best")
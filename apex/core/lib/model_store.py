@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+# deduplicated potential/model files, kept at the top of the work directory
+MODEL_STORE = ".apex_models"
+# environment variable pointing to the store to use instead of the one next to the models
+MODEL_STORE_ENV = "APEX_MODEL_STORE"
+# store links removed from a directory before it is uploaded, as {name: "<digest>/<name>"}
+MODEL_LINKS_FILE = ".apex_model_links.json"
+
+_DIGEST_CACHE = {}
+
+
+def model_digest(path) -> str:
+    """
+    sha256 of the raw file contents, cached on (mtime, size).
+    """
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _DIGEST_CACHE.get(real)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(real, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    _DIGEST_CACHE[real] = (stamp, digest)
+    return digest
+
+
+def model_store_root(model_path) -> str:
+    """
+    Store used for a model: $APEX_MODEL_STORE when set, else ``.apex_models``
+    in the directory of the model file.
+    """
+    store = os.environ.get(MODEL_STORE_ENV)
+    if store:
+        return os.path.abspath(store)
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), MODEL_STORE)
+
+
+@contextmanager
+def model_store_env(store):
+    """
+    Use store for every model stored in the block, e.g. a fixed store in a
+    workflow step that is published as its own artifact.
+    """
+    old = os.environ.get(MODEL_STORE_ENV)
+    os.environ[MODEL_STORE_ENV] = os.path.abspath(store)
+    try:
+        yield
+    finally:
+        if old is None:
+            del os.environ[MODEL_STORE_ENV]
+        else:
+            os.environ[MODEL_STORE_ENV] = old
+
+
+def store_model(path, store_root) -> str:
+    """
+    Put a model file into the store as ``<store_root>/<digest>/<basename>`` and return its path.
+    The entry is copied once and published with an atomic rename.
+    """
+    digest = model_digest(path)[:16]
+    entry = os.path.join(store_root, digest)
+    stored = os.path.join(entry, os.path.basename(path))
+    if os.path.isfile(stored):
+        return stored
+    os.makedirs(store_root, exist_ok=True)
+    tmp = "%s.tmp%s" % (entry, uuid.uuid4().hex)
+    os.makedirs(tmp)
+    # a copy, not a hardlink: editing the source in place must not change the entry
+    shutil.copy2(os.path.realpath(path), os.path.join(tmp, os.path.basename(path)))
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        # the same model was stored concurrently
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isfile(stored):
+            raise
+    return stored
+
+
+def link_model(stored, link_name, mode="symlink"):
+    """
+    Point link_name at a stored model by a relative symlink, or by a hardlink
+    for backends that cannot follow symlinks. Existing links are replaced atomically.
+    """
+    tmp_link = "%s.tmp%d" % (link_name, os.getpid())
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    if mode == "hardlink":
+        os.link(stored, tmp_link)
+    elif mode == "symlink":
+        os.symlink(os.path.relpath(stored, os.path.dirname(os.path.abspath(link_name))), tmp_link)
+    else:
+        raise RuntimeError(f"unknown model_link mode {mode}")
+    os.replace(tmp_link, link_name)
+
+
+def is_store_link(path) -> bool:
+    return os.path.islink(path) and MODEL_STORE in os.readlink(path).split(os.sep)
+
+
+def _store_inodes(store) -> dict:
+    inodes = {}
+    if store and os.path.isdir(store):
+        for entry in os.listdir(store):
+            entry_dir = os.path.join(store, entry)
+            if not os.path.isdir(entry_dir):
+                continue
+            for name in os.listdir(entry_dir):
+                st = os.stat(os.path.join(entry_dir, name))
+                inodes[(st.st_dev, st.st_ino)] = "%s/%s" % (entry, name)
+    return inodes
+
+
+def _store_entry(path, inodes):
+    # "<digest>/<name>" of a symlink or hardlink into the store, else None
+    if is_store_link(path):
+        parts = os.readlink(path).split(os.sep)
+        return "/".join(parts[parts.index(MODEL_STORE) + 1:])
+    if inodes and os.path.isfile(path) and not os.path.islink(path):
+        st = os.stat(path)
+        return inodes.get((st.st_dev, st.st_ino))
+    return None
+
+
+def _record_links(directory, links):
+    record = os.path.join(directory, MODEL_LINKS_FILE)
+    if os.path.isfile(record):
+        with open(record) as fp:
+            links = dict(json.load(fp), **links)
+    with open(record, "w") as fp:
+        json.dump(links, fp, indent=4, sort_keys=True)
+
+
+def strip_store_links(directory, store=None) -> list:
+    """
+    Remove the store links (symlinks, or hardlinks into store) of a directory
+    and record them in its MODEL_LINKS_FILE, so that an artifact of the
+    directory carries no model bytes; resolve_store_links restores them.
+    Return the removed names.
+    """
+    if not os.path.isdir(directory):
+        return []
+    inodes = _store_inodes(store)
+    links = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        entry = _store_entry(path, inodes)
+        if entry is not None:
+            links[name] = entry
+            os.remove(path)
+    if links:
+        _record_links(directory, links)
+    return sorted(links)
+
+
+def copy_without_store_links(src, dst):
+    """
+    shutil.copytree of src leaving out store links, which are recorded in
+    MODEL_LINKS_FILE of the copied directories. Other links are dereferenced.
+    """
+    inodes = _store_inodes(_find_store(src))
+    stripped = {}
+
+    def ignore(directory, names):
+        links = {}
+        for name in names:
+            entry = _store_entry(os.path.join(directory, name), inodes)
+            if entry is not None:
+                links[name] = entry
+        if links:
+            stripped[os.path.relpath(directory, src)] = links
+        return set(links)
+
+    shutil.copytree(src, dst, ignore=ignore)
+    for rel, links in stripped.items():
+        _record_links(os.path.normpath(os.path.join(dst, rel)), links)
+
+
+def _find_store(task_dir, store=None):
+    store = store or os.environ.get(MODEL_STORE_ENV)
+    if store and os.path.isdir(store):
+        return store
+    path = os.path.abspath(task_dir)
+    while True:
+        candidate = os.path.join(path, MODEL_STORE)
+        if os.path.isdir(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def resolve_store_links(task_dir, names, store=None):
+    """
+    Re-create the store links of a staged task directory, both dangling links
+    and links recorded in MODEL_LINKS_FILE, against the store given, the one
+    in $APEX_MODEL_STORE or one in a parent directory.
+    Return the names that could not be resolved.
+    """
+    record = os.path.join(task_dir, MODEL_LINKS_FILE)
+    recorded = {}
+    if os.path.isfile(record):
+        with open(record) as fp:
+            recorded = json.load(fp)
+    unresolved = []
+    store = _find_store(task_dir, store) if recorded or names else None
+    for name in sorted(set(names) | set(recorded)):
+        link_name = os.path.join(task_dir, name)
+        if is_store_link(link_name) and not os.path.exists(link_name):
+            parts = os.readlink(link_name).split(os.sep)
+            entry = "/".join(parts[parts.index(MODEL_STORE) + 1:])
+        elif name in recorded and not os.path.lexists(link_name):
+            entry = recorded[name]
+        else:
+            continue
+        stored = os.path.join(store, *entry.split("/")) if store else None
+        if stored and os.path.isfile(stored):
+            link_model(stored, link_name)
+        else:
+            unresolved.append(name)
+    if unresolved:
+        logging.warning(f"Could not resolve model store links in {task_dir}: {unresolved}")
+    return unresolved
@@ -0,0 +1,157 @@
+import logging
+import os
+import re
+import uuid
+
+import numpy as np
+
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+# suffix of the compressed cache written next to a parsed mesh.yaml
+MESH_CACHE_SUFFIX = ".npz"
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_QPOINT_RE = re.compile(r"^\s+(?:-\s+)?q-position:\s*(.*)$")
+_WEIGHT_RE = re.compile(r"^\s+(?:-\s+)?weight:\s*(\S+)")
+_FREQUENCY_RE = re.compile(r"^\s+(?:-\s+)?frequency:\s*(\S+)")
+_LIST_ITEM_RE = re.compile(r"^\s*-\s+(%s)\s*$" % _NUMBER)
+_FLOW_NUMBER_RE = re.compile(_NUMBER)
+
+
+def _mesh_arrays(qpoints, weights, frequencies) -> dict:
+    return {
+        "qpoints": np.asarray(qpoints, dtype=float).reshape(-1, 3),
+        "weights": np.asarray(weights, dtype=int).reshape(-1),
+        "frequencies": np.asarray(frequencies, dtype=float).reshape(len(weights), -1),
+    }
+
+
+def _load_mesh_hdf5(path) -> dict:
+    import h5py
+    with h5py.File(path, "r") as fp:
+        return _mesh_arrays(fp["qpoint"][:], fp["weight"][:], fp["frequency"][:])
+
+
+def _scan_mesh_yaml(path) -> dict:
+    """
+    Extract q-points, weights and frequencies from the ``phonon`` list of a
+    phonopy mesh.yaml line by line, skipping eigenvectors and every other key.
+    Both phonopy's own layout and block-style dumps of the same data are accepted.
+    """
+    qpoints, weights, frequencies = [], [], []
+    in_phonon = False
+    pending_qpoint = None
+    with open(path, "r") as fp:
+        for line in fp:
+            if not in_phonon:
+                in_phonon = line.rstrip() == "phonon:"
+                continue
+            if pending_qpoint is not None and len(pending_qpoint) < 3:
+                item = _LIST_ITEM_RE.match(line)
+                if item:
+                    pending_qpoint.append(float(item.group(1)))
+                    continue
+            if line.startswith("-"):
+                # a new record of the phonon list
+                qpoints.append(None)
+                weights.append(None)
+                frequencies.append([])
+                line = " " + line[1:]
+            elif line[:1] not in (" ", "\n", "#", ""):
+                # next top-level key
+                break
+            if not qpoints:
+                continue
+            match = _FREQUENCY_RE.match(line)
+            if match:
+                frequencies[-1].append(float(match.group(1)))
+                continue
+            match = _QPOINT_RE.match(line)
+            if match:
+                pending_qpoint = [float(value) for value in _FLOW_NUMBER_RE.findall(match.group(1))]
+                qpoints[-1] = pending_qpoint
+                continue
+            match = _WEIGHT_RE.match(line)
+            if match:
+                weights[-1] = int(match.group(1))
+    if not qpoints:
+        raise ValueError(f"no phonon q-points found in {path}")
+    if None in weights or any(qq is None or len(qq) != 3 for qq in qpoints):
+        raise ValueError(f"malformed q-point records in {path}")
+    if len({len(ff) for ff in frequencies}) != 1:
+        raise ValueError(f"mesh band count differs between q-points in {path}")
+    return _mesh_arrays(qpoints, weights, frequencies)
+
+
+def _load_mesh_yaml(path) -> dict:
+    try:
+        return _scan_mesh_yaml(path)
+    except ValueError as exc:
+        # unusual layouts: fall back to a full (C accelerated when available) parse
+        logging.debug(f"line scan of {path} failed ({exc}), parsing the whole file")
+        import yaml
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        with open(path, "r") as fp:
+            phonon = yaml.load(fp, Loader=loader)["phonon"]
+        return _mesh_arrays(
+            [point["q-position"] for point in phonon],
+            [point["weight"] for point in phonon],
+            [[band["frequency"] for band in point["band"]] for point in phonon],
+        )
+
+
+def _source_stamp(path) -> np.ndarray:
+    st = os.stat(path)
+    return np.asarray([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _read_cache(cache_path, stamp):
+    if not os.path.isfile(cache_path):
+        return None
+    try:
+        with np.load(cache_path) as data:
+            if not np.array_equal(data["source_stamp"], stamp):
+                return None
+            return _mesh_arrays(data["qpoints"], data["weights"], data["frequencies"])
+    except Exception as exc:
+        logging.warning(f"ignoring unreadable mesh cache {cache_path}: {exc}")
+        return None
+
+
+def _write_cache(cache_path, stamp, mesh) -> None:
+    tmp = "%s.tmp%s" % (cache_path, uuid.uuid4().hex)
+    try:
+        with open(tmp, "wb") as fp:
+            np.savez_compressed(fp, source_stamp=stamp, **mesh)
+        os.replace(tmp, cache_path)
+    except OSError as exc:
+        logging.warning(f"could not write mesh cache {cache_path}: {exc}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load_mesh(task_dir) -> dict:
+    """
+    Load the phonopy mesh of task_dir as ``{"qpoints": (nq, 3), "weights": (nq,),
+    "frequencies": (nq, nbands)}`` arrays.
+    mesh.hdf5 is read when present and h5py is installed. Otherwise mesh.yaml is
+    scanned once and cached as mesh.yaml.npz, reused while the YAML file is unchanged.
+    """
+    hdf5_path = os.path.join(task_dir, "mesh.hdf5")
+    yaml_path = os.path.join(task_dir, "mesh.yaml")
+    if os.path.isfile(hdf5_path):
+        try:
+            return _load_mesh_hdf5(hdf5_path)
+        except ImportError:
+            if not os.path.isfile(yaml_path):
+                raise
+    if not os.path.isfile(yaml_path):
+        raise FileNotFoundError(f"mesh.yaml not found in {task_dir}")
+    cache_path = yaml_path + MESH_CACHE_SUFFIX
+    stamp = _source_stamp(yaml_path)
+    mesh = _read_cache(cache_path, stamp)
+    if mesh is None:
+        mesh = _load_mesh_yaml(yaml_path)
+        _write_cache(cache_path, stamp, mesh)
+    return mesh
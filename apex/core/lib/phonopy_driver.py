@@ -0,0 +1,321 @@
+import logging
+from fractions import Fraction
+
+import numpy as np
+
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+PHONOPY_BACKENDS = ("api", "cli")
+# displacement amplitude used by `phonopy -d` (Angstrom for VASP cells)
+DEFAULT_DISPLACEMENT_DISTANCE = 0.01
+# interfaces whose `phonopy -d` amplitude is 0.02 in their own length unit (bohr for ABACUS)
+_BOHR_DISPLACEMENT_INTERFACES = (
+    "wien2k", "abinit", "exciting", "elk", "qe", "siesta",
+    "turbomole", "fleur", "abacus", "qlm", "octopus",
+)
+DEFAULT_SYMPREC = 1e-5
+
+
+def phonopy_api_available() -> bool:
+    try:
+        import phonopy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_displacement_distance(calculator="vasp") -> float:
+    """
+    Displacement amplitude of `phonopy -d` for the calculator interface.
+    """
+    try:
+        from phonopy.interface.calculator import get_default_displacement_distance
+    except ImportError:
+        return 0.02 if calculator in _BOHR_DISPLACEMENT_INTERFACES else DEFAULT_DISPLACEMENT_DISTANCE
+    return float(get_default_displacement_distance(calculator))
+
+
+def resolve_phonopy_backend(backend=None) -> str:
+    """
+    "api" when the phonopy python package is importable and no backend is requested, "cli" otherwise.
+    """
+    if backend is None:
+        return "api" if phonopy_api_available() else "cli"
+    if backend not in PHONOPY_BACKENDS:
+        raise ValueError(f"phonopy_backend must be one of {PHONOPY_BACKENDS}, got {backend!r}")
+    if backend == "api" and not phonopy_api_available():
+        raise RuntimeError("phonopy_backend 'api' requires the phonopy python package")
+    return backend
+
+
+def read_phonopy_conf(conf_path) -> dict:
+    """
+    ``KEY = value`` settings of a phonopy configure file such as band.conf, keys upper-cased.
+    """
+    settings = {}
+    with open(conf_path, "r") as fp:
+        for line in fp:
+            line = line.split("#", 1)[0]
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            settings[key.strip().upper()] = value.strip()
+    return settings
+
+
+def _numbers(value: str) -> list:
+    return [float(Fraction(token)) for token in value.split()]
+
+
+def _primitive_matrix(axes):
+    if axes is None:
+        return None
+    if isinstance(axes, str):
+        if axes.strip().lower() == "auto" or axes.strip().upper() in ("P", "F", "I", "A", "C", "R"):
+            return axes.strip()
+        axes = _numbers(axes)
+    matrix = np.asarray(axes, dtype=float)
+    if matrix.size != 9:
+        raise ValueError(f"PRIMITIVE_AXES must have 9 elements, got {axes}")
+    return matrix.reshape(3, 3)
+
+
+def _supercell_matrix(supercell_size):
+    values = _numbers(supercell_size) if isinstance(supercell_size, str) else list(supercell_size)
+    if len(values) == 3:
+        return np.diag([int(round(value)) for value in values])
+    if len(values) == 9:
+        return np.asarray(values, dtype=int).reshape(3, 3)
+    raise ValueError(f"supercell size must have 3 or 9 elements, got {supercell_size}")
+
+
+def _band_paths(band: str) -> list:
+    # BAND = q-points separated by spaces, ',' breaks the path
+    paths = []
+    for segment in band.split(","):
+        values = _numbers(segment)
+        if len(values) % 3 or len(values) < 6:
+            raise ValueError(f"invalid BAND segment: {segment!r}")
+        paths.append(np.asarray(values).reshape(-1, 3))
+    return paths
+
+
+def _is_true(value) -> bool:
+    return str(value).strip().lower() in (".true.", "true", "t", "1")
+
+
+def write_symmetry_cells(unitcell_filename="POSCAR", symprec=DEFAULT_SYMPREC) -> None:
+    """
+    Write the standardized conventional (BPOSCAR) and primitive (PPOSCAR) cells
+    of a VASP cell, as `phonopy --symmetry` does.
+    """
+    import spglib
+    from phonopy.interface.calculator import read_crystal_structure, write_crystal_structure
+    from phonopy.structure.atoms import PhonopyAtoms
+
+    unitcell, _ = read_crystal_structure(unitcell_filename, interface_mode="vasp")
+    cell = (unitcell.cell, unitcell.scaled_positions, unitcell.numbers)
+    for filename, to_primitive in (("BPOSCAR", False), ("PPOSCAR", True)):
+        lattice, positions, numbers = spglib.standardize_cell(cell, to_primitive=to_primitive, symprec=symprec)
+        order = np.argsort(numbers, kind="stable")
+        standardized = PhonopyAtoms(
+            numbers=np.asarray(numbers)[order],
+            scaled_positions=np.asarray(positions)[order],
+            cell=lattice,
+        )
+        write_crystal_structure(filename, standardized, interface_mode="vasp")
+
+
+class PhonopyDriver:
+    """
+    In-process replacement of the phonopy command line calls of the phonon properties.
+    One Phonopy object is kept per structure from displacement generation to
+    force collection and band/mesh evaluation, and the files written are
+    those of the equivalent commands.
+    """
+
+    def __init__(self, phonon, calculator="vasp", optional_structure_info=None):
+        self.phonon = phonon
+        self.calculator = calculator
+        self.optional_structure_info = optional_structure_info
+
+    @classmethod
+    def from_unitcell(
+        cls, unitcell_filename="POSCAR", supercell_size=(2, 2, 2), calculator="vasp", primitive_axes=None
+    ):
+        """`phonopy --dim=... -c unitcell_filename`"""
+        from phonopy import Phonopy
+        from phonopy.interface.calculator import read_crystal_structure
+
+        unitcell, optional_structure_info = read_crystal_structure(
+            unitcell_filename, interface_mode=calculator
+        )
+        if unitcell is None:
+            raise FileNotFoundError(f"could not read unit cell from {unitcell_filename}")
+        phonon = Phonopy(
+            unitcell,
+            supercell_matrix=_supercell_matrix(supercell_size),
+            primitive_matrix=_primitive_matrix(primitive_axes),
+            calculator=calculator,
+        )
+        return cls(phonon, calculator, optional_structure_info)
+
+    @classmethod
+    def from_conf(cls, conf_path, unitcell_filename="POSCAR", calculator="vasp", supercell_size=None):
+        """`phonopy -c unitcell_filename conf_path`, DIM and PRIMITIVE_AXES taken from the conf file"""
+        settings = read_phonopy_conf(conf_path)
+        if supercell_size is None:
+            if "DIM" not in settings:
+                raise ValueError(f"DIM is not set in {conf_path}")
+            supercell_size = settings["DIM"]
+        return cls.from_unitcell(
+            unitcell_filename,
+            supercell_size=supercell_size,
+            calculator=calculator,
+            primitive_axes=settings.get("PRIMITIVE_AXES"),
+        )
+
+    @classmethod
+    def from_disp_yaml(cls, disp_yaml="phonopy_disp.yaml", conf_path=None):
+        """
+        Phonopy object with the displacement dataset written by `phonopy -d`,
+        using the PRIMITIVE_AXES of conf_path when given.
+        """
+        import phonopy
+
+        kwargs = {}
+        if conf_path is not None:
+            axes = read_phonopy_conf(conf_path).get("PRIMITIVE_AXES")
+            if axes is not None:
+                kwargs["primitive_matrix"] = _primitive_matrix(axes)
+        phonon = phonopy.load(disp_yaml, produce_fc=False, log_level=0, **kwargs)
+        return cls(phonon, phonon.calculator or "vasp")
+
+    def generate_displacements(self, distance=None) -> int:
+        """
+        `phonopy -d`: write SPOSCAR (STRU for ABACUS), the displaced supercells and phonopy_disp.yaml.
+        The amplitude defaults to the one of the calculator interface, as in `phonopy -d`.
+        Return the number of displaced supercells.
+        """
+        from phonopy.interface.calculator import write_supercells_with_displacements
+
+        if distance is None:
+            distance = default_displacement_distance(self.calculator)
+        self.phonon.generate_displacements(distance=distance)
+        cells = self.phonon.supercells_with_displacements
+        write_supercells_with_displacements(
+            self.calculator,
+            self.phonon.supercell,
+            cells,
+            optional_structure_info=self.optional_structure_info,
+        )
+        self.phonon.save("phonopy_disp.yaml", settings={"force_sets": False, "force_constants": False})
+        return len(cells)
+
+    def collect_forces(self, force_files, force_sets="FORCE_SETS") -> None:
+        """`phonopy -f`: read the forces of the displaced supercells and write FORCE_SETS."""
+        from phonopy.file_IO import write_FORCE_SETS
+        from phonopy.interface.calculator import get_calc_dataset
+
+        force_files = [str(path) for path in force_files]
+        dataset = get_calc_dataset(
+            self.calculator, len(self.phonon.supercell), force_files, verbose=False
+        )
+        forces = np.asarray(dataset["forces"], dtype=float)
+        if len(forces) != len(self.phonon.supercells_with_displacements):
+            raise RuntimeError(
+                f"{len(force_files)} force files for "
+                f"{len(self.phonon.supercells_with_displacements)} displaced supercells"
+            )
+        self.phonon.forces = forces
+        write_FORCE_SETS(self.phonon.dataset, filename=force_sets)
+
+    def read_force_sets(self, force_sets="FORCE_SETS") -> None:
+        from phonopy.file_IO import parse_FORCE_SETS
+
+        self.phonon.dataset = parse_FORCE_SETS(
+            natom=len(self.phonon.supercell), filename=force_sets
+        )
+
+    def produce_force_constants(self, force_constants="FORCE_CONSTANTS") -> None:
+        """
+        Force constants from the force sets, written to FORCE_CONSTANTS
+        as `phonopy --writefc` does unless force_constants is None.
+        """
+        from phonopy.file_IO import write_FORCE_CONSTANTS
+
+        self.phonon.produce_force_constants()
+        if force_constants:
+            write_FORCE_CONSTANTS(self.phonon.force_constants, filename=force_constants)
+
+    def read_force_constants(self, force_constants="FORCE_CONSTANTS") -> None:
+        """`FORCE_CONSTANTS = READ`"""
+        from phonopy.file_IO import parse_FORCE_CONSTANTS
+
+        self.phonon.force_constants = parse_FORCE_CONSTANTS(filename=force_constants)
+
+    def read_vasprun_force_constants(self, vasprun="vasprun.xml", force_constants="FORCE_CONSTANTS") -> None:
+        """`phonopy --fc vasprun.xml`: force constants of a DFPT run, written to FORCE_CONSTANTS."""
+        from phonopy.file_IO import write_FORCE_CONSTANTS
+        from phonopy.interface.vasp import parse_force_constants
+
+        fc, _ = parse_force_constants(vasprun)
+        if fc is None:
+            raise RuntimeError(f"{vasprun} does not contain force constants")
+        write_FORCE_CONSTANTS(fc, filename=force_constants)
+        self.phonon.force_constants = fc
+
+    def run_conf(self, conf_path, is_mesh_symmetry=True) -> None:
+        """
+        Band structure and mesh sampling requested by a band.conf: band.yaml and
+        band.dat (the `phonopy-bandplot --gnuplot` data) for BAND, mesh.yaml for MESH.
+        """
+        settings = read_phonopy_conf(conf_path)
+        if "BAND" in settings:
+            labels = settings.get("BAND_LABELS")
+            self.run_band(
+                settings["BAND"],
+                npoints=int(settings.get("BAND_POINTS", 51)),
+                labels=labels.split() if labels else None,
+                is_band_connection=_is_true(settings.get("BAND_CONNECTION", False)),
+            )
+        if "MESH" in settings:
+            self.run_mesh([int(value) for value in _numbers(settings["MESH"])], is_mesh_symmetry=is_mesh_symmetry)
+
+    def run_band(self, band, npoints=51, labels=None, is_band_connection=False) -> None:
+        from phonopy.phonon.band_structure import get_band_qpoints_and_path_connections
+
+        qpoints, connections = get_band_qpoints_and_path_connections(_band_paths(band), npoints=npoints)
+        self.phonon.run_band_structure(
+            qpoints,
+            path_connections=connections,
+            labels=labels,
+            is_band_connection=is_band_connection,
+        )
+        self.phonon.write_yaml_band_structure(filename="band.yaml")
+        self.write_band_dat("band.dat")
+
+    def write_band_dat(self, filename="band.dat") -> None:
+        """Band structure in the layout of `phonopy-bandplot --gnuplot band.yaml`."""
+        band = self.phonon.band_structure
+        # phonopy-bandplot reads band.yaml, where distances and frequencies carry 7 and 10 decimals
+        distances = [np.round(np.asarray(dd), 7) for dd in band.distances]
+        frequencies = [np.round(np.asarray(ff), 10) for ff in band.frequencies]
+        segment_positions = [dd[0] for dd in distances] + [distances[-1][-1]]
+        lines = [
+            "# End points of segments: ",
+            "#   " + "%10.8f " * len(segment_positions) % tuple(segment_positions),
+        ]
+        for band_index in range(frequencies[0].shape[1]):
+            for dd, ff in zip(distances, frequencies):
+                lines.extend("%f %f" % (d, f) for d, f in zip(dd, ff[:, band_index]))
+                lines.append("")
+            lines.append("")
+        with open(filename, "w") as fp:
+            fp.write("\n".join(lines) + "\n")
+
+    def run_mesh(self, mesh, is_mesh_symmetry=True) -> None:
+        self.phonon.run_mesh(mesh, is_mesh_symmetry=is_mesh_symmetry)
+        self.phonon.write_yaml_mesh()
+        logging.debug(f"mesh.yaml written for mesh {mesh}")
@@ -9,12 +9,14 @@ Intended use:
 from __future__ import annotations
 
 import math
+import multiprocessing
 import random
 import warnings
 from collections import Counter
 from itertools import combinations_with_replacement
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 
+import numpy as np
 from pymatgen.core import Structure
 
 try:
@@ -288,46 +290,75 @@ def _assign_initial_species(
         state_species[idx] = sp
 
 
+class _NeighborShell(NamedTuple):
+    """Directed CSR neighbour list of one shell over all periodic images.
+
+    The neighbours of site i are ``indices[indptr[i]:indptr[i + 1]]``, each
+    reached through ``multiplicity`` periodic images. Every bond is listed
+    from both ends; a site may be its own neighbour in small cells.
+    """
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    multiplicity: np.ndarray
+
+    @property
+    def num_bonds(self) -> int:
+        return int(self.multiplicity.sum()) // 2
+
+
+def _neighbor_shell(nsites: int, centers, neighbors) -> _NeighborShell:
+    """Collapse directed (center, neighbor) image pairs into a CSR shell."""
+    centers = np.asarray(centers, dtype=np.int64)
+    neighbors = np.asarray(neighbors, dtype=np.int64)
+    keys, multiplicity = np.unique(centers * nsites + neighbors, return_counts=True)
+    indptr = np.searchsorted(keys // nsites, np.arange(nsites + 1)) if nsites else np.zeros(1, dtype=np.int64)
+    return _NeighborShell(
+        indptr=indptr.astype(np.int64),
+        indices=(keys % nsites).astype(np.int64) if nsites else keys,
+        multiplicity=multiplicity.astype(np.int64),
+    )
+
+
 def _default_shell_cutoffs(structure: Structure) -> List[float]:
-    dmat = structure.distance_matrix
-    min_dist = None
-    for i in range(len(structure)):
-        for j in range(i + 1, len(structure)):
-            d = float(dmat[i][j])
-            if d <= 1e-12:
-                continue
-            if min_dist is None or d < min_dist:
-                min_dist = d
-    if min_dist is None:
+    if len(structure) == 0:
         raise RSSInputError("Could not infer default shell cutoff from structure")
-    return [1.05 * min_dist]
+    # start near the mean interatomic spacing and widen until a neighbour appears
+    radius = 1.5 * (structure.volume / len(structure)) ** (1.0 / 3.0)
+    max_radius = 2.0 * max(structure.lattice.abc)
+    while radius <= max_radius:
+        distances = structure.get_neighbor_list(r=radius)[3]
+        distances = distances[distances > 1e-12]
+        if distances.size:
+            return [1.05 * float(distances.min())]
+        radius *= 2.0
+    raise RSSInputError("Could not infer default shell cutoff from structure")
 
 
 def _build_neighbor_shells(
     structure: Structure,
     shell_cutoffs: Sequence[float],
-) -> Dict[int, List[Tuple[int, int]]]:
+) -> Dict[int, _NeighborShell]:
     cutoffs = [float(v) for v in shell_cutoffs]
     if any(v <= 0 for v in cutoffs):
         raise RSSInputError("shell_cutoffs must be positive")
     if sorted(cutoffs) != list(cutoffs):
         raise RSSInputError("shell_cutoffs must be sorted ascending")
 
-    shell_pairs = {sid: [] for sid in range(len(cutoffs))}
-    dmat = structure.distance_matrix
     nsites = len(structure)
-
-    max_cutoff = cutoffs[-1]
-    for i in range(nsites):
-        for j in range(i + 1, nsites):
-            dist = float(dmat[i][j])
-            if dist <= 1e-12 or dist > max_cutoff:
-                continue
-            for shell_id, cutoff in enumerate(cutoffs):
-                if dist <= cutoff:
-                    shell_pairs[shell_id].append((i, j))
-                    break
-    return shell_pairs
+    centers, neighbors, _, distances = structure.get_neighbor_list(r=cutoffs[-1])
+    keep = (distances > 1e-12) & (distances <= cutoffs[-1])
+    centers, neighbors, distances = centers[keep], neighbors[keep], distances[keep]
+    # first shell whose cutoff is not below the distance
+    shell_ids = np.searchsorted(np.asarray(cutoffs), distances, side="left")
+    return {
+        shell_id: _neighbor_shell(
+            nsites,
+            centers[shell_ids == shell_id],
+            neighbors[shell_ids == shell_id],
+        )
+        for shell_id in range(len(cutoffs))
+    }
 
 
 def _normalize_shell_weights(
@@ -405,46 +436,170 @@ def _composition_fractions_from_state(species_state: Sequence[str]) -> Dict[str,
     return {sp: counts[sp] / total for sp in counts}
 
 
+def _alpha_from_counts(
+    n_a: Counter,
+    n_ab: Counter,
+    pair_keys: Sequence[Tuple[str, str]],
+    composition_fractions: Dict[str, float],
+) -> Dict[Tuple[str, str], float]:
+    shell_alpha = {}
+    for a, b in pair_keys:
+        c_a = composition_fractions.get(a, 0.0)
+        c_b = composition_fractions.get(b, 0.0)
+        if a == b:
+            if n_a[a] == 0 or c_b <= 1e-16:
+                alpha = 0.0
+            else:
+                p_ab = n_ab[(a, b)] / float(n_a[a])
+                alpha = 1.0 - p_ab / c_b
+        else:
+            terms = []
+            if n_a[a] > 0 and c_b > 1e-16:
+                p_ab = n_ab[(a, b)] / float(n_a[a])
+                terms.append(1.0 - p_ab / c_b)
+            if n_a[b] > 0 and c_a > 1e-16:
+                p_ba = n_ab[(b, a)] / float(n_a[b])
+                terms.append(1.0 - p_ba / c_a)
+            alpha = sum(terms) / float(len(terms)) if terms else 0.0
+        shell_alpha[(a, b)] = float(alpha)
+    return shell_alpha
+
+
+def _shell_pair_counts(codes: np.ndarray, shell: _NeighborShell, nspecies: int) -> np.ndarray:
+    """Ordered species pair counts ``counts[a, b]`` of one shell."""
+    centers = np.repeat(np.arange(len(codes)), np.diff(shell.indptr))
+    counts = np.zeros((nspecies, nspecies), dtype=np.int64)
+    np.add.at(counts, (codes[centers], codes[shell.indices]), shell.multiplicity)
+    return counts
+
+
+def _alpha_from_matrix(
+    counts: np.ndarray,
+    index: Dict[str, int],
+    pair_keys: Sequence[Tuple[str, str]],
+    composition_fractions: Dict[str, float],
+) -> Dict[Tuple[str, str], float]:
+    row_sums = counts.sum(axis=1)
+    n_a = Counter({sp: int(row_sums[idx]) for sp, idx in index.items()})
+    n_ab = Counter()
+    for a, b in pair_keys:
+        ia, ib = index[a], index[b]
+        n_ab[(a, b)] = int(counts[ia, ib])
+        n_ab[(b, a)] = int(counts[ib, ia])
+    return _alpha_from_counts(n_a, n_ab, pair_keys, composition_fractions)
+
+
+def _species_index(species_state: Sequence[str], pair_keys: Sequence[Tuple[str, str]]):
+    species = sorted(set(species_state) | {sp for pair in pair_keys for sp in pair})
+    index = {sp: idx for idx, sp in enumerate(species)}
+    codes = np.array([index[sp] for sp in species_state], dtype=np.int64)
+    return index, codes
+
+
 def _compute_warren_cowley_sro(
     species_state: Sequence[str],
-    shell_pairs: Dict[int, List[Tuple[int, int]]],
+    shells: Dict[int, _NeighborShell],
     pair_keys: Sequence[Tuple[str, str]],
     composition_fractions: Dict[str, float],
 ) -> Dict[int, Dict[Tuple[str, str], float]]:
-    achieved = {}
-    for shell_id, pairs in shell_pairs.items():
-        n_a = Counter()
-        n_ab = Counter()
-        for i, j in pairs:
-            ai = species_state[i]
-            aj = species_state[j]
-            n_a[ai] += 1
-            n_ab[(ai, aj)] += 1
-            n_a[aj] += 1
-            n_ab[(aj, ai)] += 1
-
-        shell_alpha = {}
-        for a, b in pair_keys:
-            c_a = composition_fractions.get(a, 0.0)
-            c_b = composition_fractions.get(b, 0.0)
-            if a == b:
-                if n_a[a] == 0 or c_b <= 1e-16:
-                    alpha = 0.0
-                else:
-                    p_ab = n_ab[(a, b)] / float(n_a[a])
-                    alpha = 1.0 - p_ab / c_b
-            else:
-                terms = []
-                if n_a[a] > 0 and c_b > 1e-16:
-                    p_ab = n_ab[(a, b)] / float(n_a[a])
-                    terms.append(1.0 - p_ab / c_b)
-                if n_a[b] > 0 and c_a > 1e-16:
-                    p_ba = n_ab[(b, a)] / float(n_a[b])
-                    terms.append(1.0 - p_ba / c_a)
-                alpha = sum(terms) / float(len(terms)) if terms else 0.0
-            shell_alpha[(a, b)] = float(alpha)
-        achieved[shell_id] = shell_alpha
-    return achieved
+    index, codes = _species_index(species_state, pair_keys)
+    return {
+        shell_id: _alpha_from_matrix(
+            _shell_pair_counts(codes, shell, len(index)),
+            index,
+            pair_keys,
+            composition_fractions,
+        )
+        for shell_id, shell in shells.items()
+    }
+
+
+# Metropolis steps between full recomputes checking the incremental SRO counts
+_SRO_RECOMPUTE_INTERVAL = 1000
+
+
+class _IncrementalSRO:
+    """Warren-Cowley SRO of a species state kept as per-shell pair-count matrices.
+
+    ``counts[shell][a, b]`` is the number of ordered (a, b) neighbour pairs.
+    A swap only changes the pairs of its two sites, so its effect on every
+    shell is computed from their CSR neighbour rows in O(z). Swaps stay
+    inside a sublattice, hence the composition fractions never change.
+    """
+
+    def __init__(
+        self,
+        species_state: Sequence[str],
+        shells: Dict[int, _NeighborShell],
+        pair_keys: Sequence[Tuple[str, str]],
+    ):
+        self.index, self.codes = _species_index(species_state, pair_keys)
+        self.shells = shells
+        self.pair_keys = list(pair_keys)
+        self.composition_fractions = _composition_fractions_from_state(species_state)
+        self.counts = self._full_counts()
+
+    def _full_counts(self) -> Dict[int, np.ndarray]:
+        return {
+            shell_id: _shell_pair_counts(self.codes, shell, len(self.index))
+            for shell_id, shell in self.shells.items()
+        }
+
+    def _row(self, shell: _NeighborShell, site: int, other: int):
+        lo, hi = shell.indptr[site], shell.indptr[site + 1]
+        nb = shell.indices[lo:hi]
+        mult = shell.multiplicity[lo:hi]
+        outer = (nb != site) & (nb != other)
+        histogram = np.bincount(
+            self.codes[nb[outer]], weights=mult[outer], minlength=len(self.index)
+        ).astype(np.int64)
+        return histogram, int(mult[nb == site].sum())
+
+    def swap_deltas(self, i: int, j: int) -> Dict[int, np.ndarray]:
+        """Change of every count matrix when the species of sites i and j are swapped."""
+        a, b = self.codes[i], self.codes[j]
+        step = np.zeros(len(self.index), dtype=np.int64)
+        step[b] += 1
+        step[a] -= 1
+        deltas = {}
+        for shell_id, shell in self.shells.items():
+            # bonds between i and j keep their species pair
+            hist_i, self_i = self._row(shell, i, j)
+            hist_j, self_j = self._row(shell, j, i)
+            outer = np.outer(step, hist_i - hist_j)
+            delta = outer + outer.T
+            # periodic self-images of i turn from (a, a) into (b, b) and vice versa for j
+            delta[b, b] += self_i - self_j
+            delta[a, a] -= self_i - self_j
+            deltas[shell_id] = delta
+        return deltas
+
+    def sro(self, deltas: Optional[Dict[int, np.ndarray]] = None) -> Dict[int, Dict[Tuple[str, str], float]]:
+        achieved = {}
+        for shell_id, matrix in self.counts.items():
+            if deltas is not None:
+                matrix = matrix + deltas[shell_id]
+            achieved[shell_id] = _alpha_from_matrix(
+                matrix, self.index, self.pair_keys, self.composition_fractions
+            )
+        return achieved
+
+    def apply_swap(self, i: int, j: int, deltas: Dict[int, np.ndarray]) -> None:
+        for shell_id, delta in deltas.items():
+            self.counts[shell_id] += delta
+        self.codes[i], self.codes[j] = self.codes[j], self.codes[i]
+
+    def verify(self, species_state: Sequence[str]) -> bool:
+        """Recompute the counts from scratch; resynchronize and return False on drift."""
+        codes = np.array([self.index[sp] for sp in species_state], dtype=np.int64)
+        consistent = bool(np.array_equal(codes, self.codes))
+        self.codes = codes
+        full = self._full_counts()
+        consistent = consistent and all(
+            np.array_equal(full[sid], self.counts[sid]) for sid in full
+        )
+        self.counts = full
+        return consistent
 
 
 def _objective_function(
@@ -520,6 +675,291 @@ def _reconstruct_structure(parent: Structure, species_state: Sequence[str]) -> S
     )
 
 
+class _SampleStore:
+    """Lowest-RMSE unique configurations seen while sampling, keyed by species tuple."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries = []
+        self.index = {}
+
+    def add(self, species_snapshot: Sequence[str], step_value: int, rmse_value: float) -> None:
+        key = tuple(species_snapshot)
+        existing_index = self.index.get(key)
+        entry = {
+            "species": list(species_snapshot),
+            "step": int(step_value),
+            "rmse": float(rmse_value),
+        }
+
+        if existing_index is not None:
+            existing_entry = self.entries[existing_index]
+            if (
+                entry["rmse"] < existing_entry["rmse"] - 1e-12
+                or (
+                    abs(entry["rmse"] - existing_entry["rmse"]) <= 1e-12
+                    and entry["step"] < existing_entry["step"]
+                )
+            ):
+                self.entries[existing_index] = entry
+            else:
+                return
+        else:
+            self.entries.append(entry)
+
+        self.entries.sort(key=lambda item: (item["rmse"], item["step"]))
+        if len(self.entries) > self.capacity:
+            removed_entry = self.entries.pop()
+            self.index.pop(tuple(removed_entry["species"]), None)
+        self.index.clear()
+        for index, cached_entry in enumerate(self.entries):
+            self.index[tuple(cached_entry["species"])] = index
+
+    def merge(self, other: "_SampleStore") -> None:
+        for entry in other.entries:
+            self.add(entry["species"], entry["step"], entry["rmse"])
+
+
+class _RSSProblem:
+    """Everything a Metropolis chain needs besides its own state."""
+
+    def __init__(self, sub_map, shells, target_sro, target_pair_keys, weights, tol, interval, patience, num_configs):
+        self.sub_map = sub_map
+        self.shells = shells
+        self.target_sro = target_sro
+        self.target_pair_keys = target_pair_keys
+        self.weights = weights
+        self.tol = tol
+        self.interval = interval
+        self.patience = patience
+        self.num_configs = num_configs
+
+    def evaluate(self, species_snapshot):
+        composition_fractions = _composition_fractions_from_state(species_snapshot)
+        sro = _compute_warren_cowley_sro(
+            species_snapshot,
+            self.shells,
+            self.target_pair_keys,
+            composition_fractions,
+        )
+        return self.score(sro)
+
+    def score(self, sro):
+        objective = _objective_function(sro, self.target_sro, self.weights)
+        gap_metrics = _sro_gap_metrics(sro, self.target_sro, self.weights)
+        return sro, objective, gap_metrics
+
+
+class _MetropolisChain:
+    """State of one swap-based Metropolis chain.
+
+    The chain holds no reference to the problem or to its SRO engine between
+    runs, so it can be pickled to a worker process and continued there.
+    """
+
+    def __init__(self, problem: _RSSProblem, species: Sequence[str], temperature: float, rng: random.Random):
+        self.species = list(species)
+        self.temperature = float(temperature)
+        self.rng = rng
+        self.sro, self.objective, self.gap_metrics = problem.evaluate(self.species)
+        self.initial_objective = float(self.objective)
+        self.initial_gap_metrics = dict(self.gap_metrics)
+        self.best_species = list(self.species)
+        self.best_sro = self.sro
+        self.best_objective = self.objective
+        self.best_gap_metrics = dict(self.gap_metrics)
+        self.accepted_moves = 0
+        self.attempted_moves = 0
+        self.step = 0
+        self.last_improve_step = 0
+        self.samples = _SampleStore(problem.num_configs)
+        self.finished = False
+
+    def consider_best(self, species, sro, objective, gap_metrics, tol) -> None:
+        if objective + tol < self.best_objective:
+            self.best_objective = objective
+            self.best_sro = sro
+            self.best_species = list(species)
+            self.best_gap_metrics = dict(gap_metrics)
+            self.last_improve_step = self.step
+
+    def run(self, problem: _RSSProblem, n_steps: int, patience=None, progress_bar=None) -> None:
+        if self.finished:
+            return
+        engine = _IncrementalSRO(self.species, problem.shells, problem.target_pair_keys)
+        species = self.species
+        for _ in range(n_steps):
+            proposal = _pick_swap(species, problem.sub_map, self.rng)
+            if proposal is None:
+                self.finished = True
+                break
+
+            self.step += 1
+            step = self.step
+            i, j = proposal
+            self.attempted_moves += 1
+            swap_deltas = engine.swap_deltas(i, j)
+            trial_sro, trial_objective, trial_gap_metrics = problem.score(engine.sro(swap_deltas))
+            delta = trial_objective - self.objective
+
+            accept = False
+            if delta <= 0:
+                accept = True
+            elif self.temperature > 0:
+                threshold = math.exp(-delta / max(self.temperature, 1e-12))
+                accept = self.rng.random() < threshold
+
+            if accept:
+                species[i], species[j] = species[j], species[i]
+                engine.apply_swap(i, j, swap_deltas)
+                self.accepted_moves += 1
+                self.sro = trial_sro
+                self.objective = trial_objective
+                self.gap_metrics = trial_gap_metrics
+                self.consider_best(species, trial_sro, trial_objective, trial_gap_metrics, problem.tol)
+
+            if step % _SRO_RECOMPUTE_INTERVAL == 0 and not engine.verify(species):
+                warnings.warn(
+                    f"Incremental SRO counts drifted at step {step}; resynchronized from a full recompute",
+                    RuntimeWarning,
+                )
+                self.sro, self.objective, self.gap_metrics = problem.score(engine.sro())
+
+            if step % problem.interval == 0:
+                self.samples.add(species, step, float(self.gap_metrics["rmse"]))
+
+            if progress_bar is not None:
+                progress_bar.update(1)
+                progress_bar.set_postfix(
+                    {
+                        "gap_rmse": f"{self.gap_metrics['rmse']:.4f}",
+                        "best_rmse": f"{self.best_gap_metrics['rmse']:.4f}",
+                    },
+                    refresh=False,
+                )
+
+            if patience is not None and step - self.last_improve_step >= patience and step >= patience:
+                self.finished = True
+                break
+
+
+# problem shared with chain worker processes, set once by the pool initializer
+_WORKER_PROBLEM = None
+
+
+def _init_chain_worker(problem: _RSSProblem) -> None:
+    global _WORKER_PROBLEM
+    _WORKER_PROBLEM = problem
+
+
+def _run_chain_segment(args):
+    chain, n_steps, patience = args
+    chain.run(_WORKER_PROBLEM, n_steps, patience=patience)
+    return chain
+
+
+def _chain_seeds(seed, num_chains: int) -> List[int]:
+    """Deterministic, independent seeds of every chain plus one for replica exchange."""
+    children = np.random.SeedSequence(seed).spawn(num_chains + 1)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def _exchange_replicas(chains, exchange_round: int, rng: random.Random) -> Tuple[int, int]:
+    """Swap configurations of neighbouring temperatures (even or odd pairs by round)."""
+    attempted = accepted = 0
+    for k in range(exchange_round % 2, len(chains) - 1, 2):
+        low, high = chains[k], chains[k + 1]
+        beta_low = 1.0 / max(low.temperature, 1e-12)
+        beta_high = 1.0 / max(high.temperature, 1e-12)
+        log_ratio = (beta_low - beta_high) * (low.objective - high.objective)
+        attempted += 1
+        if log_ratio >= 0 or rng.random() < math.exp(log_ratio):
+            accepted += 1
+            low.species, high.species = high.species, low.species
+            low.sro, high.sro = high.sro, low.sro
+            low.objective, high.objective = high.objective, low.objective
+            low.gap_metrics, high.gap_metrics = high.gap_metrics, low.gap_metrics
+    return attempted, accepted
+
+
+def _run_parallel_chains(
+    problem: _RSSProblem,
+    chains: List[_MetropolisChain],
+    max_steps: int,
+    exchange_interval: int,
+    processes: int,
+    exchange_rng: Optional[random.Random],
+    progress_bar=None,
+) -> Dict[str, int]:
+    """
+    Advance all chains across a process pool. Independent chains run their
+    max_steps in one job each. With an exchange_rng the chains form a
+    parallel-tempering ladder advanced in segments of exchange_interval steps
+    with replica exchanges in between; the ladder stops once its best objective
+    has not improved for ``problem.patience`` steps.
+    """
+    ladder = exchange_rng is not None
+    chain_patience = None if ladder else problem.patience
+    stats = {"exchange_attempted": 0, "exchange_accepted": 0}
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initializer=_init_chain_worker, initargs=(problem,))
+    try:
+        if not ladder:
+            # no exchanges: avoid re-pickling chains and rebuilding their SRO counts per segment
+            def run_serial():
+                for chain in chains:
+                    chain.run(problem, max_steps, patience=chain_patience)
+                    yield chain
+
+            if pool is None:
+                finished = run_serial()
+            else:
+                finished = pool.imap(_run_chain_segment, [(chain, max_steps, chain_patience) for chain in chains])
+            for idx, chain in enumerate(finished):
+                chains[idx] = chain
+                if progress_bar is not None:
+                    progress_bar.update(max_steps)
+                    progress_bar.set_postfix(
+                        {"best_rmse": f"{min(c.best_gap_metrics['rmse'] for c in chains[: idx + 1]):.4f}"},
+                        refresh=False,
+                    )
+            return stats
+        done = 0
+        exchange_round = 0
+        best_objective = min(chain.best_objective for chain in chains)
+        last_improve = 0
+        while done < max_steps and not all(chain.finished for chain in chains):
+            n_steps = min(exchange_interval, max_steps - done)
+            if pool is None:
+                for chain in chains:
+                    chain.run(problem, n_steps, patience=chain_patience)
+            else:
+                chains[:] = pool.map(_run_chain_segment, [(chain, n_steps, chain_patience) for chain in chains])
+            done += n_steps
+            if progress_bar is not None:
+                progress_bar.update(n_steps * len(chains))
+                progress_bar.set_postfix(
+                    {"best_rmse": f"{min(c.best_gap_metrics['rmse'] for c in chains):.4f}"},
+                    refresh=False,
+                )
+            attempted, accepted = _exchange_replicas(chains, exchange_round, exchange_rng)
+            exchange_round += 1
+            stats["exchange_attempted"] += attempted
+            stats["exchange_accepted"] += accepted
+            segment_best = min(chain.best_objective for chain in chains)
+            if segment_best + problem.tol < best_objective:
+                best_objective = segment_best
+                last_improve = done
+            if problem.patience is not None and done - last_improve >= problem.patience:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return stats
+
+
 def generate_rss(
     structure,
     compositions,
@@ -538,11 +978,18 @@ def generate_rss(
     patience=None,
     ratio_precision=None,
     return_metadata=False,
+    num_chains=1,
+    temperatures=None,
+    exchange_interval=100,
+    processes=None,
 ):
     """Generate a random solid solution structure with optional SRO targeting.
 
     Parameters follow the APEX RSS contract: composition control by sublattice,
     shell-based Warren-Cowley targets, and swap-based Metropolis optimization.
+    ``num_chains`` > 1 runs independent chains and ``temperatures`` a
+    parallel-tempering ladder (one replica per temperature, exchanged every
+    ``exchange_interval`` steps), both across a pool of ``processes`` workers.
     """ 
     if not isinstance(structure, Structure):
         raise RSSInputError("structure must be a pymatgen.core.Structure")
@@ -568,6 +1015,19 @@ def generate_rss(
         ratio_precision = int(ratio_precision)
         if ratio_precision < 0:
             raise RSSInputError("ratio_precision must be a non-negative integer or None")
+    num_chains = int(num_chains)
+    if num_chains <= 0:
+        raise RSSInputError("num_chains must be a positive integer")
+    if temperatures is not None:
+        if not temperatures or any(float(t) < 0 for t in temperatures):
+            raise RSSInputError("temperatures must be a non-empty list of non-negative values")
+        if num_chains not in (1, len(temperatures)):
+            raise RSSInputError("num_chains must match the length of temperatures")
+    exchange_interval = int(exchange_interval)
+    if exchange_interval <= 0:
+        raise RSSInputError("exchange_interval must be a positive integer")
+    if processes is not None and int(processes) <= 0:
+        raise RSSInputError("processes must be a positive integer or None")
 
     rng = random.Random(seed)
     parent = structure.copy()
@@ -610,8 +1070,8 @@ def generate_rss(
         if not cutoffs:
             raise RSSInputError("shell_cutoffs must be non-empty when provided")
 
-    shell_pairs = _build_neighbor_shells(parent, cutoffs)
-    if all(len(pairs) == 0 for pairs in shell_pairs.values()):
+    shells = _build_neighbor_shells(parent, cutoffs)
+    if all(shell.num_bonds == 0 for shell in shells.values()):
         raise RSSInputError("No neighbor pairs found within shell_cutoffs")
 
     all_species = sorted(
@@ -633,89 +1093,60 @@ def generate_rss(
     )
 
     weights = _normalize_shell_weights(cutoffs, shell_weights)
-
-    def _evaluate_species(species_snapshot):
-        composition_fractions = _composition_fractions_from_state(species_snapshot)
-        sro = _compute_warren_cowley_sro(
-            species_snapshot,
-            shell_pairs,
-            target_pair_keys,
-            composition_fractions,
-        )
-        objective = _objective_function(sro, target_sro, weights)
-        gap_metrics = _sro_gap_metrics(sro, target_sro, weights)
-        return sro, objective, gap_metrics
-
-    current_sro, current_objective, current_gap_metrics = _evaluate_species(
-        state_species
+    problem = _RSSProblem(
+        sub_map=sub_map,
+        shells=shells,
+        target_sro=target_sro,
+        target_pair_keys=target_pair_keys,
+        weights=weights,
+        tol=tol,
+        interval=interval,
+        patience=patience,
+        num_configs=num_configs,
     )
-    initial_objective = float(current_objective)
-    initial_gap_metrics = dict(current_gap_metrics)
-
-    best_species = list(state_species)
-    best_sro = current_sro
-    best_objective = current_objective
-    best_gap_metrics = dict(current_gap_metrics)
-
-    accepted_moves = 0
-    attempted_moves = 0
-    last_improve_step = 0
-    sampled_cache = []
-    sampled_cache_index = {}
     near_target_threshold = max(5.0 * tol, 1e-2)
 
-    def _store_sample(species_snapshot, step_value, rmse_value):
-        key = tuple(species_snapshot)
-        existing_index = sampled_cache_index.get(key)
-        entry = {
-            "species": list(species_snapshot),
-            "step": int(step_value),
-            "rmse": float(rmse_value),
-        }
-
-        if existing_index is not None:
-            existing_entry = sampled_cache[existing_index]
-            if (
-                entry["rmse"] < existing_entry["rmse"] - 1e-12
-                or (
-                    abs(entry["rmse"] - existing_entry["rmse"]) <= 1e-12
-                    and entry["step"] < existing_entry["step"]
+    if temperatures is None:
+        ladder = [temperature] * num_chains
+    else:
+        ladder = [float(t) for t in temperatures]
+    parallel = len(ladder) > 1
+    parallel_metadata = None
+
+    if not parallel:
+        chains = [_MetropolisChain(problem, state_species, ladder[0], rng)]
+        chain = chains[0]
+        if num_configs > 1 and max_steps == 0:
+            chain.samples.add(state_species, 0, float(chain.gap_metrics["rmse"]))
+            for _ in range(num_configs - 1):
+                candidate_species = [str(site.specie) for site in parent.sites]
+                for sub_name, indices in sub_map.items():
+                    _assign_initial_species(
+                        candidate_species,
+                        indices,
+                        composition_counts[sub_name],
+                        rng,
+                    )
+                candidate_sro, candidate_objective, candidate_gap_metrics = (
+                    problem.evaluate(candidate_species)
                 )
-            ):
-                sampled_cache[existing_index] = entry
-            else:
-                return
-        else:
-            sampled_cache.append(entry)
-
-        sampled_cache.sort(key=lambda item: (item["rmse"], item["step"]))
-        if len(sampled_cache) > num_configs:
-            removed_entry = sampled_cache.pop()
-            sampled_cache_index.pop(tuple(removed_entry["species"]), None)
-        sampled_cache_index.clear()
-        for index, cached_entry in enumerate(sampled_cache):
-            sampled_cache_index[tuple(cached_entry["species"])] = index
-
-    if num_configs > 1 and max_steps == 0:
-        _store_sample(state_species, 0, float(current_gap_metrics["rmse"]))
-        for _ in range(num_configs - 1):
-            candidate_species = [str(site.specie) for site in parent.sites]
-            for sub_name, indices in sub_map.items():
-                _assign_initial_species(
-                    candidate_species,
-                    indices,
-                    composition_counts[sub_name],
-                    rng,
+                chain.samples.add(candidate_species, 0, float(candidate_gap_metrics["rmse"]))
+                chain.consider_best(
+                    candidate_species, candidate_sro, candidate_objective, candidate_gap_metrics, tol
                 )
-            candidate_sro, candidate_objective, candidate_gap_metrics = (
-                _evaluate_species(candidate_species)
-            )
-            _store_sample(candidate_species, 0, float(candidate_gap_metrics["rmse"]))
-            if candidate_objective + tol < best_objective:
-                best_objective = candidate_objective
-                best_sro = candidate_sro
-                best_species = list(candidate_species)
-                best_gap_metrics = dict(candidate_gap_metrics)
+    else:
+        # every chain gets its own seed and starting decoration
+        seeds = _chain_seeds(seed, len(ladder))
+        chains = []
+        for chain_seed, chain_temperature in zip(seeds, ladder):
+            chain_rng = random.Random(chain_seed)
+            chain_species = [str(site.specie) for site in parent.sites]
+            for sub_name, indices in sub_map.items():
+                _assign_initial_species(chain_species, indices, composition_counts[sub_name], chain_rng)
+            chain = _MetropolisChain(problem, chain_species, chain_temperature, chain_rng)
+            if num_configs > 1 and max_steps == 0:
+                chain.samples.add(chain_species, 0, float(chain.gap_metrics["rmse"]))
+            chains.append(chain)
 
     progress_bar = None
     if show_progress:
@@ -726,76 +1157,66 @@ def generate_rss(
             )
         else:
             progress_bar = tqdm(
-                total=max_steps,
+                total=max_steps * len(chains),
                 desc="RSS sampling",
                 unit="step",
                 dynamic_ncols=True,
             )
             progress_bar.set_postfix(
                 {
-                    "gap_rmse": f"{current_gap_metrics['rmse']:.4f}",
-                    "best_rmse": f"{best_gap_metrics['rmse']:.4f}",
+                    "gap_rmse": f"{chains[0].gap_metrics['rmse']:.4f}",
+                    "best_rmse": f"{chains[0].best_gap_metrics['rmse']:.4f}",
                 }
             )
 
-    for step in range(1, max_steps + 1):
-        proposal = _pick_swap(state_species, sub_map, rng)
-        if proposal is None:
-            break
-
-        i, j = proposal
-        attempted_moves += 1
-        state_species[i], state_species[j] = state_species[j], state_species[i]
-
-        trial_sro, trial_objective, trial_gap_metrics = _evaluate_species(
-            state_species
+    if not parallel:
+        chains[0].run(problem, max_steps, patience=patience, progress_bar=progress_bar)
+    else:
+        if processes is None:
+            processes = min(len(chains), multiprocessing.cpu_count())
+        exchange_rng = random.Random(seeds[-1]) if temperatures is not None else None
+        exchange_stats = _run_parallel_chains(
+            problem,
+            chains,
+            max_steps,
+            exchange_interval,
+            max(1, min(int(processes), len(chains))),
+            exchange_rng,
+            progress_bar=progress_bar,
         )
-        delta = trial_objective - current_objective
-
-        accept = False
-        if delta <= 0:
-            accept = True
-        elif temperature > 0:
-            threshold = math.exp(-delta / max(temperature, 1e-12))
-            accept = rng.random() < threshold
-
-        if accept:
-            accepted_moves += 1
-            current_sro = trial_sro
-            current_objective = trial_objective
-            current_gap_metrics = trial_gap_metrics
-            if trial_objective + tol < best_objective:
-                best_objective = trial_objective
-                best_sro = trial_sro
-                best_species = list(state_species)
-                best_gap_metrics = dict(current_gap_metrics)
-                last_improve_step = step
-        else:
-            state_species[i], state_species[j] = state_species[j], state_species[i]
-
-        if step % interval == 0:
-            _store_sample(
-                state_species,
-                step,
-                float(current_gap_metrics["rmse"]),
-            )
-
-        if progress_bar is not None:
-            progress_bar.update(1)
-            progress_bar.set_postfix(
-                {
-                    "gap_rmse": f"{current_gap_metrics['rmse']:.4f}",
-                    "best_rmse": f"{best_gap_metrics['rmse']:.4f}",
-                },
-                refresh=False,
-            )
-
-        if patience is not None and step - last_improve_step >= patience and step >= patience:
-            break
+        parallel_metadata = {
+            "mode": "parallel_tempering" if exchange_rng is not None else "independent",
+            "seeds": seeds[:len(chains)],
+            "temperatures": ladder,
+            "exchange_interval": exchange_interval,
+            "chain_best_objectives": [float(c.best_objective) for c in chains],
+            "chain_acceptance_ratios": [
+                float(c.accepted_moves / c.attempted_moves) if c.attempted_moves else 0.0
+                for c in chains
+            ],
+        }
+        if exchange_rng is not None:
+            parallel_metadata.update(exchange_stats)
 
     if progress_bar is not None:
         progress_bar.close()
 
+    best_chain = min(chains, key=lambda c: c.best_objective)
+    best_species = best_chain.best_species
+    best_sro = best_chain.best_sro
+    best_objective = best_chain.best_objective
+    best_gap_metrics = best_chain.best_gap_metrics
+    current_objective = best_chain.objective
+    current_gap_metrics = best_chain.gap_metrics
+    initial_objective = best_chain.initial_objective
+    initial_gap_metrics = best_chain.initial_gap_metrics
+    accepted_moves = sum(c.accepted_moves for c in chains)
+    attempted_moves = sum(c.attempted_moves for c in chains)
+    samples = _SampleStore(num_configs)
+    for chain in chains:
+        samples.merge(chain.samples)
+    sampled_cache = samples.entries
+
     if num_configs == 1:
         decorated = _reconstruct_structure(parent, best_species)
     else:
@@ -858,6 +1279,8 @@ def generate_rss(
             "patience": patience,
         },
     }
+    if parallel_metadata is not None:
+        metadata["parallel"] = parallel_metadata
 
     if return_metadata:
         return decorated, metadata
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import pymatgen
+from monty.serialization import dumpfn, loadfn
+from pymatgen.core.surface import SlabGenerator, generate_all_slabs
+from apex.core.lib.task_cache import TaskCache
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+# slabs of a cache entry
+SLAB_FILE = "slabs.json"
+
+# slabs generated in this process, shared by every property
+_SLAB_MEMO = {}
+
+
+def structure_digest(structure) -> str:
+    """
+    Content address of a structure: lattice, species and fractional
+    coordinates rounded to 1e-8.
+    """
+    def _fmt(values):
+        return " ".join("%.8f" % (float(ii) + 0.0) for ii in values)
+
+    h = hashlib.sha256()
+    h.update(f"lattice={_fmt(structure.lattice.matrix.ravel())}\n".encode())
+    for site in structure:
+        h.update(f"{site.species_string} {_fmt(site.frac_coords)}\n".encode())
+    return h.hexdigest()
+
+
+def slab_digest(structure, method, settings) -> str:
+    """
+    Content address of a slab enumeration: the bulk structure, the generating
+    function and its settings (Miller index, slab and vacuum sizes, termination
+    tolerances) and the pymatgen version.
+    """
+    payload = {
+        "structure": structure_digest(structure),
+        "method": method,
+        "settings": settings,
+        "pymatgen": getattr(pymatgen, "__version__", ""),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SlabCache(TaskCache):
+    """
+    On-disk store of generated slabs addressed by ``slab_digest``, shared by
+    Surface, Decohesive, Gamma and GammaSurface. It is enabled by the
+    ``slab_cache_dir`` property parameter.
+    """
+
+    @classmethod
+    def from_parameter(cls, parameter):
+        root = (parameter or {}).get("slab_cache_dir")
+        return cls(os.path.abspath(os.path.expanduser(root))) if root else None
+
+    def load_slabs(self, digest):
+        """
+        Cached slabs of digest, None on a cache miss.
+        """
+        if not self.contains(digest):
+            return None
+        slabs = loadfn(os.path.join(self.entry_path(digest), SLAB_FILE))
+        for slab in slabs:
+            slab.miller_index = tuple(slab.miller_index)
+        return slabs
+
+    def store_slabs(self, digest, slabs) -> bool:
+        """
+        Save slabs under digest; False when the entry exists.
+        """
+        if self.contains(digest):
+            return False
+        tmp = tempfile.mkdtemp()
+        try:
+            dumpfn(slabs, os.path.join(tmp, SLAB_FILE))
+            return self.store(digest, tmp, [SLAB_FILE])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _cached_slabs(structure, method, settings, build, cache):
+    digest = slab_digest(structure, method, settings)
+    slabs = _SLAB_MEMO.get(digest)
+    if slabs is None and cache is not None:
+        slabs = cache.load_slabs(digest)
+        if slabs is not None:
+            print(f"Reuse cached slabs (slab cache {digest[:12]})")
+    if slabs is None:
+        slabs = build()
+        if cache is not None:
+            cache.store_slabs(digest, slabs)
+    _SLAB_MEMO[digest] = slabs
+    # callers modify the slabs they get
+    return [slab.copy() for slab in slabs]
+
+
+def get_slabs(structure, miller_index, min_slab_size, min_vacuum_size=0, ftol=0.001,
+              cache=None, **generator_kwargs):
+    """
+    ``SlabGenerator(structure, miller_index, ...).get_slabs(ftol=ftol)``,
+    reused from this process or from cache when the same slabs were made before.
+    """
+    settings = dict(
+        generator_kwargs,
+        miller_index=[int(ii) for ii in miller_index],
+        min_slab_size=float(min_slab_size),
+        min_vacuum_size=float(min_vacuum_size),
+        ftol=float(ftol),
+    )
+
+    def build():
+        generator = SlabGenerator(
+            structure,
+            miller_index=miller_index,
+            min_slab_size=min_slab_size,
+            min_vacuum_size=min_vacuum_size,
+            **generator_kwargs,
+        )
+        return generator.get_slabs(ftol=ftol)
+
+    return _cached_slabs(structure, "SlabGenerator.get_slabs", settings, build, cache)
+
+
+def get_all_slabs(structure, max_index, min_slab_size, min_vacuum_size, cache=None):
+    """
+    ``generate_all_slabs(structure, max_index, min_slab_size, min_vacuum_size)``,
+    reused from this process or from cache when the same slabs were made before.
+    """
+    settings = {
+        "max_index": int(max_index),
+        "min_slab_size": float(min_slab_size),
+        "min_vacuum_size": float(min_vacuum_size),
+    }
+
+    def build():
+        return generate_all_slabs(structure, max_index, min_slab_size, min_vacuum_size)
+
+    return _cached_slabs(structure, "generate_all_slabs", settings, build, cache)
@@ -0,0 +1,193 @@
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+
+from monty.serialization import dumpfn
+from apex.core.lib.util import task_finished
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+# environment variable pointing to a mounted cache directory (used by RunLAMMPS)
+TASK_CACHE_ENV = "APEX_TASK_CACHE"
+CACHE_META = "cache_meta.json"
+
+_DIGEST_CACHE = {}
+
+
+def task_cache_root(mdata=None):
+    """
+    Cache directory from ``task_cache_dir`` in mdata, else from $APEX_TASK_CACHE;
+    None if the cache is disabled.
+    """
+    root = (mdata or {}).get("task_cache_dir") or os.environ.get(TASK_CACHE_ENV)
+    return os.path.abspath(os.path.expanduser(root)) if root else None
+
+
+def file_digest(path) -> str:
+    """
+    sha256 of a file, cached on (mtime, size) so shared potential files are hashed once.
+    Text files are normalized (line endings and trailing whitespace) before hashing.
+    """
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _DIGEST_CACHE.get(real)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(real, "rb") as fp:
+        data = fp.read()
+    try:
+        text = data.decode()
+    except UnicodeDecodeError:
+        digest = hashlib.sha256(data).hexdigest()
+    else:
+        lines = [line.rstrip() for line in text.splitlines()]
+        while lines and not lines[-1]:
+            lines.pop()
+        digest = hashlib.sha256("\n".join(lines).encode()).hexdigest()
+    _DIGEST_CACHE[real] = (stamp, digest)
+    return digest
+
+
+def _resolve_input(task_dir, name):
+    # common files may live in the work path above the task directory
+    for base in [task_dir, os.path.dirname(os.path.abspath(task_dir))]:
+        path = os.path.join(base, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def task_digest(task_dir, input_files, calculator="", command="") -> str:
+    """
+    Content address of a task: the calculator type, the run command and
+    the contents of every input file (directories are hashed recursively).
+    """
+    h = hashlib.sha256()
+    h.update(f"calculator={calculator}\ncommand={(command or '').strip()}\n".encode())
+    for name in sorted(set(input_files)):
+        path = _resolve_input(task_dir, name)
+        if path is None:
+            h.update(f"{name}:missing\n".encode())
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path, followlinks=True):
+                dirs.sort()
+                for ff in sorted(files):
+                    sub = os.path.join(root, ff)
+                    rel = os.path.relpath(sub, path)
+                    h.update(f"{name}/{rel}:{file_digest(sub)}\n".encode())
+        else:
+            h.update(f"{name}:{file_digest(path)}\n".encode())
+    return h.hexdigest()
+
+
+def task_io_files(calculator, inter_type, property_type="relaxation"):
+    """
+    Input files addressing a task and output files stored for it.
+    """
+    input_files = ["POSCAR"] + calculator.forward_files(property_type) + calculator.forward_common_files(property_type)
+    output_files = ["outlog"] + calculator.backward_files(property_type)
+    if inter_type == "abacus":
+        output_files.append("OUT.ABACUS")
+    return input_files, output_files
+
+
+class TaskCache:
+    """
+    On-disk store of finished task outputs addressed by ``task_digest``.
+    Entries are written to a temporary directory and renamed into place,
+    so concurrent writers never expose partial entries.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def contains(self, digest) -> bool:
+        return os.path.isfile(os.path.join(self.entry_path(digest), CACHE_META))
+
+    def restore(self, digest, task_dir) -> bool:
+        """
+        Copy the cached outputs into task_dir; False on a cache miss.
+        """
+        if not self.contains(digest):
+            return False
+        entry = self.entry_path(digest)
+        for name in os.listdir(entry):
+            if name == CACHE_META:
+                continue
+            src = os.path.join(entry, name)
+            dst = os.path.join(task_dir, name)
+            if os.path.isdir(dst) and not os.path.islink(dst):
+                shutil.rmtree(dst)
+            elif os.path.lexists(dst):
+                os.remove(dst)
+            if os.path.isdir(src):
+                shutil.copytree(src, dst)
+            else:
+                shutil.copy2(src, dst)
+        return True
+
+    def store(self, digest, task_dir, output_files) -> bool:
+        """
+        Save the outputs of a finished task; existing entries are kept.
+        """
+        if self.contains(digest):
+            return False
+        entry = self.entry_path(digest)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = "%s.tmp%s" % (entry, uuid.uuid4().hex)
+        os.makedirs(tmp)
+        try:
+            stored = []
+            for pattern in output_files:
+                for src in sorted(glob.glob(os.path.join(task_dir, pattern))):
+                    name = os.path.basename(src)
+                    if name in stored:
+                        continue
+                    if os.path.isdir(src):
+                        shutil.copytree(src, os.path.join(tmp, name))
+                    else:
+                        shutil.copy2(src, os.path.join(tmp, name))
+                    stored.append(name)
+            dumpfn({"digest": digest, "source": os.path.abspath(task_dir), "files": stored},
+                   os.path.join(tmp, CACHE_META), indent=4)
+            os.rename(tmp, entry)
+        except OSError as exc:
+            # another process stored the same entry first
+            logging.debug(f"task cache entry {digest} not stored: {exc}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        return True
+
+
+def restore_cached_tasks(cache, all_task, input_files, inter_type, command):
+    """
+    Materialize cached outputs into every task with a cache hit.
+    Return the tasks still to be run and the digests of those tasks.
+    """
+    run_task = []
+    digests = {}
+    for task in all_task:
+        digest = task_digest(task, input_files, calculator=inter_type, command=command)
+        if cache.restore(digest, task):
+            print(f"Reuse cached outputs for {task} (task cache {digest[:12]})")
+        else:
+            run_task.append(task)
+            digests[task] = digest
+    return run_task, digests
+
+
+def store_finished_tasks(cache, digests, output_files, inter_type):
+    """
+    Store the outputs of every task in digests that has finished.
+    """
+    for task, digest in digests.items():
+        if task_finished(task, inter_type):
+            cache.store(digest, task, output_files)
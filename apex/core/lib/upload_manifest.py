@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import shutil
+
+from dflow.python import upload_packages
+upload_packages.append(__file__)
+
+MANIFEST_NAME = "manifest.json"
+BLOB_DIR = "blobs"
+# per work directory record of the blobs already uploaded as the base artifact
+UPLOAD_INDEX = ".apex_upload_index.json"
+
+
+def _sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_manifest(root) -> dict:
+    """
+    Content-addressed description of a directory tree:
+    ``{relpath: {"sha256": ..., "size": ...}}`` for files,
+    ``{"link": target}`` for symlinks and ``{"dir": True}`` for directories.
+    """
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in dirnames + sorted(filenames):
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root)
+            if os.path.islink(path):
+                manifest[rel] = {"link": os.readlink(path)}
+            elif os.path.isdir(path):
+                manifest[rel] = {"dir": True}
+            else:
+                manifest[rel] = {"sha256": _sha256(path), "size": os.path.getsize(path)}
+    return manifest
+
+
+def manifest_blobs(manifest) -> dict:
+    """
+    ``{digest: (size, relpath)}`` of every distinct file content in a manifest.
+    """
+    blobs = {}
+    for rel, entry in manifest.items():
+        if "sha256" in entry:
+            blobs.setdefault(entry["sha256"], (entry["size"], rel))
+    return blobs
+
+
+def write_pack(root, manifest, pack_dir, digests) -> None:
+    """
+    Write the manifest and the blobs listed in digests into pack_dir.
+    Blobs are hardlinked from root when possible.
+    """
+    blob_dir = os.path.join(pack_dir, BLOB_DIR)
+    os.makedirs(blob_dir, exist_ok=True)
+    blobs = manifest_blobs(manifest)
+    for digest in digests:
+        src = os.path.join(root, blobs[digest][1])
+        dst = os.path.join(blob_dir, digest)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+    with open(os.path.join(pack_dir, MANIFEST_NAME), "w") as fp:
+        json.dump(manifest, fp, indent=1, sort_keys=True)
+
+
+def restore_tree(pack_dir, base_dirs, target) -> None:
+    """
+    Rebuild the tree described by the manifest of pack_dir in target,
+    taking every blob from pack_dir or from the first base directory holding it.
+    """
+    with open(os.path.join(pack_dir, MANIFEST_NAME)) as fp:
+        manifest = json.load(fp)
+    sources = [pack_dir] + [ii for ii in base_dirs if ii]
+    os.makedirs(target, exist_ok=True)
+    for rel in sorted(manifest):
+        entry = manifest[rel]
+        path = os.path.join(target, rel)
+        if "dir" in entry:
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if "link" in entry:
+            os.symlink(entry["link"], path)
+            continue
+        for source in sources:
+            blob = os.path.join(source, BLOB_DIR, entry["sha256"])
+            if os.path.isfile(blob):
+                shutil.copy(blob, path)
+                break
+        else:
+            raise FileNotFoundError(f"blob {entry['sha256']} of {rel} is missing from the upload")
+
+
+def load_upload_index(work_dir, repository) -> dict:
+    """
+    Blobs of the base artifact uploaded earlier from work_dir to the same artifact repository.
+    """
+    index_file = os.path.join(work_dir, UPLOAD_INDEX)
+    if not os.path.isfile(index_file):
+        return {}
+    try:
+        with open(index_file) as fp:
+            index = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    if index.get("repository") != repository:
+        return {}
+    return index
+
+
+def dump_upload_index(work_dir, repository, artifact, digests) -> None:
+    index = {"repository": repository, "artifact": artifact, "digests": sorted(digests)}
+    with open(os.path.join(work_dir, UPLOAD_INDEX), "w") as fp:
+        json.dump(index, fp, indent=1)
@@ -1,3 +1,4 @@
+import json
 import os
 import re
 
@@ -11,6 +12,86 @@ from dflow.python import upload_packages
 upload_packages.append(__file__)
 
 
+def rfind_in_file(fp, marker, block_size=1 << 16, max_bytes=None):
+    """
+    offset of the last occurrence of marker (bytes) in a binary file object,
+    scanning backwards from the end in fixed-size blocks; -1 if not found.
+    With max_bytes only the last max_bytes of the file are searched.
+    """
+    fp.seek(0, os.SEEK_END)
+    end = fp.tell()
+    stop = 0 if max_bytes is None else max(0, end - max_bytes)
+    tail = b""
+    while end > stop:
+        start = max(stop, end - block_size)
+        fp.seek(start)
+        # keep the head of the later block so markers across blocks are found
+        chunk = fp.read(end - start) + tail
+        idx = chunk.rfind(marker)
+        if idx != -1:
+            return start + idx
+        tail = chunk[:len(marker) - 1]
+        end = start
+    return -1
+
+
+_FINISHED_CACHE = {}
+# completion markers are among the last lines, only this tail of a file is searched
+FINISHED_TAIL_BYTES = 4 << 16
+# per-directory record of marker searches, kept across processes
+FINISHED_SIDECAR = ".apex_finished.json"
+
+
+def _read_finished_sidecar(sidecar):
+    try:
+        with open(sidecar) as fp:
+            records = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    return records if isinstance(records, dict) else {}
+
+
+def _write_finished_sidecar(sidecar, records):
+    tmp = "%s.%d.tmp" % (sidecar, os.getpid())
+    try:
+        with open(tmp, "w") as fp:
+            json.dump(records, fp)
+        os.replace(tmp, sidecar)
+    except OSError:
+        # a read-only task directory only loses the cache
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def file_contains_marker(fname, marker):
+    """
+    whether the last FINISHED_TAIL_BYTES of fname contain marker, since
+    completion markers are written last.
+    Results are cached on (path, mtime, size) in memory and in a sidecar file
+    next to fname, so unchanged files are not re-read by later runs either.
+    """
+    fname = os.path.abspath(fname)
+    st = os.stat(fname)
+    key = (fname, marker)
+    stamp = [st.st_mtime_ns, st.st_size]
+    cached = _FINISHED_CACHE.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    sidecar = os.path.join(os.path.dirname(fname), FINISHED_SIDECAR)
+    records = _read_finished_sidecar(sidecar)
+    record_key = os.path.basename(fname) + "\n" + marker
+    record = records.get(record_key)
+    if isinstance(record, list) and len(record) == 3 and record[:2] == stamp:
+        found = bool(record[2])
+    else:
+        with open(fname, "rb") as fp:
+            found = rfind_in_file(fp, marker.encode(), max_bytes=FINISHED_TAIL_BYTES) != -1
+        records[record_key] = stamp + [found]
+        _write_finished_sidecar(sidecar, records)
+    _FINISHED_CACHE[key] = (stamp, found)
+    return found
+
+
 def voigt_to_stress(inpt):
     ret = np.zeros((3, 3))
     ret[0][0] = inpt[0]
@@ -93,26 +174,25 @@ def get_machine_info(mdata, task_type):
     return machine, resources, command, group_size
 
 
-def collect_task(all_task, task_type):
-
+def _finished_checker(task_type):
     if task_type == "vasp":
-        output_file = "OUTCAR"
-        check_finished = vasp_utils.check_finished
+        return "OUTCAR", vasp_utils.check_finished
     elif task_type in lammps_task_type:
-        output_file = "log.lammps"
-        check_finished = lammps_utils.check_finished
+        return "log.lammps", lammps_utils.check_finished
     elif task_type == "abacus":
-        output_file = "OUT.ABACUS/running_relax.log"
-        check_finished = abacus_utils.check_finished
-
-    run_tasks_ = []
-    for ii in all_task:
-        fres = os.path.join(ii, output_file)
-        if os.path.isfile(fres):
-            if not check_finished(fres):
-                run_tasks_.append(ii)
-        else:
-            run_tasks_.append(ii)
+        return "OUT.ABACUS/running_relax.log", abacus_utils.check_finished
+    raise RuntimeError(f"unknown task type {task_type}")
+
+
+def task_finished(task_dir, task_type) -> bool:
+    output_file, check_finished = _finished_checker(task_type)
+    fres = os.path.join(task_dir, output_file)
+    return os.path.isfile(fres) and check_finished(fres)
+
+
+def collect_task(all_task, task_type):
+
+    run_tasks_ = [ii for ii in all_task if not task_finished(ii, task_type)]
 
     run_tasks = [os.path.basename(ii) for ii in run_tasks_]
     return run_tasks
@@ -104,6 +104,7 @@ class Cohesive(Property):
                 self.init_from_suffix,
                 path_to_work,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
             return task_list
 
@@ -244,6 +245,7 @@ class Cohesive(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         with open(output_file, "w") as fp:
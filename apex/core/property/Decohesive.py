@@ -9,10 +9,10 @@ import dpdata
 import numpy as np
 from monty.serialization import dumpfn, loadfn
 from pymatgen.core.structure import Structure
-from pymatgen.core.surface import SlabGenerator
 
 from apex.core.calculator.lib import abacus_utils
 from apex.core.calculator.lib import vasp_utils
+from apex.core.lib.slab_cache import SlabCache, get_slabs
 from apex.core.property.Property import Property
 from apex.core.reproduce import make_repro, post_repro
 from dflow.python import upload_packages
@@ -54,6 +54,7 @@ class Decohesive(Property):
         self.cal_setting = parameter["cal_setting"]
         self.parameter = parameter
         self.inter_param = inter_param or {"type": "vasp"}
+        self.slab_cache = SlabCache.from_parameter(parameter)
 
     def make_confs(self, path_to_work: str, path_to_equi: str, refine: bool = False):
         """Generate slab tasks with different vacuum sizes or reproduce prior runs."""
@@ -111,6 +112,7 @@ class Decohesive(Property):
             self.init_from_suffix,
             path_to_work,
             self.parameter.get("reprod_last_frame", True),
+            self.parameter.get("reprod_trajectory", False),
         )
 
     def _load_equilibrium(self, path_to_equi: str):
@@ -199,6 +201,7 @@ class Decohesive(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
         else:
             param_path = os.path.join(os.path.dirname(output_file), "param.json")
@@ -238,18 +241,20 @@ class Decohesive(Property):
         self, structure: Structure, plane_miller, slab_size, vacuum_size
     ) -> Structure:
         """Create a slab and stretch c-axis to add vacuum."""
-        slab_generator = SlabGenerator(
+        # the same slab for every vacuum size, generated once
+        slabs_pmg = get_slabs(
             structure,
-            miller_index=plane_miller,
-            min_slab_size=slab_size,
+            plane_miller,
+            slab_size,
             min_vacuum_size=0,
+            ftol=0.001,
+            cache=self.slab_cache,
             center_slab=True,
             in_unit_planes=False,
             lll_reduce=True,
             reorient_lattice=False,
             primitive=False,
         )
-        slabs_pmg = slab_generator.get_slabs(ftol=0.001)
         slab = next((s for s in slabs_pmg if s.miller_index == plane_miller), None)
         if slab is None:
             raise RuntimeError(f"No slab found for Miller index {plane_miller}")
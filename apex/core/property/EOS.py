@@ -9,6 +9,7 @@ from monty.serialization import dumpfn, loadfn
 from apex.core.calculator.lib import abacus_utils
 from apex.core.calculator.lib import vasp_utils
 from apex.core.calculator.lib import abacus_scf
+from apex.core.lib.mfp_eosfit import BATCH_EOS_MODELS, fit_eos_batch
 from apex.core.property.Property import Property
 from apex.core.refine import make_refine
 from apex.core.reproduce import make_repro, post_repro
@@ -52,6 +53,16 @@ class EOS(Property):
             self.cal_setting = parameter["cal_setting"]
             parameter["init_from_suffix"] = parameter.get("init_from_suffix", "00")
             self.init_from_suffix = parameter["init_from_suffix"]
+        # opt-in EOS fit of the computed E-V curve: true for every batch model or a list of models
+        eos_fit = parameter.get("eos_fit", False)
+        if eos_fit is True:
+            eos_fit = list(BATCH_EOS_MODELS)
+        elif isinstance(eos_fit, str):
+            eos_fit = [eos_fit]
+        self.eos_fit = list(eos_fit) if eos_fit else []
+        unknown = [name for name in self.eos_fit if name not in BATCH_EOS_MODELS]
+        if unknown:
+            raise ValueError(f"eos_fit models {unknown} are not among {list(BATCH_EOS_MODELS)}")
         self.parameter = parameter
         self.inter_param = inter_param if inter_param != None else {"type": "vasp"}
 
@@ -94,6 +105,7 @@ class EOS(Property):
                 self.init_from_suffix,
                 path_to_work,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         else:
@@ -232,6 +244,8 @@ class EOS(Property):
                     vol,
                     task_result["energies"][-1] / sum(task_result["atom_numbs"]),
                 )
+            if self.eos_fit:
+                ptr_data += self._fit_eos(output_file, res_data)
 
         else:
             if "init_data_path" not in self.parameter:
@@ -243,9 +257,42 @@ class EOS(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         with open(output_file, "w") as fp:
             json.dump(res_data, fp, indent=4)
 
         return res_data, ptr_data
+
+    def _fit_eos(self, output_file, res_data):
+        """
+        Fit the eos_fit models to the E-V points in one batch, write eos_fit.json
+        next to output_file and return the table for the printed result.
+        """
+        if len(res_data) < 5:
+            logging.warning(f"EOS fit skipped: {len(res_data)} volumes, at least 5 are needed")
+            return ""
+        vols = np.array(sorted(res_data), dtype=float)
+        ens = np.array([res_data[vol] for vol in sorted(res_data)], dtype=float)
+        fits = fit_eos_batch([(vols, ens)], self.eos_fit)
+        fit_data = {
+            row["model"]: {
+                "e0": float(row["e0"]),
+                "v0": float(row["v0"]),
+                "B0": float(row["b0_GPa"]),
+                "bp": float(row["bp"]),
+                "bpp": float(row["bpp"]),
+                "rmse": float(row["rmse"]),
+                "converged": bool(row["converged"]),
+            }
+            for row in fits
+        }
+        dumpfn(fit_data, os.path.join(os.path.dirname(output_file), "eos_fit.json"), indent=4)
+        ptr_data = " model      V0(A^3)  E0(eV)   B0(GPa)  B0'     RMSE(eV)\n"
+        for name, fit in fit_data.items():
+            ptr_data += "%-10s %8.3f %8.4f %8.2f %7.3f %9.2e%s\n" % (
+                name, fit["v0"], fit["e0"], fit["B0"], fit["bp"], fit["rmse"],
+                "" if fit["converged"] else "  (not converged)",
+            )
+        return ptr_data
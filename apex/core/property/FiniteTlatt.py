@@ -102,6 +102,7 @@ class FiniteTlatt(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
         else:
             ptr_data += " Temperature(K)  a(A)  b(A)  c(A)\n"
@@ -127,6 +128,7 @@ class FiniteTlatt(Property):
             self.init_from_suffix,
             path_to_work,
             self.parameter.get("reprod_last_frame", True),
+            self.parameter.get("reprod_trajectory", False),
         )
 
     def _make_refine(self, path_to_work: str) -> List[str]:
@@ -8,7 +8,6 @@ import dpdata
 import numpy as np
 from monty.serialization import dumpfn, loadfn
 from pymatgen.core.structure import Structure
-from pymatgen.core.surface import SlabGenerator
 from pymatgen.analysis.diffraction.tem import TEMCalculator
 
 from apex.core.calculator.lib import abacus_utils
@@ -17,6 +16,7 @@ from apex.core.property.Property import Property
 from apex.core.refine import make_refine
 from apex.core.reproduce import make_repro, post_repro
 from apex.core.structure import StructureInfo
+from apex.core.lib.slab_cache import SlabCache, get_slabs
 from apex.core.lib.slab_orientation import SlabSlipSystem
 from apex.core.lib.trans_tools import trans_mat_basis
 from apex.core.lib.trans_tools import (plane_miller_bravais_to_miller,
@@ -78,6 +78,7 @@ class Gamma(Property):
         self.cal_setting = parameter["cal_setting"]
         self.parameter = parameter
         self.inter_param = inter_param if inter_param != None else {"type": "vasp"}
+        self.slab_cache = SlabCache.from_parameter(parameter)
 
     def make_confs(self, path_to_work, path_to_equi, refine=False):
         path_to_work = os.path.abspath(path_to_work)
@@ -117,6 +118,7 @@ class Gamma(Property):
                 self.init_from_suffix,
                 path_to_work,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         else:
@@ -335,12 +337,11 @@ class Gamma(Property):
                                                              [plane_miller])
         slab_size = spacing_dict[plane_miller] * self.supercell_size[2]
         # Generate slab via Pymatgen
-        slabGen = SlabGenerator(structure, miller_index=plane_miller,
-                                min_slab_size=slab_size, min_vacuum_size=0,
-                                center_slab=True, in_unit_planes=False,
-                                lll_reduce=True, reorient_lattice=False,
-                                primitive=False)
-        slabs_pmg = slabGen.get_slabs(ftol=0.001)
+        slabs_pmg = get_slabs(structure, plane_miller, slab_size,
+                              min_vacuum_size=0, ftol=0.001, cache=self.slab_cache,
+                              center_slab=True, in_unit_planes=False,
+                              lll_reduce=True, reorient_lattice=False,
+                              primitive=False)
         slab = [s for s in slabs_pmg if s.miller_index == plane_miller][0]
         # If a transform matrix is passed, reorient the slab
         if trans_matrix.any():
@@ -563,6 +564,7 @@ class Gamma(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         with open(output_file, "w") as fp:
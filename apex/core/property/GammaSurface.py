@@ -9,10 +9,10 @@ import numpy as np
 from monty.serialization import dumpfn, loadfn
 from pymatgen.analysis.diffraction.tem import TEMCalculator
 from pymatgen.core.structure import Structure
-from pymatgen.core.surface import SlabGenerator
 
 from apex.core.calculator.lib import abacus_utils
 from apex.core.calculator.lib import vasp_utils
+from apex.core.lib.slab_cache import SlabCache, get_slabs
 from apex.core.lib.slab_orientation import SlabSlipSystem
 from apex.core.lib.trans_tools import direction_miller_bravais_to_miller
 from apex.core.lib.trans_tools import plane_miller_bravais_to_miller
@@ -85,6 +85,7 @@ class GammaSurface(Property):
         self.cal_setting = parameter["cal_setting"]
         self.parameter = parameter
         self.inter_param = inter_param if inter_param is not None else {"type": "vasp"}
+        self.slab_cache = SlabCache.from_parameter(parameter)
 
     def _resolve_equilibrium_structure(self, path_to_equi):
         if self.inter_param["type"] == "abacus":
@@ -155,6 +156,7 @@ class GammaSurface(Property):
                 self.init_from_suffix,
                 path_to_work,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         else:
@@ -382,18 +384,19 @@ class GammaSurface(Property):
         tem_calc_obj = TEMCalculator()
         spacing_dict = tem_calc_obj.get_interplanar_spacings(self.conv_std_structure, [plane_miller])
         slab_size = spacing_dict[plane_miller] * self.supercell_size[2]
-        slab_gen = SlabGenerator(
+        slabs_pmg = get_slabs(
             structure,
-            miller_index=plane_miller,
-            min_slab_size=slab_size,
+            plane_miller,
+            slab_size,
             min_vacuum_size=0,
+            ftol=0.001,
+            cache=self.slab_cache,
             center_slab=True,
             in_unit_planes=False,
             lll_reduce=True,
             reorient_lattice=False,
             primitive=False,
         )
-        slabs_pmg = slab_gen.get_slabs(ftol=0.001)
         slab = [s for s in slabs_pmg if s.miller_index == plane_miller][0]
         if trans_matrix.any():
             reoriented_lattice_vectors = [trans_matrix.dot(v) for v in slab.lattice.matrix]
@@ -583,6 +586,7 @@ class GammaSurface(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         with open(output_file, "w") as fp:
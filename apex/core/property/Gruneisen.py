@@ -8,15 +8,25 @@ import subprocess
 from typing import Dict, List
 
 import dpdata
+import numpy as np
 from monty.serialization import dumpfn, loadfn
 from pymatgen.core.structure import Structure
 import seekpath
-import yaml
 
 from apex.core.calculator.Lammps import Lammps
 from apex.core.calculator.lib import abacus_utils
 from apex.core.calculator.lib import lammps_utils
 from apex.core.calculator.lib import vasp_utils
+from apex.core.lib.force_constant_cache import (
+    ForceConstantCache,
+    dump_force_constant_key,
+    force_constant_digest,
+    force_constant_displacement_distance,
+    interaction_digest,
+    load_force_constant_key,
+)
+from apex.core.lib.phonon_mesh import load_mesh
+from apex.core.lib.phonopy_driver import PhonopyDriver, resolve_phonopy_backend, write_symmetry_cells
 from apex.core.calculator.calculator import LAMMPS_INTER_TYPE
 from apex.core.property.Property import Property
 from apex.core.property.Phonon import Phonon
@@ -34,6 +44,10 @@ DEFAULT_CAL_SETTING = {
 DEFAULT_SUPERCELL = [2, 2, 2]
 THZ_TO_K = 47.99243073366221
 KB_EV_PER_K = 8.617333262145e-5
+# upper bound of q-point x mode x temperature elements held by the heat capacity kernel at once
+KERNEL_CHUNK_ELEMENTS = 1 << 22
+# per-mode heat capacities and contributions written with mode_detail
+MODE_DETAIL_FILE = "mode_detail.npz"
 
 
 class Gruneisen(Property):
@@ -67,10 +81,16 @@ class Gruneisen(Property):
         self.bulk_modulus_source = parameter["bulk_modulus_source"]
         parameter["eos_model"] = parameter.get("eos_model", "birch_murnaghan")
         self.eos_model = parameter["eos_model"]
+        parameter["mode_detail"] = parameter.get("mode_detail", False)
+        self.mode_detail = parameter["mode_detail"]
         parameter["phonolammps_run_command"] = parameter.get("phonolammps_run_command", None)
         self.phonolammps_run_command = parameter["phonolammps_run_command"]
         parameter["lammps_run_command"] = parameter.get("lammps_run_command", None)
         self.lammps_run_command = parameter["lammps_run_command"]
+        parameter["phonopy_backend"] = parameter.get("phonopy_backend", None)
+        self.phonopy_backend = resolve_phonopy_backend(parameter["phonopy_backend"])
+        parameter["fc_cache_dir"] = parameter.get("fc_cache_dir", None)
+        self.fc_cache = ForceConstantCache.from_parameter(parameter)
         parameter["approach"] = parameter.get("approach", "linear")
         self.approach = parameter["approach"]
         parameter["cal_type"] = parameter.get("cal_type", "static")
@@ -153,6 +173,7 @@ class Gruneisen(Property):
         base_volume = vasp_utils.poscar_vol(equi_contcar)
         cwd = os.getcwd()
         band_payload = self._build_band_payload(equi_contcar)
+        self._dump_force_constant_key(path_to_work, cwd)
 
         try:
             dumpfn(band_payload["band_path"], os.path.join(path_to_work, "band_path.json"), indent=4)
@@ -199,13 +220,15 @@ class Gruneisen(Property):
                     task_counter += 1
 
                     displacement_tasks = []
-                    for displacement_index, poscar_name in enumerate(
-                        sorted(
+                    if self._restore_volume_force_constants(helper_dir, "POSCAR-unitcell"):
+                        poscar_names = []
+                    else:
+                        poscar_names = sorted(
                             path
                             for path in glob.glob(os.path.join(helper_dir, "POSCAR-*"))
                             if os.path.basename(path)[7:].isdigit()
                         )
-                    ):
+                    for displacement_index, poscar_name in enumerate(poscar_names):
                         displacement_task = os.path.join(path_to_work, f"task.{task_counter:06d}")
                         os.makedirs(displacement_task, exist_ok=True)
                         self._create_vasp_displacement_task(
@@ -286,6 +309,7 @@ class Gruneisen(Property):
         cwd = os.getcwd()
         equi_poscar = os.path.join(path_to_work, "_equi_poscar.tmp")
         task_counter = 0
+        self._dump_force_constant_key(path_to_work, cwd)
 
         try:
             dpdata.System(equi_stru, fmt="stru").to("vasp/poscar", equi_poscar)
@@ -328,10 +352,15 @@ class Gruneisen(Property):
                     )
                     if self.PRIMITIVE_AXES:
                         fp.write(f"PRIMITIVE_AXES = {self.PRIMITIVE_AXES}\n")
-                subprocess.check_call(
-                    Phonon.phonopy_setup_command("setting.conf --abacus -d"),
-                    shell=True,
-                )
+                if self.phonopy_backend == "api":
+                    PhonopyDriver.from_unitcell(
+                        "STRU", self.supercell_size, "abacus", self.PRIMITIVE_AXES
+                    ).generate_displacements()
+                else:
+                    subprocess.check_call(
+                        Phonon.phonopy_setup_command("setting.conf --abacus -d"),
+                        shell=True,
+                    )
 
                 displaced_stru_files = sorted(
                     os.path.basename(path)
@@ -352,6 +381,8 @@ class Gruneisen(Property):
                 task_counter += 1
 
                 displacement_tasks = []
+                if self._restore_volume_force_constants(helper_dir, "STRU"):
+                    displaced_stru_files = []
                 for displacement_index, stru_name in enumerate(displaced_stru_files):
                     displacement_task = os.path.join(path_to_work, f"task.{task_counter:06d}")
                     self._create_abacus_gruneisen_task(
@@ -484,7 +515,10 @@ class Gruneisen(Property):
 
     def _prepare_vasp_phonon_task(self) -> None:
         if self.primitive:
-            subprocess.check_call(Phonon.phonopy_setup_command("--symmetry"), shell=True)
+            if self.phonopy_backend == "api":
+                write_symmetry_cells("POSCAR")
+            else:
+                subprocess.check_call(Phonon.phonopy_setup_command("--symmetry"), shell=True)
             if not os.path.isfile("PPOSCAR"):
                 raise FileNotFoundError("PPOSCAR was not created by phonopy --symmetry")
             shutil.copyfile("PPOSCAR", "POSCAR-unitcell")
@@ -492,13 +526,18 @@ class Gruneisen(Property):
         else:
             shutil.copyfile("POSCAR", "POSCAR-unitcell")
 
-        subprocess.check_call(
-            Phonon.phonopy_setup_command(
-                '-d --dim="%s %s %s" -c POSCAR'
-                % (self.supercell_size[0], self.supercell_size[1], self.supercell_size[2])
-            ),
-            shell=True,
-        )
+        if self.phonopy_backend == "api":
+            PhonopyDriver.from_unitcell(
+                "POSCAR", self.supercell_size, "vasp", self.PRIMITIVE_AXES
+            ).generate_displacements()
+        else:
+            subprocess.check_call(
+                Phonon.phonopy_setup_command(
+                    '-d --dim="%s %s %s" -c POSCAR'
+                    % (self.supercell_size[0], self.supercell_size[1], self.supercell_size[2])
+                ),
+                shell=True,
+            )
         if self.approach == "linear":
             if not os.path.isfile("SPOSCAR"):
                 raise FileNotFoundError("SPOSCAR was not created by phonopy")
@@ -582,11 +621,20 @@ class Gruneisen(Property):
                 },
                 "thermal_expansion": thermal_expansion,
                 "mode_gruneisen": sign_only["mode_gruneisen"],
-                "mode_heat_capacity": sign_only["mode_heat_capacity"],
-                "mode_contributions": sign_only["mode_contributions"],
                 "contribution_summary": sign_only["contribution_summary"],
                 "bulk_modulus": bulk_modulus,
             }
+            if self.mode_detail:
+                np.savez_compressed(
+                    os.path.join(work_path, MODE_DETAIL_FILE),
+                    temperatures=np.asarray(self.temperatures, dtype=float),
+                    weights=np.asarray(ref_info["weights"], dtype=float),
+                    omega_ref=np.asarray(ref_info["frequencies"], dtype=float),
+                    gamma=sign_only["gamma"],
+                    cv=sign_only["mode_heat_capacity"],
+                    gamma_cv=sign_only["mode_contributions"],
+                )
+                result["mode_detail_file"] = MODE_DETAIL_FILE
 
             if bulk_modulus is not None:
                 ptr_lines.append("VolumePoint  Strain  FitVolumePerAtom(A^3)  EnergyPerAtom(eV)")
@@ -767,12 +815,80 @@ if __name__ == "__main__":
     main()
 """
 
+    def _force_constant_approach(self) -> str:
+        if self.inter_param["type"] == "abacus":
+            return "displacement"
+        if self.inter_param["type"] in LAMMPS_INTER_TYPE:
+            return "phonolammps"
+        return self.approach
+
+    def _dump_force_constant_key(self, path_to_work: str, base_dir: str) -> None:
+        # potential files are hashed here, relative to the directory APEX was started from
+        if self.fc_cache is not None:
+            dump_force_constant_key(
+                path_to_work,
+                {"interaction": interaction_digest(self.inter_param, self.cal_setting, base_dir)},
+            )
+
+    def _force_constant_digest(self, directory: str, cell_file: str):
+        """
+        Force-constant cache key of the phonon cell of a task or volume directory,
+        None when the cache is disabled.
+        """
+        if self.fc_cache is None:
+            return None
+        key = load_force_constant_key(os.path.dirname(os.path.abspath(directory)))
+        cell_path = os.path.join(directory, cell_file)
+        if not key or not os.path.isfile(cell_path):
+            return None
+        return force_constant_digest(
+            cell_path,
+            self.supercell_size,
+            key["interaction"],
+            self._force_constant_approach(),
+            force_constant_displacement_distance(self.inter_param["type"]),
+        )
+
+    def _restore_volume_force_constants(self, helper_dir: str, cell_file: str) -> bool:
+        """
+        Restore FORCE_CONSTANTS of a displacement volume point at make time;
+        its displaced supercells then need no task.
+        """
+        digest = self._force_constant_digest(helper_dir, cell_file)
+        if digest is None or not self.fc_cache.restore_force_constants(digest, helper_dir):
+            return False
+        print(f"Reuse cached force constants for {helper_dir} (force-constant cache {digest[:12]})")
+        return True
+
+    def _consult_force_constant_cache(self, directory: str, cell_file: str):
+        """
+        Restore missing FORCE_CONSTANTS of directory from the cache and return
+        the key under which the force constants are stored afterwards.
+        """
+        digest = self._force_constant_digest(directory, cell_file)
+        if digest is not None and not os.path.isfile(os.path.join(directory, "FORCE_CONSTANTS")):
+            self.fc_cache.restore_force_constants(digest, directory)
+        return digest
+
     def _ensure_mesh_yaml(self, task_dir: str) -> None:
         mesh_path = os.path.join(task_dir, "mesh.yaml")
-        if os.path.isfile(mesh_path):
+        if os.path.isfile(mesh_path) or os.path.isfile(os.path.join(task_dir, "mesh.hdf5")):
             return
         force_constants = os.path.join(task_dir, "FORCE_CONSTANTS")
         band_conf = os.path.join(task_dir, "band.conf")
+        cell_file = "POSCAR-unitcell" if self.inter_param["type"] == "vasp" else "POSCAR"
+        digest = self._consult_force_constant_cache(task_dir, cell_file)
+        if self.phonopy_backend == "api":
+            self._ensure_mesh_yaml_api(task_dir, cell_file)
+        else:
+            self._ensure_mesh_yaml_cli(task_dir, cell_file)
+        if digest is not None:
+            self.fc_cache.store_force_constants(digest, task_dir)
+
+    def _ensure_mesh_yaml_cli(self, task_dir: str, cell_file: str) -> None:
+        mesh_path = os.path.join(task_dir, "mesh.yaml")
+        force_constants = os.path.join(task_dir, "FORCE_CONSTANTS")
+        band_conf = os.path.join(task_dir, "band.conf")
         if self.inter_param["type"] == "vasp":
             vasprun = os.path.join(task_dir, "vasprun.xml")
             if not os.path.isfile(force_constants):
@@ -783,9 +899,7 @@ if __name__ == "__main__":
                     Phonon.phonopy_setup_command("--fc vasprun.xml"),
                     shell=True,
                 )
-            poscar = os.path.join(task_dir, "POSCAR-unitcell")
-        else:
-            poscar = os.path.join(task_dir, "POSCAR")
+        poscar = os.path.join(task_dir, cell_file)
         if not os.path.isfile(force_constants):
             raise FileNotFoundError(f"FORCE_CONSTANTS not found in {task_dir}")
         if not os.path.isfile(band_conf):
@@ -793,7 +907,6 @@ if __name__ == "__main__":
         if not os.path.isfile(poscar):
             raise FileNotFoundError(f"POSCAR not found in {task_dir}")
         os.chdir(task_dir)
-        cell_file = "POSCAR-unitcell" if self.inter_param["type"] == "vasp" else "POSCAR"
         command = (
             'phonopy --nomeshsym --dim="%s %s %s" -c %s band.conf'
             % (self.supercell_size[0], self.supercell_size[1], self.supercell_size[2], cell_file)
@@ -802,6 +915,55 @@ if __name__ == "__main__":
         if not os.path.isfile(mesh_path):
             raise FileNotFoundError(f"mesh.yaml was not created in {task_dir}")
 
+    def _ensure_mesh_yaml_api(self, task_dir: str, cell_file: str) -> None:
+        for file_name in ["band.conf", cell_file]:
+            if not os.path.isfile(os.path.join(task_dir, file_name)):
+                raise FileNotFoundError(f"{file_name} not found in {task_dir}")
+        os.chdir(task_dir)
+        driver = PhonopyDriver.from_conf("band.conf", cell_file, supercell_size=self.supercell_size)
+        if os.path.isfile("FORCE_CONSTANTS"):
+            driver.read_force_constants("FORCE_CONSTANTS")
+        elif self.inter_param["type"] == "vasp":
+            if not os.path.isfile("vasprun.xml"):
+                raise FileNotFoundError(f"vasprun.xml not found in {task_dir}")
+            driver.read_vasprun_force_constants("vasprun.xml")
+        else:
+            raise FileNotFoundError(f"FORCE_CONSTANTS not found in {task_dir}")
+        driver.run_conf("band.conf", is_mesh_symmetry=False)
+        if not os.path.isfile("mesh.yaml"):
+            raise FileNotFoundError(f"mesh.yaml was not created in {task_dir}")
+
+    def _ensure_volume_outputs_api(self, helper_dir: str, force_files: List[str]) -> None:
+        """
+        FORCE_SETS, FORCE_CONSTANTS, mesh.yaml, band.yaml and band.dat of a
+        displacement volume point with a single in-process Phonopy object.
+        """
+        cwd = os.getcwd()
+        try:
+            os.chdir(helper_dir)
+            if os.path.isfile("mesh.yaml") and os.path.isfile("FORCE_CONSTANTS"):
+                return
+            driver = PhonopyDriver.from_disp_yaml("phonopy_disp.yaml", "band.conf")
+            if os.path.isfile("FORCE_CONSTANTS"):
+                driver.read_force_constants("FORCE_CONSTANTS")
+            else:
+                if os.path.isfile("FORCE_SETS"):
+                    driver.read_force_sets("FORCE_SETS")
+                else:
+                    missing = [path for path in force_files if not os.path.isfile(path)]
+                    if missing:
+                        raise FileNotFoundError(
+                            f"displacement force files not found for {helper_dir}: {missing}"
+                        )
+                    driver.collect_forces(force_files)
+                driver.produce_force_constants()
+            if not os.path.isfile("mesh.yaml"):
+                driver.run_conf("band.conf")
+            if not os.path.isfile("mesh.yaml"):
+                raise FileNotFoundError(f"mesh.yaml was not created in {helper_dir}")
+        finally:
+            os.chdir(cwd)
+
     def _build_vasp_displacement_task_infos(self, work_path: str, all_res: List[str]) -> List[dict]:
         manifest_path = os.path.join(work_path, "vasp_gruneisen_tasks.json")
         if not os.path.isfile(manifest_path):
@@ -839,9 +1001,24 @@ if __name__ == "__main__":
 
     def _ensure_vasp_volume_outputs(
         self, work_path: str, helper_dir: str, displacement_tasks: List[str]
+    ) -> None:
+        digest = self._consult_force_constant_cache(helper_dir, "POSCAR-unitcell")
+        if self.phonopy_backend == "api":
+            self._ensure_volume_outputs_api(
+                helper_dir,
+                [os.path.join(work_path, task_name, "vasprun.xml") for task_name in displacement_tasks],
+            )
+        else:
+            self._ensure_vasp_volume_outputs_cli(work_path, helper_dir, displacement_tasks)
+        if digest is not None:
+            self.fc_cache.store_force_constants(digest, helper_dir)
+
+    def _ensure_vasp_volume_outputs_cli(
+        self, work_path: str, helper_dir: str, displacement_tasks: List[str]
     ) -> None:
         force_sets = os.path.join(helper_dir, "FORCE_SETS")
-        if not os.path.isfile(force_sets):
+        force_constants = os.path.join(helper_dir, "FORCE_CONSTANTS")
+        if not os.path.isfile(force_sets) and not os.path.isfile(force_constants):
             vaspruns = [
                 os.path.join(work_path, task_name, "vasprun.xml")
                 for task_name in displacement_tasks
@@ -861,9 +1038,8 @@ if __name__ == "__main__":
                 )
             finally:
                 os.chdir(cwd)
-        if not os.path.isfile(force_sets):
+        if not os.path.isfile(force_sets) and not os.path.isfile(force_constants):
             raise FileNotFoundError(f"FORCE_SETS was not created in {helper_dir}")
-        force_constants = os.path.join(helper_dir, "FORCE_CONSTANTS")
         if not os.path.isfile(force_constants):
             cwd = os.getcwd()
             try:
@@ -919,9 +1095,27 @@ if __name__ == "__main__":
 
     def _ensure_abacus_volume_outputs(
         self, work_path: str, helper_dir: str, displacement_tasks: List[str]
+    ) -> None:
+        digest = self._consult_force_constant_cache(helper_dir, "STRU")
+        if self.phonopy_backend == "api":
+            self._ensure_volume_outputs_api(
+                helper_dir,
+                [
+                    os.path.join(work_path, task_name, "OUT.ABACUS", "running_scf.log")
+                    for task_name in displacement_tasks
+                ],
+            )
+        else:
+            self._ensure_abacus_volume_outputs_cli(work_path, helper_dir, displacement_tasks)
+        if digest is not None:
+            self.fc_cache.store_force_constants(digest, helper_dir)
+
+    def _ensure_abacus_volume_outputs_cli(
+        self, work_path: str, helper_dir: str, displacement_tasks: List[str]
     ) -> None:
         force_sets = os.path.join(helper_dir, "FORCE_SETS")
-        if not os.path.isfile(force_sets):
+        force_constants = os.path.join(helper_dir, "FORCE_CONSTANTS")
+        if not os.path.isfile(force_sets) and not os.path.isfile(force_constants):
             logs = [
                 os.path.join(work_path, task_name, "OUT.ABACUS", "running_scf.log")
                 for task_name in displacement_tasks
@@ -941,9 +1135,8 @@ if __name__ == "__main__":
                 )
             finally:
                 os.chdir(cwd)
-        if not os.path.isfile(force_sets):
+        if not os.path.isfile(force_sets) and not os.path.isfile(force_constants):
             raise FileNotFoundError(f"FORCE_SETS was not created in {helper_dir}")
-        force_constants = os.path.join(helper_dir, "FORCE_CONSTANTS")
         if not os.path.isfile(force_constants) or not os.path.isfile(
             os.path.join(helper_dir, "mesh.yaml")
         ):
@@ -1020,14 +1213,9 @@ if __name__ == "__main__":
     def _load_task_info(self, task_dir: str) -> dict:
         with open(os.path.join(task_dir, "volume.json"), "r") as fp:
             volume_data = json.load(fp)
-        with open(os.path.join(task_dir, "mesh.yaml"), "r") as fp:
-            mesh_data = yaml.safe_load(fp)
-        phonon = mesh_data["phonon"]
-        weights = [int(point["weight"]) for point in phonon]
-        frequencies = [
-            [float(band["frequency"]) for band in point["band"]]
-            for point in phonon
-        ]
+        mesh = load_mesh(task_dir)
+        weights = mesh["weights"].tolist()
+        frequencies = mesh["frequencies"].tolist()
         phonon_cell_path = (
             os.path.join(task_dir, "POSCAR-unitcell")
             if self.inter_param["type"] == "vasp"
@@ -1131,13 +1319,10 @@ if __name__ == "__main__":
         if not math.isfinite(reference_volume) or reference_volume <= 0.0:
             raise ValueError("full gruneisen requires a positive reference volume")
         k_t = bulk_modulus["K_T_eV_per_A3"]
-        sum_gamma_cv_per_cell = [
-            value / qpoint_weight_sum for value in sign_only["sum_gamma_cv"]
-        ]
-        alpha = [
-            value / (reference_volume * k_t)
-            for value in sum_gamma_cv_per_cell
-        ]
+        sum_gamma_cv_per_cell = np.asarray(sign_only["sum_gamma_cv"], dtype=float) / qpoint_weight_sum
+        alpha = sum_gamma_cv_per_cell / (reference_volume * k_t)
+        sum_gamma_cv_per_cell = sum_gamma_cv_per_cell.tolist()
+        alpha = alpha.tolist()
         return {
             "sum_gamma_cv_per_cell": sum_gamma_cv_per_cell,
             "alpha": alpha,
@@ -1175,11 +1360,6 @@ if __name__ == "__main__":
         if len(ref_info["frequencies"]) != len(minus_info["frequencies"]) or len(ref_info["frequencies"]) != len(plus_info["frequencies"]):
             raise ValueError("mesh q-point count must be identical across volume points")
 
-        sum_gamma_cv = [0.0 for _ in self.temperatures]
-        positive_sum = [0.0 for _ in self.temperatures]
-        negative_sum = [0.0 for _ in self.temperatures]
-        skipped_mode_count = 0
-
         log_v_minus = math.log(minus_info["volume"])
         log_v_plus = math.log(plus_info["volume"])
         denom = log_v_plus - log_v_minus
@@ -1188,74 +1368,74 @@ if __name__ == "__main__":
 
         qpoint_count = len(ref_info["frequencies"])
         mode_count = len(ref_info["frequencies"][0]) if qpoint_count else 0
-        mode_gruneisen = []
-        mode_heat_capacity = []
-        mode_contributions = []
-
-        for q_idx in range(qpoint_count):
-            ref_modes = ref_info["frequencies"][q_idx]
-            minus_modes = minus_info["frequencies"][q_idx]
-            plus_modes = plus_info["frequencies"][q_idx]
+        for ref_modes, minus_modes, plus_modes in zip(
+            ref_info["frequencies"], minus_info["frequencies"], plus_info["frequencies"]
+        ):
             if len(ref_modes) != len(minus_modes) or len(ref_modes) != len(plus_modes):
                 raise ValueError("mesh band count must be identical across volume points")
+            if len(ref_modes) != mode_count:
+                raise ValueError("mesh band count must be identical across q-points")
+
+        shape = (qpoint_count, mode_count)
+        omega_ref = np.asarray(ref_info["frequencies"], dtype=float).reshape(shape)
+        omega_minus = np.asarray(minus_info["frequencies"], dtype=float).reshape(shape)
+        omega_plus = np.asarray(plus_info["frequencies"], dtype=float).reshape(shape)
+        weights = np.asarray(ref_info["weights"], dtype=float).reshape(qpoint_count)
+
+        # modes that are imaginary or zero at any volume carry no gamma and no heat capacity
+        valid = (omega_ref > 0.0) & (omega_minus > 0.0) & (omega_plus > 0.0)
+        skipped_mode_count = int(np.count_nonzero(~valid))
+        gamma = np.zeros(shape)
+        gamma[valid] = -(np.log(omega_plus[valid]) - np.log(omega_minus[valid])) / denom
+        weighted_gamma = np.where(valid, weights[:, None] * gamma, 0.0)
+
+        temperatures = [float(temp) for temp in self.temperatures]
+        sum_gamma_cv = np.zeros(len(temperatures))
+        positive_sum = np.zeros(len(temperatures))
+        negative_sum = np.zeros(len(temperatures))
+        # (temperature, q-point, mode) arrays, kept only when mode_detail is requested
+        mode_heat_capacity = None
+        mode_contributions = None
+        if self.mode_detail:
+            mode_heat_capacity = np.zeros((len(temperatures),) + shape)
+            mode_contributions = np.zeros((len(temperatures),) + shape)
+
+        chunk = max(1, KERNEL_CHUNK_ELEMENTS // max(1, qpoint_count * mode_count))
+        for start in range(0, len(temperatures), chunk):
+            chunk_temps = temperatures[start:start + chunk]
+            # (temperature, q-point, mode)
+            cv = self._mode_heat_capacity_array(omega_ref, chunk_temps)
+            cv[:, ~valid] = 0.0
+            contribution = weighted_gamma[None, :, :] * cv
+            sum_gamma_cv[start:start + chunk] = contribution.sum(axis=(1, 2))
+            positive_sum[start:start + chunk] = np.where(contribution > 0.0, contribution, 0.0).sum(axis=(1, 2))
+            negative_sum[start:start + chunk] = np.where(contribution < 0.0, contribution, 0.0).sum(axis=(1, 2))
+            if self.mode_detail:
+                mode_heat_capacity[start:start + chunk] = cv
+                mode_contributions[start:start + chunk] = contribution
+
+        gamma = np.where(valid, gamma, np.nan)
+        gamma_lists = gamma.tolist()
+        mode_gruneisen = []
+        for q_idx in range(qpoint_count):
             weight = ref_info["weights"][q_idx]
-            gamma_row = []
-            cv_row = {self._temperature_key(temp): [] for temp in self.temperatures}
-            contribution_row = {self._temperature_key(temp): [] for temp in self.temperatures}
-            for mode_idx in range(len(ref_modes)):
-                omega_ref = ref_modes[mode_idx]
-                omega_minus = minus_modes[mode_idx]
-                omega_plus = plus_modes[mode_idx]
-                if omega_ref <= 0.0 or omega_minus <= 0.0 or omega_plus <= 0.0:
-                    skipped_mode_count += 1
-                    gamma_row.append(None)
-                    for temp_idx, temperature in enumerate(self.temperatures):
-                        temp_key = self._temperature_key(temperature)
-                        cv_row[temp_key].append(0.0)
-                        contribution_row[temp_key].append(0.0)
-                    continue
-                gamma = -(math.log(omega_plus) - math.log(omega_minus)) / denom
-                gamma_row.append(gamma)
-                for temp_idx, temperature in enumerate(self.temperatures):
-                    cv = self._mode_heat_capacity(omega_ref, float(temperature))
-                    contribution = weight * gamma * cv
-                    sum_gamma_cv[temp_idx] += contribution
-                    if contribution > 0.0:
-                        positive_sum[temp_idx] += contribution
-                    elif contribution < 0.0:
-                        negative_sum[temp_idx] += contribution
-                    temp_key = self._temperature_key(temperature)
-                    cv_row[temp_key].append(cv)
-                    contribution_row[temp_key].append(contribution)
-
             mode_gruneisen.append(
                 {
                     "q_index": q_idx,
                     "weight": weight,
-                    "omega_ref": ref_modes,
-                    "gamma": gamma_row,
-                }
-            )
-            mode_heat_capacity.append(
-                {
-                    "q_index": q_idx,
-                    "weight": weight,
-                    "cv": cv_row,
-                }
-            )
-            mode_contributions.append(
-                {
-                    "q_index": q_idx,
-                    "weight": weight,
-                    "gamma_cv": contribution_row,
+                    "omega_ref": ref_info["frequencies"][q_idx],
+                    "gamma": [None if math.isnan(value) else value for value in gamma_lists[q_idx]],
                 }
             )
 
+        sum_gamma_cv = sum_gamma_cv.tolist()
+        positive_sum = positive_sum.tolist()
+        negative_sum = negative_sum.tolist()
         contribution_summary = []
-        for temp_idx, temperature in enumerate(self.temperatures):
+        for temp_idx, temperature in enumerate(temperatures):
             contribution_summary.append(
                 {
-                    "temperature": float(temperature),
+                    "temperature": temperature,
                     "positive_sum": positive_sum[temp_idx],
                     "negative_sum": negative_sum[temp_idx],
                     "net_sum": sum_gamma_cv[temp_idx],
@@ -1269,6 +1449,7 @@ if __name__ == "__main__":
             "sum_gamma_cv": sum_gamma_cv,
             "sign": [self._classify_sign(value) for value in sum_gamma_cv],
             "mode_gruneisen": mode_gruneisen,
+            "gamma": gamma,
             "mode_heat_capacity": mode_heat_capacity,
             "mode_contributions": mode_contributions,
             "contribution_summary": contribution_summary,
@@ -1284,6 +1465,21 @@ if __name__ == "__main__":
             return 0.0
         return KB_EV_PER_K * (x * x * exp_neg_x / ((1.0 - exp_neg_x) ** 2))
 
+    @staticmethod
+    def _mode_heat_capacity_array(frequencies_thz, temperatures) -> np.ndarray:
+        """
+        Broadcast version of _mode_heat_capacity: the heat capacity of every
+        frequency at every temperature, with shape (temperature, *frequencies.shape).
+        """
+        freqs = np.asarray(frequencies_thz, dtype=float)
+        temps = np.asarray(temperatures, dtype=float).reshape((-1,) + (1,) * freqs.ndim)
+        positive = (freqs > 0.0) & (temps > 0.0)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore", under="ignore"):
+            x = np.where(positive, THZ_TO_K * freqs / temps, 1.0)
+            exp_neg_x = np.exp(-x)
+            cv = KB_EV_PER_K * (x * x * exp_neg_x / ((1.0 - exp_neg_x) ** 2))
+        return np.where(positive & (exp_neg_x != 0.0), cv, 0.0)
+
     @staticmethod
     def _classify_sign(value: float, tol: float = 1e-14) -> str:
         if value > tol:
@@ -1291,7 +1487,3 @@ if __name__ == "__main__":
         if value < -tol:
             return "negative"
         return "zero"
-
-    @staticmethod
-    def _temperature_key(temperature: float) -> str:
-        return str(float(temperature))
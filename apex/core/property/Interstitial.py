@@ -13,9 +13,16 @@ from pymatgen.core.structure import Structure, Lattice
 from pymatgen.core.sites import PeriodicSite
 from pymatgen.core.tensors import Tensor
 from pymatgen.core.operations import SymmOp
+from pymatgen.optimization.neighbors import find_points_in_spheres
 
 from apex.core.calculator.lib import abacus_utils
 from apex.core.calculator.lib import lammps_utils
+from apex.core.lib.defect_sites import (
+    DEFECT_SITE_FILE,
+    defect_site_record,
+    group_defect_sites,
+    site_grouping_param,
+)
 from apex.core.property.Property import Property
 from apex.core.refine import make_refine
 from apex.core.reproduce import make_repro, post_repro
@@ -26,6 +33,26 @@ upload_packages.append(__file__)
 
 TOL = 1e-5
 
+
+def nearest_host_distances(host, sites, cutoff):
+    """
+    Distance from each candidate site to its nearest atom of the periodic host,
+    np.inf when none lies within cutoff. All candidates share one neighbor
+    query, so memory grows with the number of close pairs, not with N^2.
+    """
+    nearest = np.full(len(sites), np.inf)
+    if len(sites):
+        centers, _, _, distances = find_points_in_spheres(
+            np.ascontiguousarray(host.cart_coords, dtype=float),
+            np.ascontiguousarray([site.coords for site in sites], dtype=float),
+            r=float(cutoff),
+            pbc=np.ascontiguousarray(host.pbc, dtype=np.int64),
+            lattice=np.ascontiguousarray(host.lattice.matrix, dtype=float),
+        )
+        np.minimum.at(nearest, centers, distances)
+    return nearest
+
+
 class Interstitial(Property):
     def __init__(self, parameter, inter_param=None):
         parameter["reproduce"] = parameter.get("reproduce", False)
@@ -42,6 +69,8 @@ class Interstitial(Property):
                 self.voronoi_param = parameter["voronoi_param"]
                 parameter["special_list"] = parameter.get("special_list", ['bcc', 'fcc', 'hcp'])
                 self.special_list = parameter["special_list"]
+                # merge Voronoi sites of the same local environment
+                self.site_grouping = site_grouping_param(parameter)
 
             parameter["cal_type"] = parameter.get("cal_type", "relaxation")
             default_cal_setting = {
@@ -106,6 +135,7 @@ class Interstitial(Property):
                 self.init_from_suffix,
                 self.path_to_work,
                 self.parameter.get("reprod_last_frame", False),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         else:
@@ -144,6 +174,13 @@ class Interstitial(Property):
                         os.path.relpath(os.path.join(init_from_task, "supercell.json")),
                         "supercell.json",
                     )
+                    if os.path.exists(DEFECT_SITE_FILE):
+                        os.remove(DEFECT_SITE_FILE)
+                    if os.path.isfile(os.path.join(init_from_task, DEFECT_SITE_FILE)):
+                        os.symlink(
+                            os.path.relpath(os.path.join(init_from_task, DEFECT_SITE_FILE)),
+                            DEFECT_SITE_FILE,
+                        )
 
             else:
                 if self.inter_param["type"] == "abacus":
@@ -187,11 +224,13 @@ class Interstitial(Property):
 
                 # gen defects
                 dss = []
+                site_classes = []
                 self.insert_element_task = os.path.join(self.path_to_work, "element.out")
                 if os.path.isfile(self.insert_element_task):
                     os.remove(self.insert_element_task)
                 if not self.insert_ele:
                     self.insert_ele = [str(ii) for ii in set(ss.composition.elements)]
+                min_dist = self.parameter.get("conf_filters", {}).get("min_dist")
                 for ii in self.insert_ele:
                     if self.structure_type in self.special_list:
                         # rotate and translate hcp structure to specific orientation for interstitial generation
@@ -217,29 +256,33 @@ class Interstitial(Property):
                             ss.to(os.path.join(self.path_to_work, 'POSCAR_conv'), 'POSCAR')
                         # produce a pseudo interstitial structure for later modification
                         vds = [pmgInterstitial(ss, PeriodicSite(ii, [0.12, 0.13, 0.14], ss.lattice))]
+                        vds_classes = [None]
                     else:
                         pre_vds = VoronoiInterstitialGenerator(**self.voronoi_param)
-                        vds = pre_vds.generate(ss, [ii])
-                    for jj in vds:
-                        temp = jj.get_supercell_structure(
+                        vds = list(pre_vds.generate(ss, [ii]))
+                        vds_classes = [None] * len(vds)
+                        if self.site_grouping:
+                            vds_classes = group_defect_sites(
+                                vds, self.site_grouping["cutoff"], self.site_grouping["tol"]
+                            )
+                            vds = [kk[0] for kk in vds_classes]
+                    if min_dist is not None:
+                        # the inserted atom sees the same host neighbors in the unit cell
+                        # and in the supercell, so reject candidates before building it
+                        keep = nearest_host_distances(ss, [jj.site for jj in vds], min_dist) >= min_dist
+                        print("%d of %d %s interstitial candidates pass min_dist %s"
+                              % (np.count_nonzero(keep), len(vds), ii, min_dist))
+                        vds = [jj for jj, kk in zip(vds, keep) if kk]
+                        vds_classes = [jj for jj, kk in zip(vds_classes, keep) if kk]
+                    for jj, site_class in zip(vds, vds_classes):
+                        dss.append(jj.get_supercell_structure(
                             sc_mat=np.diag(self.supercell, k=0)
-                        )
-                        smallest_distance = list(set(temp.distance_matrix.ravel()))[1]
-                        if (
-                                "conf_filters" in self.parameter
-                                and "min_dist" in self.parameter["conf_filters"]
-                        ):
-                            min_dist = self.parameter["conf_filters"]["min_dist"]
-                            if smallest_distance >= min_dist:
-                                dss.append(temp)
-                                with open(self.insert_element_task, "a+") as fout:
-                                    print(ii, file=fout)
-                        else:
-                            dss.append(temp)
-                            with open(self.insert_element_task, "a+") as fout:
-                                print(ii, file=fout)
+                        ))
+                        site_classes.append(site_class)
+                        with open(self.insert_element_task, "a+") as fout:
+                            print(ii, file=fout)
                         #            dss.append(jj.generate_defect_structure(self.supercell))
-                        self.dss = dss
+                    self.dss = dss
 
                 print(
                     "gen interstitial with supercell "
@@ -262,6 +305,7 @@ class Interstitial(Property):
                         "conf.lmp",
                         "in.lammps",
                         "STRU",
+                        DEFECT_SITE_FILE,
                     ]:
                         if os.path.exists(jj):
                             os.remove(jj)
@@ -270,6 +314,8 @@ class Interstitial(Property):
                     # np.savetxt('supercell.out', self.supercell, fmt='%d')
                     dumpfn(self.supercell, "supercell.json")
                     dumpfn(f'VoronoiType_{ii}', 'interstitial_type.json')
+                    if site_classes[ii] is not None:
+                        dumpfn(defect_site_record(*site_classes[ii]), DEFECT_SITE_FILE, indent=4)
                 os.chdir(cwd)
 
                 super_size = (
@@ -522,6 +568,12 @@ class Interstitial(Property):
                 res_data[
                     insert_ele + "_" + str(interstitial_type) + "_" + structure_dir
                     ] = [evac, task_result["energies"][-1], equi_epa * natoms]
+                # with site grouping a task stands for multiplicity interstitial sites
+                site_file = os.path.join(ii, DEFECT_SITE_FILE)
+                if os.path.isfile(site_file):
+                    res_data[
+                        insert_ele + "_" + str(interstitial_type) + "_" + structure_dir
+                        ].append(loadfn(site_file)["multiplicity"])
 
         else:
             if "init_data_path" not in self.parameter:
@@ -533,6 +585,7 @@ class Interstitial(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", False),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         with open(output_file, "w") as fp:
@@ -17,6 +17,15 @@ from apex.core.structure import StructureInfo
 from apex.core.calculator.calculator import LAMMPS_INTER_TYPE
 from apex.core.calculator.lib import abacus_utils
 from apex.core.calculator.lib import vasp_utils
+from apex.core.lib.force_constant_cache import (
+    ForceConstantCache,
+    dump_force_constant_key,
+    force_constant_digest,
+    force_constant_displacement_distance,
+    interaction_digest,
+    load_force_constant_key,
+)
+from apex.core.lib.phonopy_driver import PhonopyDriver, resolve_phonopy_backend, write_symmetry_cells
 from apex.core.property.Property import Property
 from apex.core.refine import make_refine
 from apex.core.reproduce import make_repro, post_repro
@@ -33,6 +42,9 @@ class Phonon(Property):
     def __init__(self, parameter, inter_param=None):
         parameter["reproduce"] = parameter.get("reproduce", False)
         self.reprod = parameter["reproduce"]
+        if self.reprod and parameter.get("reprod_trajectory", False):
+            # phonon reproduces per frame, there is no trajectory rerun task
+            raise RuntimeError("reprod_trajectory is not supported by the phonon property")
         if not self.reprod:
             if not ("init_from_suffix" in parameter and "output_suffix" in parameter):
                 parameter["primitive"] = parameter.get('primitive', False)
@@ -79,6 +91,12 @@ class Phonon(Property):
         self.cal_type = parameter["cal_type"]
         parameter["phonolammps_run_command"] = parameter.get("phonolammps_run_command", None)
         self.phonolammps_run_command = parameter["phonolammps_run_command"]
+        # "api" drives phonopy in-process, "cli" through its command line tools
+        parameter["phonopy_backend"] = parameter.get("phonopy_backend", None)
+        self.phonopy_backend = resolve_phonopy_backend(parameter["phonopy_backend"])
+        # force constants are reused across runs that only change the band path or mesh
+        parameter["fc_cache_dir"] = parameter.get("fc_cache_dir", None)
+        self.fc_cache = ForceConstantCache.from_parameter(parameter)
         parameter["cal_setting"] = parameter.get("cal_setting", default_cal_setting)
         for key in default_cal_setting:
             parameter["cal_setting"].setdefault(key, default_cal_setting[key])
@@ -286,9 +304,17 @@ class Phonon(Property):
                     # append NUMERICAL_ORBITAL to STRU after relaxation
                     orb_file = self.inter_param.get("orb_files", None)
                     abacus_utils.append_orb_file_to_stru("STRU", orb_file, prefix='pp_orb')
+                    if self._restore_force_constants(path_to_work, "STRU", cwd, ret_force_read):
+                        os.chdir(cwd)
+                        return []
                     ## generate STRU-00x
-                    cmd = self.phonopy_setup_command("setting.conf --abacus -d")
-                    subprocess.call(cmd, shell=True)
+                    if self.phonopy_backend == "api":
+                        PhonopyDriver.from_unitcell(
+                            "STRU", self.supercell_size, "abacus", self.PRIMITIVE_AXES
+                        ).generate_displacements()
+                    else:
+                        cmd = self.phonopy_setup_command("setting.conf --abacus -d")
+                        subprocess.call(cmd, shell=True)
 
                     with open("band.conf", "a") as fp:
                         fp.write(ret)
@@ -312,23 +338,34 @@ class Phonon(Property):
 
                 # ------------make for vasp and lammps------------
                 if self.primitive:
-                    subprocess.call(self.phonopy_setup_command("--symmetry"), shell=True)
+                    if self.phonopy_backend == "api":
+                        write_symmetry_cells("POSCAR")
+                    else:
+                        subprocess.call(self.phonopy_setup_command("--symmetry"), shell=True)
                     subprocess.call('cp PPOSCAR POSCAR', shell=True)
                     shutil.copyfile("PPOSCAR", "POSCAR-unitcell")
                 else:
                     shutil.copyfile("POSCAR", "POSCAR-unitcell")
+                if self._restore_force_constants(path_to_work, "POSCAR-unitcell", cwd, ret_force_read):
+                    os.chdir(cwd)
+                    return []
 
                 # make tasks
                 if self.inter_param["type"] == 'vasp':
-                    cmd = self.phonopy_setup_command(
-                        "-d --dim='%d %d %d' -c POSCAR"
-                        % (
-                            int(self.supercell_size[0]),
-                            int(self.supercell_size[1]),
-                            int(self.supercell_size[2]),
+                    if self.phonopy_backend == "api":
+                        PhonopyDriver.from_unitcell(
+                            "POSCAR", self.supercell_size, "vasp", self.PRIMITIVE_AXES
+                        ).generate_displacements()
+                    else:
+                        cmd = self.phonopy_setup_command(
+                            "-d --dim='%d %d %d' -c POSCAR"
+                            % (
+                                int(self.supercell_size[0]),
+                                int(self.supercell_size[1]),
+                                int(self.supercell_size[2]),
+                            )
                         )
-                    )
-                    subprocess.call(cmd, shell=True)
+                        subprocess.call(cmd, shell=True)
                     # linear response method
                     if self.approach == 'linear':
                         task_path = os.path.join(path_to_work, 'task.000000')
@@ -527,12 +564,106 @@ class Phonon(Property):
         # return type -> list[list[dict[Any, Any]]]
         return band_list
 
+    def _restore_force_constants(self, path_to_work, unitcell, base_dir, band_conf) -> bool:
+        """
+        Record the force-constant key of path_to_work when the cache is enabled.
+        On a cache hit FORCE_CONSTANTS and a FORCE_CONSTANTS=READ band.conf are
+        placed in path_to_work and no task has to be run.
+        """
+        if self.fc_cache is None:
+            return False
+        if self.inter_param["type"] == "abacus":
+            approach = "displacement"
+        elif self.inter_param["type"] == "vasp":
+            approach = self.approach
+        else:
+            approach = "phonolammps"
+        digest = force_constant_digest(
+            unitcell,
+            self.supercell_size,
+            interaction_digest(self.inter_param, self.cal_setting, base_dir),
+            approach,
+            force_constant_displacement_distance(self.inter_param["type"]),
+        )
+        restored = self.fc_cache.restore_force_constants(digest, path_to_work)
+        dump_force_constant_key(path_to_work, {"digest": digest, "unitcell": unitcell, "restored": restored})
+        if restored:
+            with open(os.path.join(path_to_work, "band.conf"), "w") as fp:
+                fp.write(band_conf)
+            print(f"Reuse cached force constants for {path_to_work} (force-constant cache {digest[:12]})")
+        return restored
+
+    def _run_cached_force_constants(self, unitcell):
+        """band.dat from the FORCE_CONSTANTS restored into the current work path."""
+        is_abacus = self.inter_param["type"] == "abacus"
+        if self.phonopy_backend == "api":
+            driver = PhonopyDriver.from_conf(
+                "band.conf", unitcell, "abacus" if is_abacus else "vasp", supercell_size=self.supercell_size
+            )
+            driver.read_force_constants("FORCE_CONSTANTS")
+            driver.run_conf("band.conf")
+        else:
+            os.system('phonopy --dim="%s %s %s" -c %s band.conf%s' % (
+                self.supercell_size[0], self.supercell_size[1], self.supercell_size[2],
+                unitcell, " --abacus" if is_abacus else ""))
+            os.system('phonopy-bandplot --gnuplot band.yaml > band.dat')
+
+    def _store_force_constants(self, work_path, all_tasks, fc_key) -> None:
+        if self.fc_cache is None or not fc_key or fc_key.get("restored"):
+            return
+        # phonolammps and linear response leave FORCE_CONSTANTS in the task, displacement runs in work_path
+        for directory in list(all_tasks[:1]) + [str(work_path)]:
+            if self.fc_cache.store_force_constants(fc_key["digest"], directory):
+                return
+
     @staticmethod
     def check_same_copy(src, dst):
         if os.path.samefile(src, dst):
             return
         shutil.copyfile(src, dst)
 
+    def _run_phonopy_api(self, work_path, all_tasks):
+        """
+        Force constants and band structure of the finished tasks with one
+        in-process Phonopy object, writing band.yaml and band.dat into work_path.
+        """
+        inter_type = self.inter_param["type"]
+        if inter_type == 'abacus':
+            self.check_same_copy("task.000000/band.conf", "band.conf")
+            self.check_same_copy("task.000000/STRU.ori", "STRU")
+            self.check_same_copy("task.000000/phonopy_disp.yaml", "phonopy_disp.yaml")
+            force_files = sorted(glob.glob("task.0*/OUT.ABACUS/running_scf.log"))
+        elif inter_type == 'vasp':
+            self.check_same_copy("task.000000/band.conf", "band.conf")
+            self.check_same_copy("task.000000/POSCAR-unitcell", "POSCAR-unitcell")
+            if self.approach == "displacement":
+                self.check_same_copy("task.000000/phonopy_disp.yaml", "phonopy_disp.yaml")
+                force_files = sorted(glob.glob("task.0*/vasprun.xml"))
+
+        if inter_type == 'abacus' or (inter_type == 'vasp' and self.approach == "displacement"):
+            driver = PhonopyDriver.from_disp_yaml("phonopy_disp.yaml", "band.conf")
+            driver.collect_forces(force_files)
+            print('FORCE_SETS is created')
+            driver.produce_force_constants(
+                force_constants="FORCE_CONSTANTS" if self.fc_cache is not None else None
+            )
+            driver.run_conf("band.conf")
+        elif inter_type == 'vasp' or inter_type in LAMMPS_INTER_TYPE:
+            # linear response (VASP) or phonolammps: force constants of the single task
+            os.chdir(all_tasks[0])
+            cell_file = "POSCAR-unitcell" if inter_type == 'vasp' else "POSCAR"
+            driver = PhonopyDriver.from_conf("band.conf", cell_file, supercell_size=self.supercell_size)
+            if inter_type == 'vasp':
+                assert os.path.isfile('vasprun.xml'), "vasprun.xml not found"
+                driver.read_vasprun_force_constants("vasprun.xml")
+            else:
+                assert os.path.isfile('FORCE_CONSTANTS'), "FORCE_CONSTANTS not created"
+                driver.read_force_constants("FORCE_CONSTANTS")
+            driver.run_conf("band.conf")
+            print('band.dat is created')
+            shutil.copyfile("band.dat", os.path.join(work_path, "band.dat"))
+        os.chdir(work_path)
+
     def _compute_lower(self, output_file, all_tasks, all_res):
         cwd = Path.cwd()
         work_path = Path(output_file).parent.absolute()
@@ -544,7 +675,13 @@ class Phonon(Property):
 
         if not self.reprod:
             os.chdir(work_path)
-            if self.inter_param["type"] == 'abacus':
+            fc_key = load_force_constant_key(work_path)
+            writefc = " --writefc" if self.fc_cache is not None else ""
+            if fc_key and fc_key.get("restored"):
+                self._run_cached_force_constants(fc_key["unitcell"])
+            elif self.phonopy_backend == "api":
+                self._run_phonopy_api(work_path, all_tasks)
+            elif self.inter_param["type"] == 'abacus':
                 self.check_same_copy("task.000000/band.conf", "band.conf")
                 self.check_same_copy("task.000000/STRU.ori", "STRU")
                 self.check_same_copy("task.000000/phonopy_disp.yaml", "phonopy_disp.yaml")
@@ -553,7 +690,7 @@ class Phonon(Property):
                     print('FORCE_SETS is created')
                 else:
                     logging.warning('FORCE_SETS can not be created')
-                os.system('phonopy band.conf --abacus')
+                os.system('phonopy band.conf --abacus' + writefc)
                 os.system('phonopy-bandplot --gnuplot band.yaml > band.dat')
 
             elif self.inter_param["type"] == 'vasp':
@@ -581,10 +718,11 @@ class Phonon(Property):
                         print('FORCE_SETS is created')
                     else:
                         logging.warning('FORCE_SETS can not be created')
-                    os.system('phonopy --dim="%s %s %s" -c POSCAR-unitcell band.conf' % (
+                    os.system('phonopy --dim="%s %s %s" -c POSCAR-unitcell band.conf%s' % (
                         self.supercell_size[0],
                         self.supercell_size[1],
-                        self.supercell_size[2]))
+                        self.supercell_size[2],
+                        writefc))
                     os.system('phonopy-bandplot --gnuplot band.yaml > band.dat')
 
             elif self.inter_param["type"] in LAMMPS_INTER_TYPE:
@@ -595,6 +733,8 @@ class Phonon(Property):
                     )
                 os.system('phonopy-bandplot --gnuplot band.yaml > band.dat')
                 shutil.copyfile("band.dat", work_path/"band.dat")
+            os.chdir(work_path)
+            self._store_force_constants(work_path, all_tasks, fc_key)
 
         else:
             if "init_data_path" not in self.parameter:
@@ -7,10 +7,10 @@ import dpdata
 import numpy as np
 from monty.serialization import dumpfn, loadfn
 from pymatgen.core.structure import Structure
-from pymatgen.core.surface import generate_all_slabs
 
 from apex.core.calculator.lib import abacus_utils
 from apex.core.calculator.lib import vasp_utils
+from apex.core.lib.slab_cache import SlabCache, get_all_slabs
 from apex.core.property.Property import Property
 from apex.core.refine import make_refine
 from apex.core.reproduce import make_repro, post_repro
@@ -56,6 +56,7 @@ class Surface(Property):
         self.cal_setting = parameter["cal_setting"]
         self.parameter = parameter
         self.inter_param = inter_param if inter_param != None else {"type": "vasp"}
+        self.slab_cache = SlabCache.from_parameter(parameter)
 
     def make_confs(self, path_to_work, path_to_equi, refine=False):
         path_to_work = os.path.abspath(path_to_work)
@@ -97,6 +98,7 @@ class Surface(Property):
                 self.init_from_suffix,
                 path_to_work,
                 self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         else:
@@ -151,8 +153,9 @@ class Surface(Property):
                     ss = Structure.from_file(equi_contcar)
 
                 # gen slabs
-                all_slabs = generate_all_slabs(
-                    ss, self.miller, self.min_slab_size, self.min_vacuum_size
+                all_slabs = get_all_slabs(
+                    ss, self.miller, self.min_slab_size, self.min_vacuum_size,
+                    cache=self.slab_cache,
                 )
 
                 os.chdir(path_to_work)
@@ -252,7 +255,8 @@ class Surface(Property):
                 self.parameter["init_from_suffix"],
                 all_tasks,
                 ptr_data,
-                self.parameter.get("reprod_last_frame", True)
+                self.parameter.get("reprod_last_frame", True),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         with open(output_file, "w") as fp:
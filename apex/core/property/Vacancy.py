@@ -9,6 +9,12 @@ from pymatgen.analysis.defects.generators import VacancyGenerator
 from pymatgen.core.structure import Structure
 
 from apex.core.calculator.lib import abacus_utils
+from apex.core.lib.defect_sites import (
+    DEFECT_SITE_FILE,
+    defect_site_record,
+    group_defect_sites,
+    site_grouping_param,
+)
 from apex.core.property.Property import Property
 from apex.core.refine import make_refine
 from apex.core.reproduce import make_repro, post_repro
@@ -25,6 +31,8 @@ class Vacancy(Property):
                 default_supercell = [1, 1, 1]
                 parameter["supercell"] = parameter.get("supercell", default_supercell)
                 self.supercell = parameter["supercell"]
+                # run one vacancy per symmetry orbit / local environment class
+                self.site_grouping = site_grouping_param(parameter)
             parameter["cal_type"] = parameter.get("cal_type", "relaxation")
             default_cal_setting = {
                 "relax_pos": True,
@@ -88,6 +96,7 @@ class Vacancy(Property):
                 self.init_from_suffix,
                 path_to_work,
                 self.parameter.get("reprod_last_frame", False),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         else:
@@ -117,6 +126,13 @@ class Vacancy(Property):
                         os.path.relpath(os.path.join(init_from_task, "supercell.json")),
                         "supercell.json",
                     )
+                    if os.path.exists(DEFECT_SITE_FILE):
+                        os.remove(DEFECT_SITE_FILE)
+                    if os.path.isfile(os.path.join(init_from_task, DEFECT_SITE_FILE)):
+                        os.symlink(
+                            os.path.relpath(os.path.join(init_from_task, DEFECT_SITE_FILE)),
+                            DEFECT_SITE_FILE,
+                        )
             else:
                 if self.inter_param["type"] == "abacus":
                     CONTCAR = abacus_utils.final_stru(path_to_equi)
@@ -134,8 +150,18 @@ class Vacancy(Property):
                 else:
                     ss = Structure.from_file(equi_contcar)
 
-                pre_vds = VacancyGenerator()
-                vds = pre_vds.generate(ss)
+                grouping = self.site_grouping
+                if grouping:
+                    pre_vds = VacancyGenerator(
+                        symprec=grouping["symprec"], angle_tolerance=grouping["angle_tolerance"]
+                    )
+                    vacancy_classes = group_defect_sites(
+                        pre_vds.generate(ss), grouping["cutoff"], grouping["tol"]
+                    )
+                    vds = [jj[0] for jj in vacancy_classes]
+                else:
+                    pre_vds = VacancyGenerator()
+                    vds = pre_vds.generate(ss)
                 dss = []
                 for jj in vds:
                     dss.append(
@@ -143,6 +169,11 @@ class Vacancy(Property):
                     )
 
                 print("gen vacancy with supercell " + str(self.supercell))
+                if grouping:
+                    print(
+                        "%d unique vacancies for %d sites"
+                        % (len(vacancy_classes), sum(jj[1] for jj in vacancy_classes))
+                    )
                 os.chdir(path_to_work)
                 if os.path.exists(POSCAR):
                     os.remove(POSCAR)
@@ -160,6 +191,7 @@ class Vacancy(Property):
                         "conf.lmp",
                         "in.lammps",
                         "STRU",
+                        DEFECT_SITE_FILE,
                     ]:
                         if os.path.exists(jj):
                             os.remove(jj)
@@ -170,6 +202,8 @@ class Vacancy(Property):
                         #os.remove("POSCAR")
                     # np.savetxt('supercell.out', self.supercell, fmt='%d')
                     dumpfn(self.supercell, "supercell.json")
+                    if grouping:
+                        dumpfn(defect_site_record(*vacancy_classes[ii]), DEFECT_SITE_FILE, indent=4)
         os.chdir(cwd)
         return task_list
 
@@ -197,6 +231,7 @@ class Vacancy(Property):
             equi_result = loadfn(os.path.join(equi_path, "result.json"))
             equi_epa = equi_result["energies"][-1] / sum(equi_result["atom_numbs"])
 
+            weighted_evac = []
             for idid, ii in enumerate(all_tasks):
                 structure_dir = os.path.basename(ii)
                 task_result = loadfn(all_res[idid])
@@ -215,6 +250,16 @@ class Vacancy(Property):
                     task_result["energies"][-1],
                     equi_epa * natoms,
                 ]
+                # with site grouping a task stands for multiplicity vacancy sites
+                site_file = os.path.join(ii, DEFECT_SITE_FILE)
+                if os.path.isfile(site_file):
+                    multiplicity = loadfn(site_file)["multiplicity"]
+                    res_data[str(supercell_index) + "-" + structure_dir].append(multiplicity)
+                    weighted_evac.append((evac, multiplicity))
+            if weighted_evac:
+                evacs, weights = np.array(weighted_evac).T
+                ptr_data += "Site multiplicities: %s\n" % " ".join("%d" % jj for jj in weights)
+                ptr_data += "Site-averaged Vac_E(eV): %7.3f\n" % np.average(evacs, weights=weights)
 
         else:
             if "init_data_path" not in self.parameter:
@@ -226,6 +271,7 @@ class Vacancy(Property):
                 all_tasks,
                 ptr_data,
                 self.parameter.get("reprod_last_frame", False),
+                self.parameter.get("reprod_trajectory", False),
             )
 
         with open(output_file, "w") as fp:
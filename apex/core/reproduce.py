@@ -1,17 +1,66 @@
 import glob
+import json
 import os
 
 import numpy as np
 from monty.serialization import loadfn
 
+from apex.core.calculator import LAMMPS_INTER_TYPE
 from apex.core.calculator.lib import abacus_utils
+from apex.core.calculator.lib import lammps_utils
 from dflow.python import upload_packages
 upload_packages.append(__file__)
 
+# trajectory mode: one LAMMPS `rerun` task per initial task
+REPRO_TRAJECTORY_DUMP = "traj.dump"
+REPRO_FRAMES_FILE = "repro_frames.npz"
+
+
+def reprod_trajectory_requested(task_param) -> bool:
+    """
+    Whether a property parameter dict asks to reproduce whole trajectories
+    in single rerun tasks via ``reprod_trajectory``.
+    """
+    if not isinstance(task_param, dict):
+        return False
+    return bool(task_param.get("reproduce", False) and task_param.get("reprod_trajectory", False))
+
+
+def write_repro_frames(task_dir, energies, forces, virials, cells=None) -> None:
+    """
+    Save the per-frame energies (eV), forces (eV/A), virials (eV) and cells (A)
+    of a trajectory task into one array file.
+    """
+    arrays = {
+        "energies": np.asarray(energies, dtype=float),
+        "forces": np.asarray(forces, dtype=float),
+        "virials": np.asarray(virials, dtype=float),
+    }
+    if cells is not None:
+        arrays["cells"] = np.asarray(cells, dtype=float)
+    np.savez(os.path.join(task_dir, REPRO_FRAMES_FILE), **arrays)
+
+
+def load_repro_frames(task_dir) -> dict:
+    with np.load(os.path.join(task_dir, REPRO_FRAMES_FILE)) as data:
+        return {key: data[key] for key in data.files}
+
 
 def make_repro(
-    inter_param, init_data_path, init_from_suffix, path_to_work, reprod_last_frame=True
+    inter_param,
+    init_data_path,
+    init_from_suffix,
+    path_to_work,
+    reprod_last_frame=True,
+    trajectory=False,
 ):
+    """
+    Make the tasks re-evaluating the frames of the initial tasks: one task per
+    frame, or with trajectory one LAMMPS rerun task per initial task holding
+    all its frames in REPRO_TRAJECTORY_DUMP.
+    """
+    if trajectory and inter_param["type"] not in LAMMPS_INTER_TYPE:
+        raise RuntimeError("reprod_trajectory requires a LAMMPS interaction")
     path_to_work = os.path.abspath(path_to_work)
     property_type = path_to_work.split("/")[-1].split("_")[0]
     init_data_path = os.path.join(
@@ -51,6 +100,21 @@ def make_repro(
         nframe = 1 if reprod_last_frame else len(task_result["energies"])
         if property_type == "interstitial":
             insert_element = fin_element.readline().split()[0]
+        if trajectory:
+            if property_type == "interstitial":
+                print(insert_element, file=fout_element)
+            output_task = os.path.join(path_to_work, "task.%06d" % task_num)
+            task_num += 1
+            task_list.append(output_task)
+            os.makedirs(output_task, exist_ok=True)
+            os.chdir(output_task)
+            for kk in ["POSCAR", "conf.lmp", "in.lammps", REPRO_TRAJECTORY_DUMP, REPRO_FRAMES_FILE]:
+                if os.path.exists(kk):
+                    os.remove(kk)
+            frames = list(range(len(task_result["energies"]) - nframe, len(task_result["energies"])))
+            task_result.to("vasp/poscar", "POSCAR", frame_idx=frames[0])
+            lammps_utils.write_rerun_dump(task_result, frames, REPRO_TRAJECTORY_DUMP, inter_param["type_map"])
+            continue
         for jj in range(nframe):
             if property_type == "interstitial":
                 print(insert_element, file=fout_element)
@@ -89,9 +153,83 @@ def make_repro(
     return task_list
 
 
+def _json_array(value, dtype=float):
+    # numpy arrays are stored by monty as {"@module": "numpy", "@class": "array", "data": ...}
+    if isinstance(value, dict) and value.get("@class") == "array":
+        value = value["data"]
+    return np.asarray(value, dtype=dtype)
+
+
+def load_result_arrays(result_file) -> dict:
+    """
+    Energies, forces, virials, cells, atom types and numbers of a result_task.json,
+    decoded straight from the JSON without building a dpdata system.
+    """
+    with open(result_file, "r") as fp:
+        doc = json.load(fp)
+    if not isinstance(doc, dict):
+        raise RuntimeError(f"no result in {result_file}")
+    data = doc.get("data", doc)
+    arrays = {
+        "atom_numbs": [int(ii) for ii in data["atom_numbs"]],
+        "atom_types": _json_array(data["atom_types"], int),
+    }
+    for key in ["energies", "forces", "virials", "cells"]:
+        if key in data:
+            arrays[key] = _json_array(data[key])
+    return arrays
+
+
+def _parity_rmse(ref, out, nframe, natoms):
+    """
+    RMSE of the reproduced forces (eV/A) and virials per atom (eV/atom) against
+    the last nframe reference frames, None where either side lacks them.
+    Reproduced atoms follow the type-sorted POSCAR order and the reproduced
+    cells may be rotated (LAMMPS), so both are mapped back onto the reference.
+    """
+    ref_cells = ref.get("cells")
+    out_cells = out.get("cells")
+    if ref_cells is not None and out_cells is not None and out_cells.shape == (nframe, 3, 3):
+        # out_cell @ rot = ref_cell
+        rot = np.linalg.solve(out_cells, ref_cells[-nframe:])
+    else:
+        rot = np.broadcast_to(np.eye(3), (nframe, 3, 3))
+    force_rmse = virial_rmse = None
+    ref_forces = ref.get("forces")
+    out_forces = out.get("forces")
+    if ref_forces is not None and out_forces is not None and out_forces.shape == (nframe, natoms, 3):
+        order = np.lexsort((np.arange(natoms), ref["atom_types"]))
+        diff = np.einsum("fai,fij->faj", out_forces, rot) - ref_forces[-nframe:][:, order]
+        force_rmse = float(np.sqrt(np.mean(diff**2)))
+    ref_virials = ref.get("virials")
+    out_virials = out.get("virials")
+    if ref_virials is not None and out_virials is not None and out_virials.shape == (nframe, 3, 3):
+        diff = np.einsum("fji,fjk,fkl->fil", rot, out_virials, rot) - ref_virials[-nframe:]
+        virial_rmse = float(np.sqrt(np.mean(diff**2))) / natoms
+    return force_rmse, virial_rmse
+
+
+def _stack_frames(frames, key):
+    # last frame of every per-frame result, None unless all of them have key
+    if not frames or any(key not in ff for ff in frames):
+        return None
+    return np.stack([ff[key][-1] for ff in frames])
+
+
 def post_repro(
-    init_data_path, init_from_suffix, all_tasks, ptr_data, reprod_last_frame=True
+    init_data_path,
+    init_from_suffix,
+    all_tasks,
+    ptr_data,
+    reprod_last_frame=True,
+    trajectory=False,
 ):
+    """
+    Compare the reproduced energies with the initial ones. Every result file is
+    decoded once into contiguous per-frame arrays; the shift alignment and the
+    per-trajectory RMSE are segment reductions over these arrays. Force and
+    virial parity is reported when both sides carry them.
+    """
     ptr_data += "Reproduce: Initial_path Init_E(eV/atom)  Reprod_E(eV/atom)  Difference(eV/atom)\n"
     struct_output_name = all_tasks[0].split("/")[-3]
     property_type = all_tasks[0].split("/")[-2].split("_")[0]
@@ -100,9 +238,8 @@ def post_repro(
     )
     init_data_path_list = glob.glob(init_data_path)
     init_data_path_list.sort()
-    # cwd = os.getcwd()
     struct_init_name_list = [ii.split("/")[-2] for ii in init_data_path_list]
-    
+
     assert struct_output_name in struct_init_name_list, "Output structure name not found in initial structure list"
 
     label = struct_init_name_list.index(struct_output_name)
@@ -115,49 +252,77 @@ def post_repro(
     ), "There is no task in previous calculations path"
     init_data_task_todo.sort()
 
-    idid = 0
-    init_ener_tot = []
-    output_ener_tot = []
-    res_data = {}
+    refs = [load_result_arrays(os.path.join(ii, "result_task.json")) for ii in init_data_task_todo]
+    nframes = np.array([1 if reprod_last_frame else len(ref["energies"]) for ref in refs])
+    offsets = np.concatenate([[0], np.cumsum(nframes)])
+    nseg = len(refs)
 
-    for ii in init_data_task_todo:
-        init_task_result = loadfn(os.path.join(ii, "result_task.json"))
-        nframe = 1 if reprod_last_frame else len(init_task_result["energies"])
-        # idid += nframe
-        natoms = np.sum(init_task_result["atom_numbs"])
-        init_ener = init_task_result["energies"][-nframe:]
-        init_ener_tot.extend(list(init_ener))
-        output_ener = []
-        for jj in range(idid, idid + nframe):
-            output_task_result = loadfn(os.path.join(all_tasks[jj], "result_task.json"))
-            output_ener_tot.extend(output_task_result["energies"])
-            output_epa = output_task_result["energies"] / natoms
-            output_ener.append(output_epa)
-
-            init_epa = init_ener[jj - idid] / natoms
-            ptr_data += "%s %7.3f  %7.3f  %7.3f\n" % (
+    # reproduced frames of every initial task, as arrays
+    if trajectory:
+        if len(all_tasks) < nseg:
+            raise RuntimeError("reproduce tasks not equal to init")
+        outs = [load_repro_frames(task) for task in all_tasks[:nseg]]
+        for task, out, nframe in zip(all_tasks, outs, nframes):
+            if len(out["energies"]) != nframe:
+                raise RuntimeError(
+                    "%s: %d frames reproduced, %d expected" % (task, len(out["energies"]), nframe)
+                )
+        output_ener = np.concatenate([out["energies"] for out in outs])
+    else:
+        if len(all_tasks) < offsets[-1]:
+            raise RuntimeError("reproduce tasks not equal to init")
+        frames = [load_result_arrays(os.path.join(task, "result_task.json")) for task in all_tasks[:offsets[-1]]]
+        output_ener = np.array([ff["energies"][-1] for ff in frames], dtype=float)
+        outs = []
+        for kk in range(nseg):
+            seg_frames = frames[offsets[kk]:offsets[kk + 1]]
+            outs.append({key: _stack_frames(seg_frames, key) for key in ["forces", "virials", "cells"]})
+
+    seg = np.repeat(np.arange(nseg), nframes)
+    natoms = np.array([sum(ref["atom_numbs"]) for ref in refs])
+    init_ener = np.concatenate([ref["energies"][len(ref["energies"]) - nn:] for ref, nn in zip(refs, nframes)])
+    init_epa = init_ener / natoms[seg]
+    output_epa = output_ener / natoms[seg]
+
+    ptr_data += "".join(
+        "%s %7.3f  %7.3f  %7.3f\n" % (name, ee0, ee1, ee1 - ee0)
+        for name, ee0, ee1 in zip(np.repeat(init_data_task_todo, nframes), init_epa, output_epa)
+    )
+
+    last = offsets[1:] - 1
+    weight = np.ones(len(seg))
+    if reprod_last_frame:
+        aligned_epa = output_epa
+    else:
+        # align the last frames, the first frame of each trajectory is left out
+        aligned_epa = output_epa - (output_epa[last] - init_epa[last])[seg]
+        weight[offsets[:-1]] = 0.0
+    diff = aligned_epa - init_epa
+    with np.errstate(divide="ignore", invalid="ignore"):
+        errors = np.sqrt(
+            np.bincount(seg, weights=weight * diff**2, minlength=nseg)
+            / np.bincount(seg, weights=weight, minlength=nseg)
+        )
+
+    res_data = {}
+    parity_lines = []
+    for kk, ii in enumerate(init_data_task_todo):
+        res_data[ii] = {"nframes": int(nframes[kk]), "error": float(errors[kk])}
+        force_rmse, virial_rmse = _parity_rmse(refs[kk], outs[kk], nframes[kk], natoms[kk])
+        if force_rmse is None and virial_rmse is None:
+            continue
+        if force_rmse is not None:
+            res_data[ii]["force_rmse"] = force_rmse
+        if virial_rmse is not None:
+            res_data[ii]["virial_rmse"] = virial_rmse
+        parity_lines.append(
+            "%s %s  %s\n" % (
                 ii,
-                init_epa,
-                output_epa,
-                output_epa - init_epa,
+                "%10.4f" % force_rmse if force_rmse is not None else "%10s" % "-",
+                "%10.4f" % virial_rmse if virial_rmse is not None else "%10s" % "-",
             )
-        idid += nframe
-        output_ener = np.array(output_ener)
-        output_ener = np.reshape(output_ener, [-1, 1])
-        init_ener = np.reshape(init_ener, [-1, 1]) / natoms
-        if reprod_last_frame:
-            error_start = 0
-        else:
-            error_start = 1
-            output_ener -= output_ener[-1] - init_ener[-1]
-        diff = output_ener - init_ener
-        diff = diff[error_start:]
-        error = np.linalg.norm(diff) / np.sqrt(np.size(output_ener) - error_start)
-        res_data[ii] = {"nframes": len(init_ener), "error": error}
-
-    if not len(init_ener_tot) == len(output_ener_tot):
-        raise RuntimeError("reproduce tasks not equal to init")
-    #    for ii in range(len(lmp_ener_tot)):
-    #        ptr_data += '%7.3f  %7.3f  %7.3f\n' % (vasp_ener_tot[ii], lmp_ener_tot[ii],
-    #                                               lmp_ener_tot[ii] - vasp_ener_tot[ii])
+        )
+    if parity_lines:
+        ptr_data += "Reproduce parity: Initial_path Force_RMSE(eV/A)  Virial_RMSE(eV/atom)\n"
+        ptr_data += "".join(parity_lines)
     return res_data, ptr_data
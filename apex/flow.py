@@ -1,11 +1,14 @@
+import asyncio
 import os
 import glob
+import tempfile
 import time
 import shutil
 import re
 import copy
 import datetime
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Optional,
     Type,
@@ -18,20 +21,37 @@ from dflow import (
     Task,
     upload_artifact,
     download_artifact,
-    Workflow
+    Workflow,
+    config,
+    s3_config
 )
+from dflow.common import LocalArtifact, S3Artifact
+from dflow.python import PythonOPTemplate
 from dflow.python.op import OP
 from dflow.plugins.dispatcher import DispatcherExecutor
 from apex.superop.RelaxationFlow import RelaxationFlow
 from apex.superop.SimplePropertySteps import SimplePropertySteps
 from apex.op.relaxation_ops import RelaxMake, RelaxPost
 from apex.op.property_ops import PropsMake, PropsPost
+from apex.op.upload_ops import UnpackUpload
+from apex.core.lib.upload_manifest import (
+    build_manifest,
+    dump_upload_index,
+    load_upload_index,
+    manifest_blobs,
+    write_pack,
+)
 from apex.utils import json2dict, handle_prop_suffix
 
 from dflow.python import upload_packages
 
 upload_packages.append(__file__)
 
+# adaptive poll interval of the workflow monitor (seconds)
+MONITOR_POLL_INTERVAL = 4
+MONITOR_MAX_POLL_INTERVAL = 60
+FINAL_PHASES = ("Succeeded", "Failed")
+
 
 class FlowGenerator:
     def __init__(
@@ -51,6 +71,8 @@ class FlowGenerator:
             executor: Optional[DispatcherExecutor] = None,
             upload_python_packages: Optional[List[os.PathLike]] = None,
             debug_mode: bool = False,
+            upload_mode: str = "full",
+            download_workers: int = 4,
     ):
         self.download_path = None
         self.upload_path = None
@@ -73,6 +95,9 @@ class FlowGenerator:
         self.executor = executor
         self.upload_python_packages = upload_python_packages
         self.debug_mode = debug_mode
+        self.upload_mode = upload_mode
+        self.download_workers = download_workers
+        self._pack_dir = None
 
     @staticmethod
     def regulate_name(name):
@@ -526,102 +551,154 @@ class FlowGenerator:
                 f"{workflow_kind} failed with {len(failed_entries)} failed step(s):\n{details}"
             )
 
+    async def _watch_steps(self, keys: List[str], on_final, progress=None, on_poll=None):
+        """
+        Poll the workflow until every step in keys reached a final phase.
+        Only phase changes since the previous poll are acted on and the poll
+        interval backs off while nothing changes. ``on_final(key, step, step_info)``
+        runs in a pool of ``download_workers`` threads, so the artifacts of steps
+        finishing together are retrieved concurrently; an exception raised by it
+        stops the monitor. ``on_poll(left)`` runs after every poll and
+        ``progress(left)`` returns the throttled waiting message.
+        """
+        loop = asyncio.get_running_loop()
+        left = list(keys)
+        phases = {}
+        running = set()
+        interval = MONITOR_POLL_INTERVAL
+        last_message, last_log_ts = None, time.time()
+
+        def reap(done):
+            for fut in done:
+                running.discard(fut)
+                fut.result()
+
+        pool = ThreadPoolExecutor(max_workers=max(1, self.download_workers))
+        try:
+            while left:
+                deadline = loop.time() + interval
+                while loop.time() < deadline:
+                    if running:
+                        done, _ = await asyncio.wait(
+                            running,
+                            timeout=deadline - loop.time(),
+                            return_when=asyncio.FIRST_EXCEPTION
+                        )
+                        reap(done)
+                    else:
+                        await asyncio.sleep(deadline - loop.time())
+                step_info = await loop.run_in_executor(None, self.workflow.query)
+                changed = False
+                seen = set()
+                # a single scan over the workflow nodes for all pending keys
+                for step in step_info.get_step(key=left):
+                    kk = getattr(step, "key", None)
+                    if kk not in left or kk in seen:
+                        continue
+                    seen.add(kk)
+                    phase = step['phase']
+                    if phase == phases.get(kk):
+                        continue
+                    phases[kk] = phase
+                    changed = True
+                    if phase in FINAL_PHASES:
+                        left.remove(kk)
+                        running.add(loop.run_in_executor(pool, on_final, kk, step, step_info))
+                interval = MONITOR_POLL_INTERVAL if changed \
+                    else min(interval * 2, MONITOR_MAX_POLL_INTERVAL)
+                if on_poll is not None:
+                    await loop.run_in_executor(None, on_poll, list(left))
+                if progress is not None and left:
+                    message = progress(list(left))
+                    if message != last_message or time.time() - last_log_ts > 30:
+                        print(message)
+                        last_message, last_log_ts = message, time.time()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_EXCEPTION)
+                reap(done)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _run_monitor(self, keys: List[str], on_final, progress=None, on_poll=None):
+        asyncio.run(self._watch_steps(keys, on_final, progress=progress, on_poll=on_poll))
+
     def _monitor_relax(self):
         print('Waiting for relaxation result...')
-        failed_detail = None
-        while True:
-            time.sleep(4)
-            step_info = self.workflow.query()
-            wf_status = self.workflow.query_status()
-            if wf_status == 'Failed':
-                if failed_detail is not None:
-                    raise RuntimeError(
-                        f"Workflow failed (ID: {self.workflow.id}, UID: {self.workflow.uid})\n"
-                        f"{failed_detail}"
-                    )
-                raise RuntimeError(f'Workflow failed (ID: {self.workflow.id}, UID: {self.workflow.uid})')
-            try:
-                relax_post = step_info.get_step(name='relaxation-cal')[0]
-            except IndexError:
-                continue
-            if relax_post['phase'] == 'Succeeded':
+
+        def on_final(kk, step, step_info):
+            if step['phase'] == 'Succeeded':
                 print(f'Relaxation finished (ID: {self.workflow.id}, UID: {self.workflow.uid})')
                 print('Retrieving completed tasks to local...')
                 self._download_artifact_with_retry(
-                    artifact=relax_post.outputs.artifacts['retrieve_path'],
+                    artifact=step.outputs.artifacts['retrieve_path'],
                     path=self.download_path
                 )
-                break
-            if relax_post['phase'] == 'Failed':
-                main_log_path, main_log_error = self._download_step_main_logs(
-                    relax_post,
-                    "relaxation-cal",
-                    step_info=step_info,
-                )
-                failed_detail = self._format_step_failure(
-                    relax_post,
-                    f"Relaxation step failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
-                    main_log_path=main_log_path,
-                    main_log_error=main_log_error,
-                )
-                raise RuntimeError(failed_detail)
+                return
+            main_log_path, main_log_error = self._download_step_main_logs(
+                step,
+                "relaxation-cal",
+                step_info=step_info,
+            )
+            raise RuntimeError(self._format_step_failure(
+                step,
+                f"Relaxation step failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
+                main_log_path=main_log_path,
+                main_log_error=main_log_error,
+            ))
+
+        def on_poll(left):
+            if left and self.workflow.query_status() == 'Failed':
+                raise RuntimeError(f'Workflow failed (ID: {self.workflow.id}, UID: {self.workflow.uid})')
+
+        self._run_monitor(["relaxationcal"], on_final, on_poll=on_poll)
 
     def _monitor_props(
             self,
             subprops_key_list: List[str],
     ):
-        subprops_left = subprops_key_list.copy()
         subprops_failed_list = []
         failed_details = []
-        print(f'Waiting for sub-property results ({len(subprops_left)} left)...')
-        while True:
-            time.sleep(4)
-            step_info = self.workflow.query()
-            for kk in subprops_left:
-                try:
-                    step = step_info.get_step(key=kk)[0]
-                except IndexError:
-                    continue
-                if step['phase'] == 'Succeeded':
-                    print(f'Sub-workflow {kk} finished (ID: {self.workflow.id}, UID: {self.workflow.uid})')
-                    print('Retrieving completed tasks to local...')
-                    self._download_artifact_with_retry(
-                        artifact=step.outputs.artifacts['retrieve_path'],
-                        path=self.download_path
-                    )
-                    subprops_left.remove(kk)
-                    if subprops_left:
-                        print(f'Waiting for sub-property results ({len(subprops_left)} left)...')
-                elif step['phase'] == 'Failed':
-                    print(f'Sub-workflow {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})')
-                    subprops_failed_list.append(kk)
-                    main_log_path, main_log_error = self._download_step_main_logs(
-                        step,
-                        kk,
-                        step_info=step_info,
-                    )
-                    diagnostic_artifacts = self._download_step_diagnostic_artifacts(
-                        step,
-                        kk,
-                        step_info=step_info,
-                    )
-                    failed_details.append(
-                        self._format_step_failure(
-                            step,
-                            f"Sub-property {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
-                            main_log_path=main_log_path,
-                            main_log_error=main_log_error,
-                            diagnostic_artifacts=diagnostic_artifacts,
-                        )
-                    )
-                    subprops_left.remove(kk)
-                    if subprops_left:
-                        print(f'Waiting for sub-property results ({len(subprops_left)} left)...')
-            if not subprops_left:
-                print(f'Workflow finished with {len(subprops_failed_list)} sub-property failed '
-                      f'(ID: {self.workflow.id}, UID: {self.workflow.uid})')
-                self._raise_if_failed(failed_details, "Property workflow")
-                break
+        print(f'Waiting for sub-property results ({len(subprops_key_list)} left)...')
+
+        def on_final(kk, step, step_info):
+            if step['phase'] == 'Succeeded':
+                print(f'Sub-workflow {kk} finished (ID: {self.workflow.id}, UID: {self.workflow.uid})')
+                print('Retrieving completed tasks to local...')
+                self._download_artifact_with_retry(
+                    artifact=step.outputs.artifacts['retrieve_path'],
+                    path=self.download_path
+                )
+                return
+            print(f'Sub-workflow {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})')
+            subprops_failed_list.append(kk)
+            main_log_path, main_log_error = self._download_step_main_logs(
+                step,
+                kk,
+                step_info=step_info,
+            )
+            diagnostic_artifacts = self._download_step_diagnostic_artifacts(
+                step,
+                kk,
+                step_info=step_info,
+            )
+            failed_details.append(
+                self._format_step_failure(
+                    step,
+                    f"Sub-property {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
+                    main_log_path=main_log_path,
+                    main_log_error=main_log_error,
+                    diagnostic_artifacts=diagnostic_artifacts,
+                )
+            )
+
+        self._run_monitor(
+            subprops_key_list,
+            on_final,
+            progress=lambda left: f'Waiting for sub-property results ({len(left)} left)...'
+        )
+        print(f'Workflow finished with {len(subprops_failed_list)} sub-property failed '
+              f'(ID: {self.workflow.id}, UID: {self.workflow.uid})')
+        self._raise_if_failed(failed_details, "Property workflow")
 
     def _set_relax_flows(
             self,
@@ -745,60 +822,43 @@ class FlowGenerator:
         return task_list, task_key_list
 
     def _monitor_relax_flows(self, relax_key_list: List[str]):
-        relax_left = relax_key_list.copy()
         relax_failed_list = []
         failed_details = []
-        print(f'Waiting for relaxation results ({len(relax_left)} left)...')
-        last_count = len(relax_left)
-        last_log_ts = time.time()
-        while True:
-            time.sleep(4)
-            step_info = self.workflow.query()
-            wf_status = self.workflow.query_status()
-            if wf_status == 'Failed' and not relax_left:
-                break
-            for kk in relax_left.copy():
-                try:
-                    step = step_info.get_step(key=kk)[0]
-                except IndexError:
-                    continue
-                if step['phase'] == 'Succeeded':
-                    print(f'Sub relaxation {kk} finished (ID: {self.workflow.id}, UID: {self.workflow.uid})')
-                    print('Retrieving completed tasks to local...')
-                    self._download_artifact_with_retry(
-                        artifact=step.outputs.artifacts['retrieve_path'],
-                        path=self.download_path
-                    )
-                    relax_left.remove(kk)
-                    if relax_left:
-                        print(f'Waiting for relaxation results ({len(relax_left)} left)...')
-                elif step['phase'] == 'Failed':
-                    print(f'Sub relaxation {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})')
-                    relax_failed_list.append(kk)
-                    main_log_path, main_log_error = self._download_step_main_logs(
-                        step,
-                        kk,
-                        step_info=step_info,
-                    )
-                    failed_details.append(
-                        self._format_step_failure(
-                            step,
-                            f"Sub relaxation {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
-                            main_log_path=main_log_path,
-                            main_log_error=main_log_error,
-                        )
-                    )
-                    relax_left.remove(kk)
-            if not relax_left:
-                print(f'Workflow finished with {len(relax_failed_list)} sub-relaxation failed '
-                      f'(ID: {self.workflow.id}, UID: {self.workflow.uid})')
-                self._raise_if_failed(failed_details, "Relaxation workflow")
-                break
-            # throttled waiting log
-            if len(relax_left) != last_count or time.time() - last_log_ts > 30:
-                print(f'Waiting for relaxation results ({len(relax_left)} left)...')
-                last_count = len(relax_left)
-                last_log_ts = time.time()
+        print(f'Waiting for relaxation results ({len(relax_key_list)} left)...')
+
+        def on_final(kk, step, step_info):
+            if step['phase'] == 'Succeeded':
+                print(f'Sub relaxation {kk} finished (ID: {self.workflow.id}, UID: {self.workflow.uid})')
+                print('Retrieving completed tasks to local...')
+                self._download_artifact_with_retry(
+                    artifact=step.outputs.artifacts['retrieve_path'],
+                    path=self.download_path
+                )
+                return
+            print(f'Sub relaxation {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})')
+            relax_failed_list.append(kk)
+            main_log_path, main_log_error = self._download_step_main_logs(
+                step,
+                kk,
+                step_info=step_info,
+            )
+            failed_details.append(
+                self._format_step_failure(
+                    step,
+                    f"Sub relaxation {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
+                    main_log_path=main_log_path,
+                    main_log_error=main_log_error,
+                )
+            )
+
+        self._run_monitor(
+            relax_key_list,
+            on_final,
+            progress=lambda left: f'Waiting for relaxation results ({len(left)} left)...'
+        )
+        print(f'Workflow finished with {len(relax_failed_list)} sub-relaxation failed '
+              f'(ID: {self.workflow.id}, UID: {self.workflow.uid})')
+        self._raise_if_failed(failed_details, "Relaxation workflow")
 
     def _monitor_joint_flows(self,
                              relax_key_list: List[str],
@@ -808,98 +868,61 @@ class FlowGenerator:
         structure's results as soon as its property step finishes. This avoids
         waiting for all relaxations before observing property completion.
         """
-        relax_left = relax_key_list.copy()
+        relax_keys = set(relax_key_list)
         relax_failed = []
-        relax_failed_details = []
-        props_left = subprops_key_list.copy()
         props_failed = []
         props_failed_details = []
-        print(f'Waiting for relax/prop results (relax {len(relax_left)}, props {len(props_left)})...')
-        last_counts = (len(relax_left), len(props_left))
-        last_log_ts = time.time()
-        while relax_left or props_left:
-            time.sleep(4)
-            step_info = self.workflow.query()
-
-            # relax steps
-            for kk in relax_left.copy():
-                try:
-                    step = step_info.get_step(key=kk)[0]
-                except IndexError:
-                    continue
-                if step['phase'] == 'Succeeded':
-                    print(f'Sub relaxation {kk} finished')
-                    print('Retrieving completed tasks to local...')
-                    retrieve = step.get('outputs', {}).get('artifacts', {}).get('retrieve_path', None)
-                    if retrieve:
-                        self._download_artifact_with_retry(artifact=retrieve, path=self.download_path)
-                    relax_left.remove(kk)
-                elif step['phase'] == 'Failed':
-                    print(f'Sub relaxation {kk} failed')
-                    relax_failed.append(kk)
-                    main_log_path, main_log_error = self._download_step_main_logs(
-                        step,
-                        kk,
-                        step_info=step_info,
-                    )
-                    terminate_message = self._terminate_workflow_after_relax_failure()
-                    failure_detail = self._format_step_failure(
-                        step,
-                        f"Sub relaxation {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
-                        main_log_path=main_log_path,
-                        main_log_error=main_log_error,
-                    )
-                    relax_failed_details.append(f"{failure_detail}\n  action: {terminate_message}")
-                    relax_left.remove(kk)
-                    self._raise_if_failed(relax_failed_details, "Joint workflow")
-
-            # property steps
-            for kk in props_left.copy():
-                try:
-                    step = step_info.get_step(key=kk)[0]
-                except IndexError:
-                    continue
-                if step['phase'] == 'Succeeded':
-                    print(f'Sub property {kk} finished')
-                    print('Retrieving completed tasks to local...')
-                    retrieve = step.get('outputs', {}).get('artifacts', {}).get('retrieve_path', None)
-                    if retrieve:
-                        self._download_artifact_with_retry(artifact=retrieve, path=self.download_path)
-                    props_left.remove(kk)
-                elif step['phase'] == 'Failed':
-                    print(f'Sub property {kk} failed')
-                    props_failed.append(kk)
-                    main_log_path, main_log_error = self._download_step_main_logs(
-                        step,
-                        kk,
-                        step_info=step_info,
-                    )
-                    diagnostic_artifacts = self._download_step_diagnostic_artifacts(
-                        step,
-                        kk,
-                        step_info=step_info,
-                    )
-                    props_failed_details.append(
-                        self._format_step_failure(
-                            step,
-                            f"Sub property {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
-                            main_log_path=main_log_path,
-                            main_log_error=main_log_error,
-                            diagnostic_artifacts=diagnostic_artifacts,
-                        )
-                    )
-                    props_left.remove(kk)
+        print(f'Waiting for relax/prop results (relax {len(relax_key_list)}, props {len(subprops_key_list)})...')
+
+        def on_final(kk, step, step_info):
+            kind = 'relaxation' if kk in relax_keys else 'property'
+            if step['phase'] == 'Succeeded':
+                print(f'Sub {kind} {kk} finished')
+                print('Retrieving completed tasks to local...')
+                retrieve = step.get('outputs', {}).get('artifacts', {}).get('retrieve_path', None)
+                if retrieve:
+                    self._download_artifact_with_retry(artifact=retrieve, path=self.download_path)
+                return
+            print(f'Sub {kind} {kk} failed')
+            main_log_path, main_log_error = self._download_step_main_logs(
+                step,
+                kk,
+                step_info=step_info,
+            )
+            if kk in relax_keys:
+                relax_failed.append(kk)
+                terminate_message = self._terminate_workflow_after_relax_failure()
+                failure_detail = self._format_step_failure(
+                    step,
+                    f"Sub relaxation {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
+                    main_log_path=main_log_path,
+                    main_log_error=main_log_error,
+                )
+                self._raise_if_failed([f"{failure_detail}\n  action: {terminate_message}"], "Joint workflow")
+            props_failed.append(kk)
+            diagnostic_artifacts = self._download_step_diagnostic_artifacts(
+                step,
+                kk,
+                step_info=step_info,
+            )
+            props_failed_details.append(
+                self._format_step_failure(
+                    step,
+                    f"Sub property {kk} failed (ID: {self.workflow.id}, UID: {self.workflow.uid})",
+                    main_log_path=main_log_path,
+                    main_log_error=main_log_error,
+                    diagnostic_artifacts=diagnostic_artifacts,
+                )
+            )
 
-            if relax_left or props_left:
-                counts = (len(relax_left), len(props_left))
-                if counts != last_counts or time.time() - last_log_ts > 30:
-                    print(f'Waiting... (relax {counts[0]}, props {counts[1]})')
-                    last_counts = counts
-                    last_log_ts = time.time()
+        def progress(left):
+            n_relax = len(relax_keys.intersection(left))
+            return f'Waiting... (relax {n_relax}, props {len(left) - n_relax})'
 
+        self._run_monitor(relax_key_list + subprops_key_list, on_final, progress=progress)
         print(f'Joint monitoring done: {len(relax_failed)} relax failed, {len(props_failed)} property failed '
               f'(ID: {self.workflow.id}, UID: {self.workflow.uid})')
-        self._raise_if_failed(relax_failed_details + props_failed_details, "Joint workflow")
+        self._raise_if_failed(props_failed_details, "Joint workflow")
 
     def dump_flow_id(self):
         log_file = os.path.join(self.download_path, '.workflow.log')
@@ -1152,6 +1175,76 @@ class FlowGenerator:
 
         return subprops_list, subprops_key_list
 
+    @staticmethod
+    def _artifact_repository() -> str:
+        if config["mode"] == "debug" and not config["debug_s3"]:
+            return "debug:%s" % os.path.abspath(config["debug_workdir"])
+        return json.dumps({kk: str(s3_config.get(kk)) for kk in ["endpoint", "bucket_name", "repo_key"]},
+                          sort_keys=True)
+
+    @staticmethod
+    def _artifact_ref(artifact) -> dict:
+        if isinstance(artifact, LocalArtifact):
+            return {"local_path": artifact.local_path}
+        return {"key": artifact.key}
+
+    @staticmethod
+    def _artifact_from_ref(ref):
+        if "local_path" in ref:
+            if not os.path.isdir(ref["local_path"]):
+                return None
+            return LocalArtifact(local_path=ref["local_path"])
+        return S3Artifact(key=ref["key"])
+
+    def _upload_work_dir(self, upload_path, as_task: bool = False):
+        """
+        Upload the packed work directory. In incremental mode only blobs missing from
+        the base artifact of an earlier submission are uploaded, and an UnpackUpload
+        step rebuilding the directory is added to the workflow ahead of the subflows.
+        """
+        if self.upload_mode != "incremental":
+            return upload_artifact(upload_path)
+
+        repository = self._artifact_repository()
+        manifest = build_manifest(upload_path)
+        blobs = manifest_blobs(manifest)
+        index = load_upload_index(self.download_path, repository)
+        base = self._artifact_from_ref(index["artifact"]) if index else None
+        base_digests = set(index.get("digests", [])) if base else set()
+        new_digests = [ii for ii in blobs if ii not in base_digests]
+        new_bytes = sum(blobs[ii][0] for ii in new_digests)
+        reused_bytes = sum(blobs[ii][0] for ii in blobs if ii in base_digests)
+        # start a new base once most of the content is new
+        rebase = base is None or new_bytes > reused_bytes
+
+        # the pack must outlive this call, debug mode artifacts may link into it
+        if self._pack_dir is not None:
+            self._pack_dir.cleanup()
+        self._pack_dir = tempfile.TemporaryDirectory()
+        write_pack(upload_path, manifest, self._pack_dir.name,
+                   list(blobs) if rebase else new_digests)
+        pack = upload_artifact(self._pack_dir.name)
+        if rebase:
+            base = pack
+            dump_upload_index(self.download_path, repository, self._artifact_ref(pack), blobs)
+            print(f'Uploaded {len(blobs)} blobs ({new_bytes + reused_bytes} bytes) as a new upload base')
+        else:
+            print(f'Uploaded {len(new_digests)} new blobs ({new_bytes} bytes), '
+                  f'reused {len(blobs) - len(new_digests)} blobs ({reused_bytes} bytes) of the upload base')
+
+        step_class = Task if as_task else Step
+        unpack = step_class(
+            name="unpack-upload",
+            template=PythonOPTemplate(UnpackUpload,
+                                      image=self.make_image,
+                                      python_packages=self.upload_python_packages,
+                                      command=["python3"]),
+            artifacts={"pack": pack, "base": base},
+            key="unpack-upload"
+        )
+        self.workflow.add(unpack)
+        return unpack.outputs.artifacts["output_work_path"]
+
     @json2dict
     def submit_relax(
             self,
@@ -1169,7 +1262,7 @@ class FlowGenerator:
         flow_name += '-relax'
         self.workflow = Workflow(name=flow_name, labels=labels)
         relaxation_list, relax_key_list = self._set_relax_flows(
-            input_work_dir=upload_artifact(upload_path),
+            input_work_dir=self._upload_work_dir(upload_path),
             relax_parameter=relax_parameter
         )
         self.workflow.add(relaxation_list)
@@ -1198,7 +1291,7 @@ class FlowGenerator:
         flow_name += '-props'
         self.workflow = Workflow(name=flow_name, labels=labels)
         subprops_list, subprops_key_list = self._set_props_flow(
-            input_work_dir=upload_artifact(upload_path),
+            input_work_dir=self._upload_work_dir(upload_path),
             props_parameter=props_parameter
         )
         self.workflow.add(subprops_list)
@@ -1228,7 +1321,7 @@ class FlowGenerator:
         flow_name = name if name else self.regulate_name(os.path.basename(download_path))
         flow_name += '-joint'
         self.workflow = Workflow(name=flow_name, labels=labels)
-        base_artifact = upload_artifact(upload_path)
+        base_artifact = self._upload_work_dir(upload_path, as_task=True)
 
         # per-structure relaxation subflows as DAG tasks
         relaxation_tasks, relax_key_list = self._set_relax_tasks(
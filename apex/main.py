@@ -1,28 +1,44 @@
+from __future__ import annotations
+
 import argparse
+import importlib
 import re
 import logging
 import os
 import datetime
 import time
-from typing import List
-
-from dflow import (
-    Workflow,
-    query_workflows,
-    download_artifact,
-    config,
-)
+from typing import TYPE_CHECKING, List
 
 from apex import (
     header,
     __version__,
 )
-from apex.config import Config
-from apex.step import do_step_from_args
-from apex.submit import submit_from_args
-from apex.archive import archive_from_args
-from apex.report import report_from_args
-from apex.utils import load_config_file
+
+if TYPE_CHECKING:
+    from dflow import Workflow
+
+# dflow and the subcommand modules (fpop, dpdata, dash, ...) are imported on
+# first use, so that `apex -h` and light subcommands start quickly
+_LAZY_IMPORTS = {
+    "Workflow": "dflow",
+    "query_workflows": "dflow",
+    "download_artifact": "dflow",
+    "config": "dflow",
+}
+
+
+def _lazy(name: str):
+    value = globals().get(name)
+    if value is None:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+    return value
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def parse_args():
@@ -622,6 +638,8 @@ def parse_args():
 
 
 def config_dflow(config_file: os.PathLike) -> None:
+    from apex.config import Config
+    from apex.utils import load_config_file
     # config dflow_config and s3_config
     config_dict = load_config_file(config_file)
     wf_config = Config(**config_dict)
@@ -795,8 +813,8 @@ def _build_workflow_handle(workflow_id: str, workflow_uid: str = "", prefer_uid:
     clean_uid = str(workflow_uid or "").strip()
     clean_id = str(workflow_id or "").strip()
     if (prefer_uid or not clean_id) and clean_uid:
-        return Workflow(uid=clean_uid)
-    return Workflow(id=clean_id)
+        return _lazy("Workflow")(uid=clean_uid)
+    return _lazy("Workflow")(id=clean_id)
 
 
 def _run_with_workflow_fallback(
@@ -906,7 +924,7 @@ def _download_artifact_with_retry(artifact, path, retries: int = 3, delay: int =
     last_exc = None
     for attempt in range(1, retries + 1):
         try:
-            return download_artifact(artifact=artifact, path=path)
+            return _lazy("download_artifact")(artifact=artifact, path=path)
         except Exception as exc:
             last_exc = exc
             if _is_missing_artifact_error(exc) or not _is_transient_download_error(exc):
@@ -1025,7 +1043,7 @@ def _is_retrievable_result_step_key(key: str) -> bool:
 
 
 def _should_retrieve_failure_artifacts(debug_requested: bool = False) -> bool:
-    return bool(debug_requested or config.get("mode") == "debug")
+    return bool(debug_requested or _lazy("config").get("mode") == "debug")
 
 
 def _download_failure_artifacts_for_step(wf_info, root_step, key, work_dir):
@@ -1099,6 +1117,8 @@ def main():
     parser, args = parse_args()
     if args.cmd == 'submit':
         header()
+        from apex.submit import submit_from_args
+
         try:
             submit_from_args(
                 parameters=args.parameter,
@@ -1123,7 +1143,7 @@ def main():
                     labels[key] = value
             else:
                 labels = None
-            wfs = query_workflows(labels=labels)
+            wfs = _lazy("query_workflows")(labels=labels)
             t = [["NAME", "STATUS", "AGE", "DURATION"]]
             for wf in wfs:
                 tc = datetime.datetime.strptime(wf.metadata.creationTimestamp,
@@ -1180,7 +1200,7 @@ def main():
             id = id.split(",")
         if type is not None:
             type = type.split(",")
-        wf = Workflow(id=wf_id)
+        wf = _lazy("Workflow")(id=wf_id)
         try:
             if key is not None:
                 steps = wf.query_step_by_key(key, name, phase, id, type)
@@ -1343,12 +1363,16 @@ def main():
                     )
     elif args.cmd == 'do':
         header()
+        from apex.step import do_step_from_args
+
         do_step_from_args(
             parameter=args.parameter,
             machine_file=args.config,
             step=args.step
         )
     elif args.cmd == 'archive':
+        from apex.archive import archive_from_args
+
         archive_from_args(
             parameters=args.json,
             config_file=args.config,
@@ -1361,6 +1385,8 @@ def main():
         )
     elif args.cmd == 'report':
         header()
+        from apex.report import report_from_args
+
         report_from_args(
             config_file=args.config,
             path_list=args.work,
@@ -10,6 +10,20 @@ from dflow.python import (
     upload_packages
 )
 
+from apex.core.calculator.lib.lammps_batch import (
+    get_engine,
+    lammps_module_available,
+    task_in_process,
+)
+from apex.core.lib.model_store import is_store_link, resolve_store_links
+from apex.core.lib.util import task_finished
+from apex.core.lib.task_cache import (
+    TaskCache,
+    task_cache_root,
+    task_digest,
+    task_io_files,
+)
+
 upload_packages.append(__file__)
 
 
@@ -24,7 +38,8 @@ class RunLAMMPS(OP):
     def get_input_sign(cls):
         return OPIOSign({
             'input_lammps': Artifact(Path),
-            'run_command': str
+            'run_command': str,
+            'model_store': Artifact(Path, optional=True)
         })
 
     @classmethod
@@ -34,30 +49,38 @@ class RunLAMMPS(OP):
         })
 
     @classmethod
-    def _cleanup_model_links(cls, task_dir):
-        task_path = Path(task_dir)
-        inter_json = task_path / "inter.json"
+    def _model_list(cls, task_dir) -> list:
+        inter_json = Path(task_dir) / "inter.json"
         if not inter_json.exists():
-            return
+            return []
 
         try:
             inter_param = loadfn(inter_json)
         except Exception as exc:
-            logging.warning(f"Failed to load inter.json for symlink cleanup: {exc}")
-            return
+            logging.warning(f"Failed to load inter.json for model links: {exc}")
+            return []
 
         model_spec = inter_param.get("model", [])
         if isinstance(model_spec, str):
-            model_list = [model_spec]
+            return [model_spec]
         elif isinstance(model_spec, list):
-            model_list = model_spec
-        else:
-            model_list = []
+            return model_spec
+        return []
+
+    @classmethod
+    def _resolve_model_links(cls, task_dir, model_store=None):
+        # links into the model_store artifact, recorded by the make step or dangling
+        model_names = [Path(model).name for model in cls._model_list(task_dir)]
+        resolve_store_links(task_dir, model_names, model_store)
 
-        for model in model_list:
+    @classmethod
+    def _cleanup_model_links(cls, task_dir):
+        # the backward_dir artifact is archived with links dereferenced: drop store links too
+        task_path = Path(task_dir)
+        for model in cls._model_list(task_dir):
             link_candidates = {task_path / model, task_path / Path(model).name}
             for link_path in link_candidates:
-                if link_path.is_symlink() and not link_path.exists():
+                if link_path.is_symlink() and (not link_path.exists() or is_store_link(link_path)):
                     link_path.unlink()
 
     @classmethod
@@ -353,6 +376,33 @@ class RunLAMMPS(OP):
         stderr_path.touch()
         return int(subprocess.call(cmd, shell=True))
 
+    @classmethod
+    def _run_in_process(cls, task_dir: Path) -> int:
+        # the engine is shared by every slice executed in this interpreter
+        return get_engine().run(task_dir)
+
+    @classmethod
+    def _task_cache(cls, task_dir: Path):
+        """
+        Cache entry context (cache, input files, output files, inter type)
+        when a cache directory is mounted at $APEX_TASK_CACHE, else None.
+        """
+        root = task_cache_root()
+        if not root or not (task_dir / "inter.json").is_file():
+            return None
+        from apex.core.calculator.calculator import make_calculator
+        try:
+            inter_param = loadfn(task_dir / "inter.json")
+            task_json = task_dir / "task.json"
+            task_param = loadfn(task_json) if task_json.is_file() else {}
+            property_type = task_param.get("type", "relaxation") if isinstance(task_param, dict) else "relaxation"
+            calculator = make_calculator(inter_param, "POSCAR")
+            input_files, output_files = task_io_files(calculator, inter_param["type"], property_type)
+            return TaskCache(root), input_files, output_files, inter_param["type"]
+        except Exception as exc:
+            logging.warning(f"Task cache disabled for {task_dir}: {exc}")
+            return None
+
     @OP.exec_sign_check
     def execute(self, op_in: OPIO) -> OPIO:
         cwd = os.getcwd()
@@ -367,6 +417,11 @@ class RunLAMMPS(OP):
             else:
                 cmd = op_in["run_command"]
             cmd = str(cmd).strip()
+            in_process = task_in_process(task_dir) and lammps_module_available()
+            if in_process:
+                cmd = "<in-process LAMMPS>"
+
+            self._resolve_model_links(task_dir, op_in["model_store"])
 
             debug_file = task_dir / ".debug.log"
             if not cmd:
@@ -384,6 +439,23 @@ class RunLAMMPS(OP):
                 self._write_final_debug(debug_file, task_dir, 127, 0.0)
                 self._cleanup_model_links(task_dir)
                 return OPIO({"backward_dir": op_in["input_lammps"]})
+            cache_context = self._task_cache(task_dir)
+            if cache_context is not None:
+                cache, input_files, output_files, inter_type = cache_context
+                digest = task_digest(task_dir, input_files, calculator=inter_type, command=cmd)
+                if cache.restore(digest, task_dir):
+                    now = self._utc_now()
+                    logging.info(f"Restored LAMMPS outputs from task cache {digest[:12]}")
+                    self._write_task_status(
+                        status_file,
+                        exit_code=0,
+                        cmd="<task cache>",
+                        elapsed=0.0,
+                        started_at=now,
+                        finished_at=now,
+                    )
+                    self._cleanup_model_links(task_dir)
+                    return OPIO({"backward_dir": op_in["input_lammps"]})
             self._write_initial_debug(debug_file, task_dir, cmd)
             started_at = self._utc_now()
             start = time.time()
@@ -391,9 +463,13 @@ class RunLAMMPS(OP):
             attempts = 1
             max_attempts = int(os.environ.get("APEX_LAMMPS_HEADER_RETRY", "2"))
             max_attempts = max(1, max_attempts)
-            exit_code = self._run_command(cmd, task_dir)
+            if in_process:
+                exit_code = self._run_in_process(task_dir)
+            else:
+                exit_code = self._run_command(cmd, task_dir)
             while (
-                attempts < max_attempts
+                not in_process
+                and attempts < max_attempts
                 and self._is_header_only_lammps_failure(task_dir, exit_code)
             ):
                 retry_reason = "header_only_lammps_log_after_nonzero_exit"
@@ -422,6 +498,8 @@ class RunLAMMPS(OP):
             self._write_final_debug(debug_file, task_dir, exit_code, elapsed)
             if exit_code == 0:
                 logging.info("Call Lammps command successfully!")
+                if cache_context is not None and task_finished(task_dir, inter_type):
+                    cache.store(digest, task_dir, output_files)
             else:
                 logging.warning(f"Call Lammps command failed with exit code: {exit_code}")
 
@@ -1,4 +1,4 @@
-import os, glob, pathlib, shutil, subprocess, logging
+import os, glob, pathlib, shutil, logging
 from pathlib import Path
 from monty.serialization import loadfn
 from typing import List
@@ -13,6 +13,7 @@ from monty.serialization import dumpfn
 from apex.utils import recursive_search, apex_task_succeeded
 from apex.core.lib.utils import create_path
 from apex.core.calculator import LAMMPS_INTER_TYPE
+from apex.core.lib.model_store import MODEL_STORE, model_store_env, strip_store_links
 
 upload_packages.append(__file__)
 
@@ -37,6 +38,14 @@ def _is_failed_task_status(status) -> bool:
     return status.get("state") != "succeeded" or status.get("exit_code") != 0
 
 
+def _remove_task_files(path_to_prop: Path, names: List[str]):
+    # potential files and model store links of the configuration and of every task
+    for name in names:
+        for path in [path_to_prop.parent / name, *path_to_prop.glob(f"task.*/{name}")]:
+            if path.is_symlink() or path.is_file():
+                path.unlink()
+
+
 class PropsMake(OP):
     """
     OP class for making calculation tasks (make property)
@@ -61,7 +70,8 @@ class PropsMake(OP):
             'output_work_path': Artifact(Path),
             'task_names': List[str],
             'njobs': int,
-            'task_paths': Artifact(List[Path])
+            'task_paths': Artifact(List[Path]),
+            'model_store': Artifact(Path, optional=True)
         })
 
     @OP.exec_sign_check
@@ -102,27 +112,39 @@ class PropsMake(OP):
                 'output_work_path': abs_path_to_prop,
                 'task_names': [],
                 'njobs': 0,
-                'task_paths': []
+                'task_paths': [],
+                'model_store': None
             })
 
         inter_param_prop = inter_param
         if "cal_setting" in prop_param and "overwrite_interaction" in prop_param["cal_setting"]:
             inter_param_prop = prop_param["cal_setting"]["overwrite_interaction"]
 
-        prop = make_property_instance(prop_param, inter_param_prop)
-        task_list = prop.make_confs(abs_path_to_prop, path_to_equi, do_refine)
-        for kk in task_list:
-            if (not rerun_finished) and apex_task_succeeded(kk):
-                print(f"Skip preparing completed property task {kk} (apex_task_status.json state=succeeded, rerun_finished=False)")
-                continue
-            poscar = os.path.join(kk, "POSCAR")
-            inter = make_calculator(inter_param_prop, poscar)
-            inter.make_potential_files(kk)
-            logging.debug(prop.task_type())  ### debug
-            inter.make_input_file(kk, prop.task_type(), prop.task_param())
+        if prop_param["type"] == "phonon" and prop_param.get("fc_cache_dir"):
+            # a phonon cache hit leaves no task, and PropsPost skips properties without tasks
+            print("fc_cache_dir of phonon is only used by local runs (apex do), ignored in the workflow")
+            prop_param = dict(prop_param, fc_cache_dir=None)
+        model_store = input_work_path / MODEL_STORE
+        with model_store_env(model_store):
+            prop = make_property_instance(prop_param, inter_param_prop)
+            task_list = prop.make_confs(abs_path_to_prop, path_to_equi, do_refine)
+            for kk in task_list:
+                if (not rerun_finished) and apex_task_succeeded(kk):
+                    print(f"Skip preparing completed property task {kk} (apex_task_status.json state=succeeded, rerun_finished=False)")
+                    continue
+                poscar = os.path.join(kk, "POSCAR")
+                inter = make_calculator(inter_param_prop, poscar)
+                inter.make_potential_files(kk)
+                logging.debug(prop.task_type())  ### debug
+                inter.make_input_file(kk, prop.task_type(), prop.task_param())
         prop.post_process(
             task_list
         )  # generate same KPOINTS file for elastic when doing VASP
+        if inter_param_prop["type"] in LAMMPS_INTER_TYPE:
+            # artifacts are archived with links dereferenced: tasks go without their
+            # models, which RunLAMMPS links again to the model_store artifact
+            for kk in task_list + [str(conf_path)]:
+                strip_store_links(kk, model_store)
 
         task_list.sort()
         os.chdir(path_to_prop)
@@ -145,7 +167,8 @@ class PropsMake(OP):
             "output_work_path": input_work_path,
             "task_names": run_task_names,
             "njobs": njobs,
-            "task_paths": jobs
+            "task_paths": jobs,
+            "model_store": model_store
         })
         return op_out
 
@@ -270,22 +293,16 @@ class PropsPost(OP):
                 inter_files_name = [inter_param["model"]]
             elif type(inter_param["model"]) is list:
                 inter_files_name.extend(inter_param["model"])
-            for file in inter_files_name:
-                cmd = f"rm -f ../{file}"
-                subprocess.call(cmd, shell=True)
-                cmd = f"for kk in task.*; do rm -f $kk/{file}; done"
-                subprocess.call(cmd, shell=True)
+            _remove_task_files(abs_path_to_prop, [os.path.basename(ii) for ii in inter_files_name])
         elif inter_type == 'vasp':
             os.chdir(abs_path_to_prop)
-            cmd = "rm -f ../POTCAR"
-            subprocess.call(cmd, shell=True)
-            cmd = f"for kk in task.*; do rm -f $kk/POTCAR; done"
-            subprocess.call(cmd, shell=True)
+            _remove_task_files(abs_path_to_prop, ["POTCAR"])
 
         os.chdir(cwd)
-        for ii in copy_dir_list:
-            shutil.copytree(input_all / ii, ii, dirs_exist_ok=True)
-        retrieve_path = [Path(ii) for ii in copy_dir_list]
+        # retrieve only this property's subtree; everything else under the
+        # top-level conf directory is unchanged and already held by the client
+        shutil.copytree(abs_path_to_prop, path_to_prop, dirs_exist_ok=True)
+        retrieve_path = [Path(path_to_prop)]
         # out_path = Path(cwd) / 'retrieve_pool'
         # os.mkdir(out_path)
         # shutil.copytree(input_all / path_to_prop,
@@ -10,6 +10,7 @@ from dflow.python import (
     upload_packages
 )
 from apex.core.calculator import LAMMPS_INTER_TYPE
+from apex.core.lib.model_store import MODEL_STORE, model_store_env, strip_store_links
 from apex.utils import recursive_search, apex_task_succeeded
 
 upload_packages.append(__file__)
@@ -84,7 +85,8 @@ class RelaxMake(OP):
             'output': Artifact(Path),
             'njobs': int,
             'task_names': List[str],
-            'task_paths': Artifact(List[Path])
+            'task_paths': Artifact(List[Path]),
+            'model_store': Artifact(Path, optional=True)
         })
 
     @OP.exec_sign_check
@@ -102,7 +104,9 @@ class RelaxMake(OP):
         inter_parameter = param_argv["interaction"]
         parameter = param_argv["relaxation"]
 
-        make_equi(structures, inter_parameter, parameter)
+        model_store = os.path.join(work_d, MODEL_STORE)
+        with model_store_env(model_store):
+            make_equi(structures, inter_parameter, parameter)
 
         conf_dirs = []
         for conf in structures:
@@ -116,6 +120,11 @@ class RelaxMake(OP):
         for ii in conf_dirs:
             conf_dir_global = os.path.join(work_d, ii)
             task_dir = os.path.join(conf_dir_global, 'relaxation/relax_task')
+            if inter_parameter["type"] in LAMMPS_INTER_TYPE:
+                # artifacts are archived with links dereferenced: tasks go without their
+                # models, which RunLAMMPS links again to the model_store artifact
+                strip_store_links(task_dir, model_store)
+                strip_store_links(conf_dir_global, model_store)
             if (not rerun_finished) and apex_task_succeeded(task_dir):
                 print(f"Skip running completed relaxation task {task_dir} (apex_task_status.json state=succeeded, rerun_finished=False)")
                 continue
@@ -133,7 +142,8 @@ class RelaxMake(OP):
             "output": op_in["input"],
             "task_names": task_list_str,
             "njobs": njobs,
-            "task_paths": jobs
+            "task_paths": jobs,
+            "model_store": pathlib.Path(model_store)
         })
         return op_out
 
@@ -217,6 +227,9 @@ class RelaxPost(OP):
                 subprocess.call(cmd, shell=True)
                 os.chdir(op_in['input_all'])
 
+        # every make step stores the models again from the uploaded ones
+        shutil.rmtree(os.path.join(op_in['input_all'], MODEL_STORE), ignore_errors=True)
+
         os.chdir(cwd)
         for ii in copy_dir_list:
             src_path = str(op_in['input_all']) + f'/{ii}'
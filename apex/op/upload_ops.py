@@ -0,0 +1,42 @@
+from pathlib import Path
+from dflow.python import (
+    OP,
+    OPIO,
+    OPIOSign,
+    Artifact,
+    upload_packages
+)
+from apex.core.lib.upload_manifest import restore_tree
+
+upload_packages.append(__file__)
+
+
+class UnpackUpload(OP):
+    """
+    OP class rebuilding the uploaded work directory from an incremental upload:
+    the manifest and new blobs of this submission plus the base blobs of an earlier one
+    """
+
+    def __init__(self):
+        pass
+
+    @classmethod
+    def get_input_sign(cls):
+        return OPIOSign({
+            'pack': Artifact(Path),
+            'base': Artifact(Path)
+        })
+
+    @classmethod
+    def get_output_sign(cls):
+        return OPIOSign({
+            'output_work_path': Artifact(Path)
+        })
+
+    @OP.exec_sign_check
+    def execute(self, op_in: OPIO) -> OPIO:
+        work_path = Path("work").absolute()
+        restore_tree(op_in["pack"], [op_in["base"]], work_path)
+        return OPIO({
+            'output_work_path': work_path
+        })
@@ -237,6 +237,10 @@ def run_rss_config(config_file: str) -> None:
         "interval": config.get("interval", 100),
         "show_progress": config.get("show_progress", True),
         "patience": config.get("patience"),
+        "num_chains": config.get("num_chains", 1),
+        "temperatures": config.get("temperatures"),
+        "exchange_interval": config.get("exchange_interval", 100),
+        "processes": config.get("processes"),
         "return_metadata": write_metadata,
     }
     result = generate_rss(parent, **rss_kwargs)
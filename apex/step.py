@@ -8,6 +8,13 @@ from apex.archive import archive_workdir
 from apex.config import Config
 
 
+def _make_pool_size(machine_dict: dict = None) -> int:
+    make_pool_size = (machine_dict or {}).get("make_pool_size") or 1
+    if make_pool_size == -1:
+        make_pool_size = os.cpu_count()
+    return make_pool_size
+
+
 def do_step(param_dict: dict, step: str, machine_dict: dict = None):
     # check input args
     json_type = get_flow_type(param_dict)
@@ -55,7 +62,8 @@ def do_step(param_dict: dict, step: str, machine_dict: dict = None):
         param = param_dict["properties"]
         if step == 'make_props':
             print('Making property tasks locally...')
-            make_property(structures, inter_parameter, param)
+            make_property(structures, inter_parameter, param,
+                          processes=_make_pool_size(machine_dict))
         elif step == 'run_props':
             print('Run property tasks locally...')
             if not machine_dict:
@@ -124,7 +132,8 @@ def _do_step_combined(param_dict: dict, step: str, machine_dict: dict = None):
         if flow in ['relax', 'joint']:
             make_equi(structures, inter_parameter, param_dict['relaxation'])
         if flow in ['props', 'joint']:
-            make_property(structures, inter_parameter, param_dict['properties'])
+            make_property(structures, inter_parameter, param_dict['properties'],
+                          processes=_make_pool_size(machine_dict))
         return
 
     # run
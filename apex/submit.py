@@ -17,6 +17,8 @@ from dflow import config, s3_config
 
 from apex.archive import archive_workdir
 from apex.config import Config
+from apex.core.lib.model_store import copy_without_store_links
+from apex.core.lib.upload_manifest import UPLOAD_INDEX
 from apex.flow import FlowGenerator
 from apex.utils import (
     judge_flow,
@@ -362,6 +364,7 @@ def pack_upload_dir(
 
     """copy necessary files and directories into temp upload directory"""
     exclude_upload_files.append("all_result.json")
+    exclude_upload_files.append(UPLOAD_INDEX)
     copy_all_other_files(
         work_dir, upload_dir,
         exclude_files=exclude_upload_files,
@@ -388,7 +391,8 @@ def pack_upload_dir(
                     os.chdir(cwd)
                     raise
             elif os.path.isdir(copy_relaxation_path):
-                shutil.copytree(copy_relaxation_path, target_relaxation_path)
+                # dflow tars uploads with dereference, store links would be uploaded as model copies
+                copy_without_store_links(copy_relaxation_path, target_relaxation_path)
             else:
                 logging.warning(f"Skip copying relaxation for {ii}: {copy_relaxation_path} not found.")
             # copy refine from init path to upload dir
@@ -397,7 +401,7 @@ def pack_upload_dir(
                     copy_init_path = os.path.abspath(os.path.join(ii, jj))
                     assert os.path.exists(copy_init_path), f'refine from init path {copy_init_path} does not exist!'
                     target_init_path = os.path.join(build_conf_path, jj)
-                    shutil.copytree(copy_init_path, target_init_path)
+                    copy_without_store_links(copy_init_path, target_init_path)
 
     os.chdir(cwd)
 
@@ -579,6 +583,8 @@ def submit_workflow(
         executor=executor,
         upload_python_packages=upload_python_packages,
         debug_mode=is_debug,
+        upload_mode=wf_config.upload_mode,
+        download_workers=wf_config.download_workers,
     )
 
     if props_param and (phonolammps_run_command or lammps_run_command):
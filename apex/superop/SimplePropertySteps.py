@@ -223,7 +223,8 @@ class SimplePropertySteps(Steps):
             runcal = Step(
                 name="PropsLAMMPS-Cal",
                 template=run_lmp,
-                artifacts={"input_lammps": make.outputs.artifacts["task_paths"]},
+                artifacts={"input_lammps": make.outputs.artifacts["task_paths"],
+                           "model_store": make.outputs.artifacts["model_store"]},
                 parameters={"run_command": run_command},
                 with_param=argo_range(make.outputs.parameters["njobs"]),
                 key=self.step_keys["run"] + '-lammps',
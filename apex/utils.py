@@ -11,9 +11,6 @@ from monty.serialization import loadfn
 from decimal import Decimal
 from dflow.python import OP
 from dflow.python import upload_packages
-from fpop.vasp import RunVasp
-from fpop.abacus import RunAbacus
-from apex.op.RunLAMMPS import RunLAMMPS
 from apex.account import merge_bohrium_defaults
 from apex.core.calculator import LAMMPS_INTER_TYPE
 
@@ -217,13 +214,17 @@ def get_flow_type(d: dict) -> str:
 
 def get_task_type(d: dict) -> (str, Type[OP]):
     interaction_type = d['interaction']['type']
+    # run OPs are imported here to keep `import apex.utils` light
     if interaction_type == 'vasp':
+        from fpop.vasp import RunVasp
         task_type = 'vasp'
         run_op = RunVasp
     elif interaction_type == 'abacus':
+        from fpop.abacus import RunAbacus
         task_type = 'abacus'
         run_op = RunAbacus
     elif interaction_type in LAMMPS_INTER_TYPE:
+        from apex.op.RunLAMMPS import RunLAMMPS
         task_type = 'lammps'
         run_op = RunLAMMPS
     else:
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# seconds a cold `apex --help` may take beyond a bare interpreter start; generous
+# for loaded CI runners, while the heavy imports alone take several seconds
+STARTUP_BUDGET = float(os.environ.get("APEX_STARTUP_BUDGET", "3.0"))
+HEAVY_MODULES = ["dflow", "fpop", "dpdata", "pymatgen", "dash", "plotly", "pandas", "phonopy"]
+
+PROBE = """
+import sys
+sys.argv = ["apex", "--help"]
+from apex.main import main
+try:
+    main()
+except SystemExit:
+    pass
+heavy = sorted({name.split(".")[0] for name in sys.modules} & set(%r))
+print("HEAVY:" + ",".join(heavy))
+""" % (HEAVY_MODULES,)
+
+
+class TestCliStartup(unittest.TestCase):
+    def _run_probe(self, probe=PROBE):
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+        env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", probe],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+        )
+        return time.perf_counter() - start, proc.stdout
+
+    def test_help_does_not_import_heavy_dependencies(self):
+        _, stdout = self._run_probe()
+        self.assertIn("usage:", stdout)
+        heavy = stdout.strip().splitlines()[-1]
+        self.assertEqual(heavy, "HEAVY:")
+
+    def test_help_within_startup_budget(self):
+        baseline, _ = self._run_probe("pass")
+        elapsed, _ = self._run_probe()
+        self.assertLess(elapsed, baseline + STARTUP_BUDGET,
+                        f"cold `apex --help` took {elapsed:.2f}s, a bare interpreter {baseline:.2f}s "
+                        f"(budget {STARTUP_BUDGET}s on top)")
+
+
+if __name__ == "__main__":
+    unittest.main()
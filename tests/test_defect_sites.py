@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+from pymatgen.analysis.defects.generators import VacancyGenerator
+from pymatgen.core import Lattice, Structure
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.lib.defect_sites import (
+    DEFAULT_SITE_GROUPING,
+    defect_site_record,
+    group_defect_sites,
+    site_grouping_param,
+)
+
+
+def noisy_l12(seed, noise=0.01):
+    # 2x2x2 Ni3Al supercell with every atom displaced, so symmetry finds no orbits
+    ss = Structure(
+        Lattice.cubic(3.57),
+        ["Al", "Ni", "Ni", "Ni"],
+        [[0, 0, 0], [0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0.5, 0.5]],
+    )
+    ss.make_supercell([2, 2, 2])
+    rng = np.random.default_rng(seed)
+    for ii in range(len(ss)):
+        ss.translate_sites([ii], rng.normal(0, noise, 3), frac_coords=False)
+    return ss
+
+
+class TestDefectSites(unittest.TestCase):
+    def test_site_grouping_param(self):
+        self.assertIsNone(site_grouping_param({}))
+        self.assertIsNone(site_grouping_param({"site_grouping": False}))
+        self.assertEqual(site_grouping_param({"site_grouping": True}), DEFAULT_SITE_GROUPING)
+        grouping = site_grouping_param({"site_grouping": {"tol": 0.1}})
+        self.assertEqual(grouping["tol"], 0.1)
+        self.assertEqual(grouping["cutoff"], DEFAULT_SITE_GROUPING["cutoff"])
+        with self.assertRaises(ValueError):
+            site_grouping_param({"site_grouping": {"cut": 4.0}})
+        with self.assertRaises(ValueError):
+            site_grouping_param({"site_grouping": {"cutoff": 0}})
+
+    def test_noisy_orbits_merge_by_environment(self):
+        ss = noisy_l12(0)
+        vacancies = list(VacancyGenerator(symprec=1e-4).generate(ss))
+        self.assertEqual(len(vacancies), len(ss))
+
+        classes = group_defect_sites(vacancies, 5.0, 0.1)
+        summary = sorted((str(rep.site.specie), mult, size) for rep, mult, size in classes)
+        self.assertEqual(summary, [("Al", 8, 8), ("Ni", 24, 24)])
+
+        # a tolerance below the noise keeps the distorted sites apart
+        self.assertGreater(len(group_defect_sites(vacancies, 5.0, 1e-4)), 2)
+
+        record = defect_site_record(*classes[0])
+        self.assertEqual(record["species"], str(classes[0][0].site.specie))
+        self.assertEqual(record["multiplicity"], classes[0][1])
+        self.assertEqual(record["merged_orbits"], classes[0][2])
+        self.assertEqual(len(record["frac_coords"]), 3)
+
+    def test_symmetry_orbits_keep_multiplicity(self):
+        ss = noisy_l12(0, noise=0.0)
+        vacancies = list(VacancyGenerator().generate(ss))
+        classes = group_defect_sites(vacancies, 5.0, 0.05)
+        self.assertEqual(len(classes), len(vacancies))
+        self.assertEqual(sum(mult for _, mult, _ in classes), len(ss))
+        self.assertTrue(all(size == 1 for _, _, size in classes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,14 @@ import glob
 import os
 import shutil
 import sys
+import tempfile
 import unittest
 
 import dpdata
 import numpy as np
-from monty.serialization import loadfn
+from monty.serialization import dumpfn, loadfn
 from pymatgen.io.vasp import Incar
+from apex.core.lib.mfp_eosfit import birch
 from apex.core.property.EOS import EOS
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -107,3 +109,28 @@ class TestEOS(unittest.TestCase):
         )
         with self.assertRaises(RuntimeError):
             self.eos.make_confs(self.target_path, self.equi_path)
+
+    def test_compute_with_eos_fit(self):
+        eos = EOS({"type": "eos", "vol_start": 0.9, "vol_end": 1.1, "vol_step": 0.02, "eos_fit": ["birch", "vinet"]})
+        pars = [-3.5, 0.6, 4.5, 16.0]
+        with tempfile.TemporaryDirectory() as tmp:
+            all_tasks, all_res = [], []
+            for ii, vol in enumerate(np.linspace(14.5, 17.5, 9)):
+                task = os.path.join(tmp, "task.%06d" % ii)
+                os.makedirs(task)
+                dumpfn({"volume": vol}, os.path.join(task, "eos.json"))
+                dumpfn({"energies": [2 * birch(vol, pars)], "atom_numbs": [2]}, os.path.join(task, "result_task.json"))
+                all_tasks.append(task)
+                all_res.append(os.path.join(task, "result_task.json"))
+            res_data, ptr_data = eos._compute_lower(os.path.join(tmp, "result.json"), all_tasks, all_res)
+            self.assertEqual(len(res_data), 9)
+            fit = loadfn(os.path.join(tmp, "eos_fit.json"))
+        self.assertEqual(list(fit), ["birch", "vinet"])
+        self.assertTrue(fit["birch"]["converged"])
+        self.assertAlmostEqual(fit["birch"]["v0"], 16.0, places=5)
+        self.assertAlmostEqual(fit["birch"]["B0"], 0.6 * 160.2176565, places=3)
+        self.assertIn("vinet", ptr_data)
+
+    def test_eos_fit_rejects_unknown_model(self):
+        with self.assertRaises(ValueError):
+            EOS({"type": "eos", "vol_start": 0.9, "vol_end": 1.1, "vol_step": 0.02, "eos_fit": ["LOG4"]})
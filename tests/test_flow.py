@@ -1,12 +1,16 @@
 import os
+import shutil
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 from types import SimpleNamespace
 
 import pytest
+from dflow.common import LocalArtifact
 
 from apex import flow
+from apex.core.lib.upload_manifest import BLOB_DIR, build_manifest, restore_tree
 
 
 class FakeTemplate:
@@ -26,7 +30,10 @@ class FakeNode:
         self.template = template
         self.key = key
         self.inputs = FakeIO(parameters=parameters, artifacts=artifacts)
-        self.outputs = FakeIO(artifacts={"output_all": f"out-{key or name}"})
+        self.outputs = FakeIO(artifacts={
+            "output_all": f"out-{key or name}",
+            "output_work_path": f"work-{key or name}",
+        })
         self.kwargs = kwargs
 
 
@@ -497,6 +504,49 @@ def test_submit_relax_props_and_joint_submit_only_paths(tmp_path, monkeypatch):
         )
 
 
+def test_incremental_upload_sends_only_new_blobs(tmp_path, monkeypatch):
+    patch_dflow_builders(monkeypatch)
+    monkeypatch.setattr(flow, "PythonOPTemplate", lambda *args, **kwargs: FakeTemplate(**kwargs))
+    uploads = []
+
+    def fake_upload(path):
+        # stand-in for the artifact repository
+        target = tmp_path / "repo" / str(len(uploads))
+        shutil.copytree(path, target, symlinks=True)
+        uploads.append(target)
+        return LocalArtifact(local_path=str(target))
+
+    monkeypatch.setattr(flow, "upload_artifact", fake_upload)
+    work = tmp_path / "work"
+    relax = work / "conf" / "relaxation" / "relax_task"
+    relax.mkdir(parents=True)
+    (relax / "OUTCAR").write_text("large relaxation output\n" * 100)
+    (relax / "CONTCAR").write_text("Al\n")
+    os.symlink("CONTCAR", relax / "POSCAR")
+    (work / "param.json").write_text("{}")
+    download = tmp_path / "download"
+    download.mkdir()
+
+    generator = make_generator(upload_mode="incremental")
+    generator.download_path = str(download)
+    generator.workflow = FakeWorkflow("wf")
+    assert generator._upload_work_dir(str(work)) == "work-unpack-upload"
+    unpack = generator.workflow.added[0]
+    assert unpack.inputs.artifacts["pack"].local_path == unpack.inputs.artifacts["base"].local_path
+    assert len(os.listdir(uploads[0] / BLOB_DIR)) == 3
+
+    (work / "param.json").write_text('{"properties": []}')
+    generator.workflow = FakeWorkflow("wf")
+    generator._upload_work_dir(str(work))
+    unpack = generator.workflow.added[0]
+    assert os.listdir(uploads[1] / BLOB_DIR) == [os.listdir(uploads[1] / BLOB_DIR)[0]]
+    assert unpack.inputs.artifacts["base"].local_path == str(uploads[0])
+
+    restore_tree(uploads[1], [uploads[0]], tmp_path / "restored")
+    assert build_manifest(tmp_path / "restored") == build_manifest(work)
+    assert (tmp_path / "restored" / "param.json").read_text() == '{"properties": []}'
+
+
 def test_terminate_workflow_and_raise_if_failed():
     generator = make_generator()
     generator.workflow = FakeWorkflow("wf")
@@ -521,6 +571,75 @@ def test_terminate_workflow_and_raise_if_failed():
         generator._raise_if_failed(["detail"], "Property workflow")
 
 
+class FakeStep(dict):
+    def __init__(self, key, phase):
+        super().__init__(phase=phase, outputs={"artifacts": {"retrieve_path": f"retrieve-{key}"}})
+        self.key = key
+        self.outputs = FakeIO(artifacts={"retrieve_path": f"retrieve-{key}"})
+
+
+class PolledWorkflow(FakeWorkflow):
+    """Workflow whose successive queries return the given {key: phase} snapshots."""
+
+    def __init__(self, snapshots):
+        super().__init__("wf")
+        self.snapshots = snapshots
+        self.queries = 0
+
+    def query(self):
+        phases = self.snapshots[min(self.queries, len(self.snapshots) - 1)]
+        self.queries += 1
+        steps = [FakeStep(kk, phase) for kk, phase in phases.items()]
+        return SimpleNamespace(get_step=lambda key=None, **kwargs: [ii for ii in steps if ii.key in key])
+
+
+def test_monitor_downloads_finished_steps_concurrently(monkeypatch):
+    monkeypatch.setattr(flow, "MONITOR_POLL_INTERVAL", 0)
+    generator = make_generator(download_workers=2)
+    generator.download_path = "download"
+    generator.workflow = PolledWorkflow([
+        {"relaxcal-a": "Running", "propcal-a": "Pending"},
+        {"relaxcal-a": "Running", "propcal-a": "Pending"},
+        {"relaxcal-a": "Succeeded", "propcal-a": "Succeeded"},
+    ])
+    barrier = threading.Barrier(2, timeout=10)
+    downloads = []
+
+    def fake_download(artifact, path, retries=3, delay=10):
+        # only returns when both artifacts are being downloaded at the same time
+        barrier.wait()
+        downloads.append(artifact)
+        return path
+
+    monkeypatch.setattr(flow.FlowGenerator, "_download_artifact_with_retry", staticmethod(fake_download))
+
+    generator._monitor_joint_flows(["relaxcal-a"], ["propcal-a"])
+
+    assert sorted(downloads) == ["retrieve-propcal-a", "retrieve-relaxcal-a"]
+    assert generator.workflow.queries == 3
+
+
+def test_monitor_collects_property_failures_after_other_downloads(monkeypatch):
+    monkeypatch.setattr(flow, "MONITOR_POLL_INTERVAL", 0)
+    generator = make_generator()
+    generator.download_path = "download"
+    generator.workflow = PolledWorkflow([
+        {"propcal-a": "Failed", "propcal-b": "Running"},
+        {"propcal-a": "Failed", "propcal-b": "Succeeded"},
+    ])
+    downloads = []
+    monkeypatch.setattr(flow.FlowGenerator, "_download_artifact_with_retry",
+                        staticmethod(lambda artifact, path, retries=3, delay=10: downloads.append(artifact)))
+    monkeypatch.setattr(flow.FlowGenerator, "_download_step_main_logs",
+                        lambda self, step, label, step_info=None: (None, "no logs"))
+    monkeypatch.setattr(flow.FlowGenerator, "_download_step_diagnostic_artifacts",
+                        lambda self, step, label, step_info=None: [])
+
+    with pytest.raises(RuntimeError, match="Property workflow failed with 1 failed step"):
+        generator._monitor_props(["propcal-a", "propcal-b"])
+    assert downloads == ["retrieve-propcal-b"]
+
+
 class TestFlowCoverage(unittest.TestCase):
     def run_with_tmp_and_monkeypatch(self, func):
         monkeypatch = pytest.MonkeyPatch()
@@ -593,5 +712,20 @@ class TestFlowCoverage(unittest.TestCase):
             test_submit_relax_props_and_joint_submit_only_paths
         )
 
+    def test_incremental_upload_sends_only_new_blobs(self):
+        self.run_with_tmp_and_monkeypatch(
+            test_incremental_upload_sends_only_new_blobs
+        )
+
     def test_terminate_workflow_and_raise_if_failed(self):
         test_terminate_workflow_and_raise_if_failed()
+
+    def test_monitor_downloads_finished_steps_concurrently(self):
+        self.run_with_monkeypatch(
+            test_monitor_downloads_finished_steps_concurrently
+        )
+
+    def test_monitor_collects_property_failures_after_other_downloads(self):
+        self.run_with_monkeypatch(
+            test_monitor_collects_property_failures_after_other_downloads
+        )
@@ -0,0 +1,135 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from monty.serialization import loadfn
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.lib.force_constant_cache import (
+    FORCE_CONSTANT_KEY,
+    ForceConstantCache,
+    force_constant_digest,
+    force_constant_displacement_distance,
+    interaction_digest,
+)
+from apex.core.property.Phonon import Phonon
+
+BAND_GHN = "0 0 0  0.5 -0.5 0.5  0 0 0.5"
+BAND_GP = "0 0 0  0.25 0.25 0.25"
+
+
+def write_spring_force_constants(path, natom, spring=1.0):
+    # every pair of atoms coupled by the same spring: symmetric, acoustic sum rule holds
+    from phonopy.file_IO import write_FORCE_CONSTANTS
+
+    fc = np.tile(-spring * np.eye(3), (natom, natom, 1, 1))
+    for ii in range(natom):
+        fc[ii, ii] = spring * (natom - 1) * np.eye(3)
+    write_FORCE_CONSTANTS(fc, filename=str(path))
+
+
+class TestForceConstantCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work = Path(self.tmpdir.name)
+        self.cwd = os.getcwd()
+        tests_dir = Path(__file__).resolve().parent
+        self.equi_path = self.work / "relaxation" / "relax_task"
+        self.equi_path.mkdir(parents=True)
+        shutil.copy(tests_dir / "equi" / "vasp" / "CONTCAR_Mo_bcc", self.equi_path / "CONTCAR")
+        (self.work / "frozen_model.pb").write_bytes(b"\x00model-a")
+        self.inter_param = {"type": "deepmd", "model": "frozen_model.pb", "type_map": {"Mo": 0}}
+        os.chdir(self.work)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def _phonon(self, band):
+        return Phonon(
+            {
+                "type": "phonon",
+                "BAND": band,
+                "supercell_size": [2, 2, 2],
+                "fc_cache_dir": str(self.work / "fc_cache"),
+                "phonopy_backend": "api",
+            },
+            inter_param=self.inter_param,
+        )
+
+    def test_digest_ignores_band_path_only(self):
+        unitcell = str(self.equi_path / "CONTCAR")
+        interaction = interaction_digest(self.inter_param)
+        digest = force_constant_digest(unitcell, [2, 2, 2], interaction, "phonolammps")
+        self.assertEqual(digest, force_constant_digest(unitcell, [2, 2, 2], interaction, "phonolammps"))
+        self.assertNotEqual(digest, force_constant_digest(unitcell, [3, 3, 3], interaction, "phonolammps"))
+        self.assertNotEqual(
+            digest, force_constant_digest(unitcell, [2, 2, 2], interaction, "phonolammps", 0.02)
+        )
+
+        # same potential contents under another path give the same key, other contents do not
+        shutil.copy("frozen_model.pb", "copy.pb")
+        self.assertEqual(interaction, interaction_digest(dict(self.inter_param, model="copy.pb")))
+        Path("frozen_model.pb").write_bytes(b"\x00model-b")
+        self.assertNotEqual(interaction, interaction_digest(self.inter_param))
+
+    def test_digest_follows_displacement_amplitude(self):
+        self.assertEqual(force_constant_displacement_distance("abacus"), 0.02)
+        self.assertEqual(force_constant_displacement_distance("vasp"), 0.01)
+        self.assertEqual(force_constant_displacement_distance("deepmd"), 0.01)
+        unitcell = str(self.equi_path / "CONTCAR")
+        interaction = interaction_digest(self.inter_param)
+        self.assertNotEqual(
+            force_constant_digest(unitcell, [2, 2, 2], interaction, "displacement", 0.01),
+            force_constant_digest(
+                unitcell, [2, 2, 2], interaction, "displacement", force_constant_displacement_distance("abacus")
+            ),
+        )
+
+    def test_phonon_reuses_force_constants_for_a_new_band_path(self):
+        first = self._phonon(BAND_GHN)
+        task_list = first.make_confs("phonon_00", str(self.equi_path))
+        self.assertEqual(len(task_list), 1)
+        key = loadfn(Path("phonon_00") / FORCE_CONSTANT_KEY)
+        self.assertFalse(key["restored"])
+
+        # stand-in for the phonolammps run
+        write_spring_force_constants(Path(task_list[0]) / "FORCE_CONSTANTS", 16)
+        first._compute_lower("phonon_00/result.json", task_list, [])
+        self.assertTrue(first.fc_cache.contains(key["digest"]))
+
+        second = self._phonon(BAND_GP)
+        self.assertEqual(second.make_confs("phonon_01", str(self.equi_path)), [])
+        self.assertFalse(list(Path("phonon_01").glob("task.*")))
+        self.assertTrue(loadfn(Path("phonon_01") / FORCE_CONSTANT_KEY)["restored"])
+        res_data, _ = second._compute_lower("phonon_01/result.json", [], [])
+        self.assertEqual(len(res_data["segment"]), 2)
+        self.assertEqual(len(res_data["band"]), 6)
+
+        # a changed potential is a cache miss
+        Path("frozen_model.pb").write_bytes(b"\x00model-b")
+        self.assertEqual(len(self._phonon(BAND_GP).make_confs("phonon_02", str(self.equi_path))), 1)
+
+    def test_store_requires_force_constants(self):
+        cache = ForceConstantCache.from_parameter({"fc_cache_dir": str(self.work / "fc_cache")})
+        self.assertIsNone(ForceConstantCache.from_parameter({}))
+        Path("empty").mkdir()
+        self.assertFalse(cache.store_force_constants("ab" * 32, "empty"))
+        write_spring_force_constants(Path("empty") / "FORCE_CONSTANTS", 2)
+        self.assertTrue(cache.store_force_constants("ab" * 32, "empty"))
+        Path("restored").mkdir()
+        self.assertTrue(cache.restore_force_constants("ab" * 32, "restored"))
+        self.assertEqual(
+            (Path("restored") / "FORCE_CONSTANTS").read_text(),
+            (Path("empty") / "FORCE_CONSTANTS").read_text(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,9 +6,11 @@ import tempfile
 import unittest
 from pathlib import Path
 import json
+import math
 from unittest.mock import patch
 
 import dpdata
+import numpy as np
 import pytest
 import yaml
 
@@ -148,8 +150,9 @@ class TestGruneisen(unittest.TestCase):
             Path("SPOSCAR").write_text(Path("POSCAR").read_text())
             Path("phonopy_disp.yaml").write_text("displacements: []\n")
 
+        gruneisen = Gruneisen(dict(self.prop_param, phonopy_backend="cli"))
         with patch("apex.core.property.Gruneisen.subprocess.check_call", side_effect=fake_check_call):
-            task_list = self.gruneisen.make_confs(str(self.target_path), str(self.equi_path))
+            task_list = gruneisen.make_confs(str(self.target_path), str(self.equi_path))
         task_dirs = glob.glob(str(self.target_path / "task.*"))
         self.assertEqual(len(task_dirs), 3)
         self.assertEqual(len(task_list), 3)
@@ -175,6 +178,7 @@ class TestGruneisen(unittest.TestCase):
                 "type": "gruneisen",
                 "volume_strains": [-0.01, 0.0, 0.01],
                 "temperatures": [300],
+                "phonopy_backend": "cli",
                 "approach": "displacement",
                 "supercell_size": [2, 2, 2],
             },
@@ -219,6 +223,7 @@ class TestGruneisen(unittest.TestCase):
                 "type": "gruneisen",
                 "volume_strains": [-0.01, 0.0, 0.01],
                 "temperatures": [300],
+                "phonopy_backend": "cli",
                 "supercell_size": [1, 1, 1],
             },
             inter_param={"type": "vasp"},
@@ -266,12 +271,116 @@ class TestGruneisen(unittest.TestCase):
         self.assertIn("-c POSCAR-unitcell", calls[1])
         self.assertIn("--nomeshsym", calls[1])
 
+    def test_api_make_confs_writes_phonopy_displacements(self):
+        gruneisen = Gruneisen(
+            {
+                "type": "gruneisen",
+                "volume_strains": [-0.01, 0.0, 0.01],
+                "temperatures": [300],
+                "phonopy_backend": "api",
+                "approach": "displacement",
+                "supercell_size": [2, 2, 2],
+            },
+            inter_param={"type": "vasp"},
+        )
+        shutil.copy(self.source_path.parent / "CONTCAR_Mo_bcc", self.equi_path / "CONTCAR")
+        with patch("apex.core.property.Gruneisen.subprocess.check_call") as check_call:
+            task_list = gruneisen.make_confs(str(self.target_path), str(self.equi_path))
+        check_call.assert_not_called()
+
+        # bcc: one displacement per volume point next to the reference task
+        self.assertEqual(len(task_list), 6)
+        for helper_dir in sorted(self.target_path.glob("volume.*")):
+            self.assertTrue((helper_dir / "SPOSCAR").is_file())
+            self.assertTrue((helper_dir / "POSCAR-001").is_file())
+            disp = yaml.safe_load((helper_dir / "phonopy_disp.yaml").read_text())
+            self.assertEqual(len(disp["displacements"]), 1)
+
+    def test_api_ensure_mesh_yaml_reads_force_constants(self):
+        from phonopy.file_IO import write_FORCE_CONSTANTS
+
+        gruneisen = Gruneisen(
+            {
+                "type": "gruneisen",
+                "volume_strains": [-0.01, 0.0, 0.01],
+                "temperatures": [300],
+                "phonopy_backend": "api",
+                "supercell_size": [1, 1, 1],
+            },
+            inter_param={"type": "vasp"},
+        )
+        task_dir = self.work_root / "vasp_mesh" / "task.000000"
+        task_dir.mkdir(parents=True)
+        (task_dir / "band.conf").write_text("PRIMITIVE_AXES = P\nMESH = 2 2 2\n")
+        shutil.copy(self.source_path.parent / "CONTCAR_Mo_bcc", task_dir / "POSCAR-unitcell")
+        # nearest-neighbour springs between the two atoms, acoustic sum rule satisfied
+        fc = np.zeros((2, 2, 3, 3))
+        fc[0, 0] = fc[1, 1] = np.eye(3)
+        fc[0, 1] = fc[1, 0] = -np.eye(3)
+        write_FORCE_CONSTANTS(fc, filename=str(task_dir / "FORCE_CONSTANTS"))
+
+        cwd = os.getcwd()
+        try:
+            gruneisen._ensure_mesh_yaml(str(task_dir))
+        finally:
+            os.chdir(cwd)
+
+        mesh = yaml.safe_load((task_dir / "mesh.yaml").read_text())
+        self.assertEqual(len(mesh["phonon"]), 8)
+        self.assertEqual(len(mesh["phonon"][0]["band"]), 6)
+
+    def test_force_constant_cache_skips_cached_displacement_volumes(self):
+        from phonopy.file_IO import write_FORCE_CONSTANTS
+
+        def make_gruneisen():
+            return Gruneisen(
+                {
+                    "type": "gruneisen",
+                    "volume_strains": [-0.01, 0.0, 0.01],
+                    "temperatures": [300],
+                    "phonopy_backend": "api",
+                    "approach": "displacement",
+                    "supercell_size": [1, 1, 1],
+                    "MESH": [2, 2, 2],
+                    "fc_cache_dir": str(self.work_root / "fc_cache"),
+                },
+                inter_param={"type": "vasp"},
+            )
+
+        shutil.copy(self.source_path.parent / "CONTCAR_Mo_bcc", self.equi_path / "CONTCAR")
+        first = make_gruneisen()
+        self.assertEqual(len(first.make_confs(str(self.target_path), str(self.equi_path))), 6)
+        fc = np.zeros((2, 2, 3, 3))
+        fc[0, 0] = fc[1, 1] = np.eye(3)
+        fc[0, 1] = fc[1, 0] = -np.eye(3)
+        for helper_dir in sorted(self.target_path.glob("volume.*")):
+            # stand-in for the force constants phonopy builds from the displacement runs
+            write_FORCE_CONSTANTS(fc, filename=str(helper_dir / "FORCE_CONSTANTS"))
+            digest = first._force_constant_digest(str(helper_dir), "POSCAR-unitcell")
+            self.assertTrue(first.fc_cache.store_force_constants(digest, str(helper_dir)))
+
+        second = make_gruneisen()
+        work = self.work_root / "gruneisen_01"
+        task_list = second.make_confs(str(work), str(self.equi_path))
+        self.assertEqual(len(task_list), 3)
+        manifest = loadfn(work / "vasp_gruneisen_tasks.json")
+        self.assertTrue(all(entry["displacement_tasks"] == [] for entry in manifest["volume_points"]))
+
+        cwd = os.getcwd()
+        try:
+            second._ensure_vasp_volume_outputs(str(work), str(work / "volume.000000"), [])
+        finally:
+            os.chdir(cwd)
+        mesh = yaml.safe_load((work / "volume.000000" / "mesh.yaml").read_text())
+        self.assertEqual(len(mesh["phonon"][0]["band"]), 6)
+
     def test_sign_only_compute_lower_from_vasp_displacement_manifest(self):
         gruneisen = Gruneisen(
             {
                 "type": "gruneisen",
                 "volume_strains": [-0.01, 0.0, 0.01],
                 "temperatures": [100, 300],
+                "phonopy_backend": "cli",
                 "alpha_mode": "sign_only",
                 "approach": "displacement",
             },
@@ -339,6 +448,7 @@ class TestGruneisen(unittest.TestCase):
                 "type": "gruneisen",
                 "volume_strains": [-0.01, 0.0, 0.01],
                 "temperatures": [300],
+                "phonopy_backend": "cli",
                 "supercell_size": [2, 2, 2],
             },
             inter_param={
@@ -393,6 +503,7 @@ class TestGruneisen(unittest.TestCase):
                 "type": "gruneisen",
                 "volume_strains": [-0.01, 0.0, 0.01],
                 "temperatures": [100, 300],
+                "phonopy_backend": "cli",
                 "alpha_mode": "sign_only",
             },
             inter_param={"type": "abacus"},
@@ -587,10 +698,18 @@ class TestGruneisen(unittest.TestCase):
         self.assertEqual(len(result["mode_gruneisen"][0]["gamma"]), 2)
         self.assertEqual(result["mode_gruneisen"][0]["weight"], 1)
         self.assertEqual(result["mode_gruneisen"][0]["omega_ref"], [4.1, 8.2])
-        self.assertIn("100.0", result["mode_heat_capacity"][0]["cv"])
-        self.assertIn("300.0", result["mode_heat_capacity"][0]["cv"])
-        self.assertEqual(len(result["mode_heat_capacity"][0]["cv"]["100.0"]), 2)
-        self.assertEqual(len(result["mode_contributions"][0]["gamma_cv"]["300.0"]), 2)
+        # per-mode heat capacities are only written with mode_detail
+        self.assertNotIn("mode_heat_capacity", result)
+        self.assertNotIn("mode_detail_file", result)
+        self.assertFalse((work_dir / "mode_detail.npz").exists())
+        gruneisen.mode_detail = True
+        detailed, _ = gruneisen._compute_lower(str(output_file), task_dirs, [])
+        self.assertEqual(detailed["mode_detail_file"], "mode_detail.npz")
+        with np.load(work_dir / "mode_detail.npz") as detail:
+            self.assertEqual(detail["cv"].shape, (2, 1, 2))
+            self.assertEqual(detail["gamma_cv"].shape, (2, 1, 2))
+            np.testing.assert_allclose(detail["temperatures"], [100.0, 300.0])
+            np.testing.assert_allclose(detail["gamma_cv"].sum(axis=(1, 2)), result["thermal_expansion"]["sum_gamma_cv"])
         self.assertEqual(len(result["contribution_summary"]), 2)
         self.assertGreater(result["contribution_summary"][0]["positive_sum"], 0.0)
         self.assertEqual(result["contribution_summary"][0]["negative_sum"], 0.0)
@@ -724,6 +843,73 @@ class TestGruneisen(unittest.TestCase):
         cv = Gruneisen._mode_heat_capacity(frequency_thz=500.0, temperature=1.0)
         self.assertEqual(cv, 0.0)
 
+    def test_mode_heat_capacity_array_matches_scalar(self):
+        frequencies = [[-0.3, 0.0, 1e-6, 0.5], [4.1, 8.2, 20.0, 500.0]]
+        temperatures = [1.0, 10.0, 300.0, 3000.0]
+        cv = Gruneisen._mode_heat_capacity_array(frequencies, temperatures)
+        self.assertEqual(cv.shape, (4, 2, 4))
+        for t_idx, temperature in enumerate(temperatures):
+            for q_idx, row in enumerate(frequencies):
+                for m_idx, frequency in enumerate(row):
+                    # near x = 0 the 1 - exp(-x) cancellation amplifies last-ulp exp differences
+                    expected = Gruneisen._mode_heat_capacity(frequency, temperature)
+                    self.assertTrue(math.isclose(cv[t_idx, q_idx, m_idx], expected, rel_tol=1e-8, abs_tol=1e-30))
+
+    def test_sign_only_kernel_matches_mode_loop_in_temperature_chunks(self):
+        temperatures = [5.0 * ii for ii in range(1, 41)]
+        gruneisen = Gruneisen(
+            {
+                "type": "gruneisen",
+                "volume_strains": [-0.01, 0.0, 0.01],
+                "temperatures": temperatures,
+                "mode_detail": True,
+            }
+        )
+        ref = [[-0.2, 1.0, 4.1, 8.2], [0.0, 2.5, 5.0, 7.5], [0.3, 3.0, 6.0, 9.0]]
+        minus = [[freq * 1.01 for freq in row] for row in ref]
+        plus = [[freq * (0.99 if ii % 2 else 1.005) for ii, freq in enumerate(row)] for row in ref]
+        minus[2][0] = -0.1
+        weights = [1, 4, 2]
+        infos = [
+            {"frequencies": freqs, "weights": weights, "volume": volume}
+            for freqs, volume in ((ref, 100.0), (minus, 99.0), (plus, 101.0))
+        ]
+        with patch("apex.core.property.Gruneisen.KERNEL_CHUNK_ELEMENTS", 24):
+            result = gruneisen._compute_sign_only(*infos)
+
+        denom = math.log(101.0) - math.log(99.0)
+        self.assertEqual(result["skipped_mode_count"], 3)
+        self.assertEqual(result["mode_heat_capacity"].shape, (len(temperatures), 3, 4))
+        for temp_idx, temperature in enumerate(temperatures):
+            expected = 0.0
+            for q_idx, weight in enumerate(weights):
+                for m_idx in range(4):
+                    omegas = (ref[q_idx][m_idx], minus[q_idx][m_idx], plus[q_idx][m_idx])
+                    if min(omegas) <= 0.0:
+                        self.assertIsNone(result["mode_gruneisen"][q_idx]["gamma"][m_idx])
+                        self.assertEqual(result["mode_heat_capacity"][temp_idx, q_idx, m_idx], 0.0)
+                        continue
+                    gamma = -(math.log(omegas[2]) - math.log(omegas[1])) / denom
+                    cv = Gruneisen._mode_heat_capacity(omegas[0], temperature)
+                    self.assertAlmostEqual(result["mode_gruneisen"][q_idx]["gamma"][m_idx], gamma)
+                    self.assertAlmostEqual(result["mode_heat_capacity"][temp_idx, q_idx, m_idx], cv, delta=1e-18)
+                    self.assertAlmostEqual(
+                        result["mode_contributions"][temp_idx, q_idx, m_idx],
+                        weight * gamma * cv,
+                        delta=1e-17,
+                    )
+                    expected += weight * gamma * cv
+            self.assertAlmostEqual(result["sum_gamma_cv"][temp_idx], expected, delta=1e-16)
+            summary = result["contribution_summary"][temp_idx]
+            self.assertAlmostEqual(summary["positive_sum"] + summary["negative_sum"], summary["net_sum"], delta=1e-16)
+
+        gruneisen.mode_detail = False
+        with patch("apex.core.property.Gruneisen.KERNEL_CHUNK_ELEMENTS", 24):
+            reduced = gruneisen._compute_sign_only(*infos)
+        self.assertIsNone(reduced["mode_heat_capacity"])
+        self.assertIsNone(reduced["mode_contributions"])
+        self.assertEqual(reduced["sum_gamma_cv"], result["sum_gamma_cv"])
+
     def _write_synthetic_gruneisen_tasks(self, work_dir, synthetic, weight=1):
         work_dir.mkdir(parents=True, exist_ok=True)
         task_dirs = []
@@ -6,10 +6,11 @@ import unittest
 
 import numpy as np
 from pymatgen.analysis.defects.core import Interstitial as pmg_Interstitial
+from pymatgen.analysis.defects.generators import VoronoiInterstitialGenerator
 from pymatgen.core import Structure
 from pymatgen.io.vasp import Incar
 
-from apex.core.property.Interstitial import Interstitial
+from apex.core.property.Interstitial import Interstitial, nearest_host_distances
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 __package__ = "tests"
@@ -104,3 +105,38 @@ class TestInterstitial(unittest.TestCase):
             center = (inter_site1.coords + inter_site2.coords) / 2
             self.assertTrue((center[0] - center[1]) < 1e-4)
             self.assertTrue((center[1] - center[2]) < 1e-4)
+
+    def test_nearest_host_distances(self):
+        ss = Structure.from_file(os.path.join(self.source_path, "CONTCAR_Al_fcc")).to_conventional()
+        vds = list(VoronoiInterstitialGenerator().generate(ss, ["Al"]))
+        # octahedral and tetrahedral sites
+        self.assertEqual(len(vds), 2)
+        nearest = nearest_host_distances(ss, [jj.site for jj in vds], 4.0)
+        for jj, dist in zip(vds, nearest):
+            temp = jj.get_supercell_structure(sc_mat=np.eye(3) * 2)
+            dm = temp.distance_matrix
+            self.assertAlmostEqual(dist, np.min(dm[~np.eye(len(temp), dtype=bool)]))
+        # nothing within the cutoff
+        self.assertTrue(np.all(np.isinf(nearest_host_distances(ss, [vds[0].site], 0.5))))
+
+    def test_make_confs_min_dist(self):
+        shutil.copy(
+            os.path.join(self.source_path, "CONTCAR_Al_fcc"),
+            os.path.join(self.equi_path, "CONTCAR"),
+        )
+        interstitial = Interstitial(
+            {
+                "type": "interstitial",
+                "supercell": [2, 2, 2],
+                "insert_ele": ["Al"],
+                "special_list": [],
+                "conf_filters": {"min_dist": 1.9},
+            }
+        )
+        # only the octahedral site is farther than 1.9 A from the host atoms
+        task_list = interstitial.make_confs(self.target_path, self.equi_path)
+        self.assertEqual(len(task_list), 1)
+        st0 = Structure.from_file(os.path.join(task_list[0], "POSCAR"))
+        self.assertEqual(len(st0), 33)
+        dm = st0.distance_matrix
+        self.assertGreaterEqual(np.min(dm[~np.eye(len(st0), dtype=bool)]), 1.9)
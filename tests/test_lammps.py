@@ -14,6 +14,7 @@ from monty.serialization import dumpfn, loadfn
 from apex.core.calculator.Lammps import Lammps
 from apex.core.calculator.lib import lammps_utils
 from apex.core.calculator.lib.lammps_utils import inter_deepmd
+from apex.core.lib import model_store
 
 #from .context import make_kspacing_kpoints, setUpModule
 
@@ -97,6 +98,58 @@ class TestLammps(unittest.TestCase):
         self.assertEqual(self.inter_param, ret)
         os.chdir(cwd)
 
+    def test_make_potential_files_share_model_store(self):
+        model = os.path.abspath("lammps_input/frozen_model.pb")
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                shutil.copy(model, "frozen_model.pb")
+                inter_param = dict(self.inter_param, model="frozen_model.pb")
+                task_dirs = [os.path.abspath("confs/std-fcc/eos_00/task.%06d" % ii) for ii in range(2)]
+                for task_dir in task_dirs:
+                    os.makedirs(task_dir)
+                    Lammps(inter_param, "POSCAR").make_potential_files(task_dir)
+                links = [os.path.join(task_dir, "frozen_model.pb") for task_dir in task_dirs]
+                links.append("confs/std-fcc/frozen_model.pb")
+                stored = {os.path.realpath(link) for link in links}
+                self.assertEqual(len(stored), 1)
+                self.assertTrue(all(model_store.is_store_link(link) for link in links))
+                self.assertEqual(len(glob.glob(".apex_models/*/frozen_model.pb")), 1)
+
+                # a task staged without its store is re-linked to a mounted one
+                shutil.copytree("confs/std-fcc/eos_00/task.000000", "staged/task.000000", symlinks=True)
+                staged = os.path.join("staged/task.000000", "frozen_model.pb")
+                self.assertFalse(os.path.exists(staged))
+                os.environ[model_store.MODEL_STORE_ENV] = os.path.abspath(".apex_models")
+                try:
+                    self.assertEqual(model_store.resolve_store_links("staged/task.000000", ["frozen_model.pb"]), [])
+                finally:
+                    del os.environ[model_store.MODEL_STORE_ENV]
+                self.assertEqual(os.path.realpath(staged), stored.pop())
+
+                # a stripped task records its links and is linked to a mounted store
+                self.assertEqual(model_store.strip_store_links(task_dirs[1], ".apex_models"), ["frozen_model.pb"])
+                self.assertFalse(os.path.lexists(links[1]))
+                shutil.copytree(".apex_models", "mounted/store")
+                self.assertEqual(model_store.resolve_store_links(task_dirs[1], [], "mounted/store"), [])
+                self.assertTrue(os.path.samefile(links[1], glob.glob("mounted/store/*/frozen_model.pb")[0]))
+
+                hard_task = os.path.abspath("confs/std-fcc/eos_00/task.000002")
+                os.makedirs(hard_task)
+                Lammps(dict(inter_param, model_link="hardlink"), "POSCAR").make_potential_files(hard_task)
+                hard_link = os.path.join(hard_task, "frozen_model.pb")
+                self.assertFalse(os.path.islink(hard_link))
+                self.assertTrue(os.path.samefile(hard_link, glob.glob(".apex_models/*/frozen_model.pb")[0]))
+                self.assertEqual(model_store.strip_store_links(hard_task, ".apex_models"), ["frozen_model.pb"])
+
+                # the store is next to the model, whatever the cwd
+                os.chdir("confs")
+                self.assertEqual(Lammps(dict(inter_param, model="../frozen_model.pb"), "POSCAR").model_store,
+                                 os.path.join(tmpdir, ".apex_models"))
+            finally:
+                os.chdir(cwd)
+
     def test_make_input_file(self):
         cwd = os.getcwd()
         abs_equi_path = os.path.abspath("confs/std-fcc/relaxation/relax_task")
@@ -141,3 +194,25 @@ class TestLammps(unittest.TestCase):
         self.assertFalse(
             any("dump.relax" in str(item.message) for item in caught)
         )
+
+    def test_parse_dump_file_last_frame_only(self):
+        frame = (
+            "ITEM: TIMESTEP\n{step}\nITEM: NUMBER OF ATOMS\n1\n"
+            "ITEM: BOX BOUNDS xy xz yz pp pp pp\n"
+            "0.0 2.0 0.0\n0.0 2.0 0.0\n0.0 2.0 0.0\n"
+            "ITEM: ATOMS id type xs ys zs fx fy fz\n"
+            "1 1 0.5 0.5 0.5 0.0 0.0 {fz}\n"
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dump = os.path.join(tmpdir, "dump.relax")
+            with open(dump, "w") as fp:
+                fp.write(frame.format(step=0, fz=1.0) + frame.format(step=5, fz=0.5))
+            for dump_frames, expected_steps in [("all", [0, 5]), ("last", [5])]:
+                self.Lammps.dump_frames = dump_frames
+                box, coord, vol, force = [], [], [], []
+                dumptime, type_list = self.Lammps._parse_dump_file(dump, box, coord, vol, force)
+                self.assertEqual(dumptime, expected_steps)
+                self.assertEqual(type_list, [0])
+                self.assertEqual(coord[-1], [[1.0, 1.0, 1.0]])
+                self.assertEqual(force[-1], [[0.0, 0.0, 0.5]])
+                self.assertEqual(vol[-1], 8.0)
@@ -0,0 +1,182 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from dflow.python import OPIO
+from monty.serialization import dumpfn, loadfn
+
+from apex.core import common_prop
+from apex.core.calculator.lib import lammps_batch, lammps_utils
+from apex.op.RunLAMMPS import RunLAMMPS
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+
+class FakeLammps:
+    instances = 0
+
+    def __init__(self, cmdargs=None):
+        FakeLammps.instances += 1
+        self.log = None
+        self.commands = []
+
+    def command(self, cmd):
+        self.commands.append(cmd)
+        if cmd.startswith("log "):
+            name = cmd.split()[1]
+            self.log = None if name == "none" else os.path.abspath(name)
+            if self.log:
+                open(self.log, "w").close()
+
+    def file(self, path):
+        with open(path) as fp:
+            contents = fp.read()
+        if "error" in contents:
+            raise Exception("ERROR: Unknown command")
+        with open(self.log, "a") as fp:
+            fp.write(contents)
+        with open("dump.relax", "w") as fp:
+            fp.write("ITEM: TIMESTEP\n0\n")
+
+    def close(self):
+        pass
+
+
+class TestInProcessLammps(unittest.TestCase):
+    def setUp(self):
+        FakeLammps.instances = 0
+        lammps_batch._ENGINE = None
+        self.patcher = mock.patch.dict(
+            sys.modules, {"lammps": types.SimpleNamespace(lammps=FakeLammps)}
+        )
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        lammps_batch._ENGINE = None
+
+    def _make_task(self, work_dir, name, prop_type="eos", in_process=True, script='print "All done"\n'):
+        task_dir = Path(work_dir) / name
+        task_dir.mkdir()
+        dumpfn(
+            {"type": prop_type, "cal_setting": {"lammps_in_process": in_process}},
+            task_dir / "task.json",
+        )
+        (task_dir / "in.lammps").write_text(script)
+        return task_dir
+
+    def test_in_process_requested_only_for_static_property_types(self):
+        self.assertTrue(lammps_batch.in_process_requested(
+            {"type": "elastic", "cal_setting": {"lammps_in_process": True}}))
+        self.assertFalse(lammps_batch.in_process_requested(
+            {"type": "elastic", "cal_setting": {}}))
+        self.assertFalse(lammps_batch.in_process_requested(
+            {"type": "phonon", "cal_setting": {"lammps_in_process": True}}))
+
+    def test_task_with_injected_run_command_is_not_in_process(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            task_dir = self._make_task(tmpdir, "task.000000")
+            self.assertTrue(lammps_batch.task_in_process(task_dir))
+            (task_dir / "run_command").write_text("lmp -i in.lammps")
+            self.assertFalse(lammps_batch.task_in_process(task_dir))
+
+    def test_run_tasks_share_one_instance_and_finish_logs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for ii in range(3):
+                self._make_task(tmpdir, "task.%06d" % ii)
+            cwd = os.getcwd()
+            exit_codes = lammps_batch.run_tasks_in_process(
+                tmpdir, ["task.%06d" % ii for ii in range(3)]
+            )
+            self.assertEqual(os.getcwd(), cwd)
+            self.assertEqual(exit_codes, [0, 0, 0])
+            self.assertEqual(FakeLammps.instances, 1)
+            for ii in range(3):
+                log = os.path.join(tmpdir, "task.%06d" % ii, "log.lammps")
+                self.assertTrue(lammps_utils.check_finished(log))
+                self.assertTrue(os.path.isfile(os.path.join(tmpdir, "task.%06d" % ii, "dump.relax")))
+
+    def test_failed_task_is_reported_without_wall_time(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            task_dir = self._make_task(tmpdir, "task.000000", script="error\n")
+            exit_codes = lammps_batch.run_tasks_in_process(tmpdir, ["task.000000"])
+            self.assertEqual(exit_codes, [1])
+            self.assertFalse(lammps_utils.check_finished(task_dir / "log.lammps"))
+            self.assertIn("Unknown command", (task_dir / "errlog").read_text())
+
+    def test_run_lammps_op_uses_in_process_engine(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            task_dir = self._make_task(tmpdir, "task.000000")
+            RunLAMMPS().execute(OPIO({
+                "input_lammps": task_dir,
+                "run_command": "python -c 'import sys; sys.exit(7)'",
+            }))
+            status = loadfn(task_dir / "apex_task_status.json")
+            self.assertEqual(status["state"], "succeeded")
+            self.assertEqual(status["run_command"], "<in-process LAMMPS>")
+            self.assertTrue(lammps_utils.check_finished(task_dir / "log.lammps"))
+
+    def test_child_survives_lammps_exit(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # a library without exception support exits the interpreter on an error
+            fake = Path(tmpdir) / "fake"
+            fake.mkdir()
+            (fake / "lammps.py").write_text(
+                "import os\n"
+                "class lammps:\n"
+                "    def __init__(self, cmdargs=None): pass\n"
+                "    def command(self, cmd):\n"
+                "        if cmd.startswith('log ') and cmd.split()[1] != 'none':\n"
+                "            open(cmd.split()[1], 'w').close()\n"
+                "    def file(self, path):\n"
+                "        if 'error' in open(path).read(): os._exit(1)\n"
+            )
+            work = Path(tmpdir) / "work"
+            work.mkdir()
+            names = ["task.%06d" % ii for ii in range(3)]
+            for name in names:
+                self._make_task(work, name, script="error\n" if name == names[1] else "run 0\n")
+            env = {"PYTHONPATH": os.pathsep.join([str(fake)] + sys.path)}
+            with mock.patch.dict(os.environ, env):
+                exit_codes = lammps_batch.run_tasks_in_child(str(work), names)
+            self.assertEqual(exit_codes, [0, 1, 0])
+            self.assertTrue(lammps_utils.check_finished(work / names[2] / "log.lammps"))
+            self.assertIn("exited", (work / names[1] / "errlog").read_text())
+
+    def _run_property_jobs(self, mdata):
+        jobs = []
+        with mock.patch.object(common_prop, "lammps_module_available", return_value=True), \
+                mock.patch.object(common_prop, "run_scheduled_jobs", lambda jj, nn: jobs.extend(jj)):
+            common_prop.run_property(
+                [self.conf], {"type": "deepmd", "model": "frozen_model.pb", "type_map": {"Al": 0}},
+                [{"type": "eos", "cal_setting": {"lammps_in_process": True}}], mdata)
+        return {job[1]: job[3] for job in jobs}
+
+    def test_run_property_in_process_selection(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.conf = os.path.join(tmpdir, "confs", "Al")
+            work = Path(self.conf) / "eos_00"
+            work.mkdir(parents=True)
+            tasks = [self._make_task(work, "task.%06d" % ii) for ii in range(3)]
+            (tasks[0] / "log.lammps").write_text("Total wall time: 0:00:01\n")
+            (tasks[2] / "run_command").write_text("lmp -i in.lammps")
+
+            local = {"machine": {"batch_type": "Shell", "context_type": "LocalContext"}}
+            jobs = self._run_property_jobs(local)
+            # the finished task is not rerun, the injected command goes to the dispatcher
+            self.assertEqual(jobs[str(work) + " (in-process)"], (str(work), [str(tasks[1])]))
+            self.assertEqual(jobs[str(work)][1], [str(tasks[2])])
+
+            remote = {"machine": {"batch_type": "Slurm", "context_type": "SSHContext"}}
+            jobs = self._run_property_jobs(remote)
+            self.assertEqual(list(jobs), [str(work)])
+            self.assertEqual(jobs[str(work)][1], [str(ii) for ii in tasks])
+
+
+if __name__ == "__main__":
+    unittest.main()
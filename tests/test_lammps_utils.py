@@ -1,11 +1,13 @@
 import json
 import tempfile
 import unittest
+from unittest import mock
 from pathlib import Path
 
 import pytest
 
 from apex.core.calculator.lib import lammps_utils
+from apex.core.lib import util
 
 
 TYPE_MAP = {"Al": 0}
@@ -479,6 +481,124 @@ def test_make_lammps_annealing_langevin_nve():
     assert "fix final_eq_lgv all langevin ${end_temp} ${end_temp} tdamp_var 24680" in script
 
 
+def write_two_frame_dump(path):
+    frame = (
+        "ITEM: TIMESTEP\n{step}\n"
+        "ITEM: NUMBER OF ATOMS\n2\n"
+        "ITEM: BOX BOUNDS xy xz yz pp pp pp\n"
+        "0.0 4.0 0.0\n0.0 4.0 0.0\n0.0 4.0 0.0\n"
+        "ITEM: ATOMS id type xs ys zs fx fy fz\n"
+        "1 1 0.0 0.0 0.0 0.1 0.2 0.3\n"
+        "2 2 0.5 0.5 {zs} -0.1 -0.2 -0.3\n"
+    )
+    path.write_text(frame.format(step=0, zs=0.5) + frame.format(step=12, zs=0.25))
+
+
+def test_iter_dump_frames_and_read_last_dump_frame(tmp_path):
+    dump = tmp_path / "dump.relax"
+    write_two_frame_dump(dump)
+
+    frames = list(lammps_utils.iter_dump_frames(dump))
+    assert [frame["timestep"] for frame in frames] == [0, 12]
+    assert frames[0]["types"].tolist() == [0, 1]
+    assert frames[0]["volume"] == 64.0
+    assert frames[1]["coords"].tolist() == [[0.0, 0.0, 0.0], [2.0, 2.0, 1.0]]
+    assert frames[1]["forces"].tolist() == [[0.1, 0.2, 0.3], [-0.1, -0.2, -0.3]]
+
+    last = lammps_utils.read_last_dump_frame(dump)
+    assert last["timestep"] == 12
+    assert last["coords"].tolist() == frames[1]["coords"].tolist()
+
+
+SAMPLE_LOG = """LAMMPS (29 Aug 2024)
+print "Final energy per atoms = ${Epa}"
+   Step         PotEng          Pxx            Pyy            Pzz            Pxy            Pxz            Pyz             Lx             Ly             Lz           Volume         c_mype
+         0  -13.4   1000   2000   3000   10   20   30   4.0   4.0   4.0   64.0   -13.4
+WARNING: thermo output interleaved with warnings
+        10  -13.6   100    200    300    1    2    3    4.1   4.1   4.1   68.921 -13.6
+Loop time of 0.1 on 1 procs for 10 steps with 4 atoms
+All done
+Total number of atoms = 4
+Final energy per atoms = -3.4
+Final volume per atoms = 17.23025
+Final Base area = 16.81
+Final Stress (xx yy zz xy xz yz) = 0.1 0.2 0.3 0.001 0.002 0.003
+Total wall time: 0:00:00
+"""
+
+
+def test_read_lammps_log_shares_single_parse(tmp_path):
+    log = tmp_path / "log.lammps"
+    log.write_text(SAMPLE_LOG)
+
+    parsed = lammps_utils.read_lammps_log(log)
+    assert len(parsed["thermo"]) == 1
+    assert parsed["thermo"][0]["columns"][:2] == ["Step", "PotEng"]
+    assert parsed["thermo"][0]["data"].shape == (2, 13)
+    assert lammps_utils.read_lammps_log(log) is parsed
+
+    assert lammps_utils.get_nev(log) == (4, -3.4, 17.23025)
+    assert lammps_utils.get_base_area(log) == 16.81
+    assert lammps_utils.get_stress(log).tolist() == [
+        [0.1, 0.001, 0.002],
+        [0.001, 0.2, 0.003],
+        [0.002, 0.003, 0.3],
+    ]
+
+    thermo = lammps_utils.get_thermo(log, steps=[10, 20])
+    assert thermo["step"].tolist() == [10]
+    assert thermo["energy"].tolist() == [-13.6]
+    assert thermo["stress"][0].tolist() == [
+        [0.1, 0.001, 0.002],
+        [0.001, 0.2, 0.003],
+        [0.002, 0.003, 0.3],
+    ]
+    assert thermo["box"].tolist() == [[4.1, 4.1, 4.1]]
+
+
+def test_check_finished_scans_tail_and_caches_on_mtime(tmp_path):
+    log = tmp_path / "log.lammps"
+    log.write_text("LAMMPS (29 Aug 2024)\n" + "thermo line\n" * 20000)
+    assert not lammps_utils.check_finished(log)
+
+    with open(log, "a") as fp:
+        fp.write("Total wall time: 0:00:01\n")
+    assert lammps_utils.check_finished(log)
+
+    with open(log, "rb") as fp:
+        offset = util.rfind_in_file(fp, b"Total wall time:", block_size=7)
+    assert offset == log.read_bytes().rfind(b"Total wall time:")
+
+    # an unchanged file is answered from the cache without being reopened
+    with mock.patch("builtins.open", side_effect=AssertionError("re-read")):
+        assert lammps_utils.check_finished(log)
+
+
+def test_check_finished_reads_tail_window_and_sidecar(tmp_path):
+    log = tmp_path / "log.lammps"
+    # a marker far from the end is not a completion marker
+    log.write_text("Total wall time: 0:00:01\n" + "x" * (2 * util.FINISHED_TAIL_BYTES))
+    with mock.patch.object(util, "rfind_in_file", wraps=util.rfind_in_file) as rfind:
+        assert not lammps_utils.check_finished(log)
+    assert rfind.call_args.kwargs["max_bytes"] == util.FINISHED_TAIL_BYTES
+
+    with open(log, "a") as fp:
+        fp.write("\nTotal wall time: 0:00:02\n")
+    assert lammps_utils.check_finished(log)
+    assert (tmp_path / util.FINISHED_SIDECAR).is_file()
+
+    # a new process (empty memory cache) answers from the sidecar without scanning
+    util._FINISHED_CACHE.clear()
+    with mock.patch.object(util, "rfind_in_file", side_effect=AssertionError("re-scan")):
+        assert lammps_utils.check_finished(log)
+
+    # a changed file is searched again
+    with open(log, "a") as fp:
+        fp.write("more output\n")
+    util._FINISHED_CACHE.clear()
+    assert lammps_utils.check_finished(log)
+
+
 class TestLammpsUtils(unittest.TestCase):
     def test_element_list_orders_by_lammps_type_id(self):
         test_element_list_orders_by_lammps_type_id()
@@ -563,3 +683,19 @@ class TestLammpsUtils(unittest.TestCase):
 
     def test_make_lammps_annealing_langevin_nve(self):
         test_make_lammps_annealing_langevin_nve()
+
+    def test_iter_dump_frames_and_read_last_dump_frame(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            test_iter_dump_frames_and_read_last_dump_frame(Path(tmp))
+
+    def test_read_lammps_log_shares_single_parse(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            test_read_lammps_log_shares_single_parse(Path(tmp))
+
+    def test_check_finished_reads_tail_window_and_sidecar(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            test_check_finished_reads_tail_window_and_sidecar(Path(tmp))
+
+    def test_check_finished_scans_tail_and_caches_on_mtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            test_check_finished_scans_tail_and_caches_on_mtime(Path(tmp))
@@ -3,6 +3,7 @@ import json
 import os
 import shutil
 import sys
+import tempfile
 import unittest
 
 import dpdata
@@ -100,3 +101,57 @@ class TestMakeProperty(unittest.TestCase):
             with open(os.path.join(ii, "POTCAR")) as fp:
                 poti = fp.read()
             self.assertEqual(pot0, poti)
+
+
+class TestMakePropertyParallel(unittest.TestCase):
+    inter_param = {
+        "type": "deepmd",
+        "model": "frozen_model.pb",
+        "type_map": {"Al": 0},
+    }
+    property_list = [
+        {"type": "eos", "vol_start": 0.9, "vol_end": 1.1, "vol_step": 0.05},
+        {"type": "vacancy", "supercell": [2, 2, 2]},
+    ]
+
+    def _make(self, root, processes):
+        for conf in ["std-fcc", "fcc-Al"]:
+            equi_path = os.path.join(root, "confs", conf, "relaxation", "relax_task")
+            os.makedirs(equi_path)
+            shutil.copy(
+                os.path.join("equi", "lammps", "Al-fcc.vasp"),
+                os.path.join(equi_path, "CONTCAR"),
+            )
+        shutil.copy(os.path.join("lammps_input", "frozen_model.pb"), root)
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            make_property(["confs/*"], self.inter_param, self.property_list,
+                          processes=processes)
+        finally:
+            os.chdir(cwd)
+
+    @staticmethod
+    def _snapshot(root):
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, root)
+                if name == "info.log":
+                    continue
+                if os.path.islink(path):
+                    snapshot[rel] = ("link", os.readlink(path))
+                elif os.path.isfile(path):
+                    with open(path, "rb") as fp:
+                        snapshot[rel] = ("file", fp.read())
+        return snapshot
+
+    def test_parallel_make_matches_serial(self):
+        with tempfile.TemporaryDirectory() as serial, \
+                tempfile.TemporaryDirectory() as parallel:
+            self._make(serial, 1)
+            self._make(parallel, 3)
+            serial_tree = self._snapshot(serial)
+            self.assertTrue(any("eos_00/task.000004" in kk for kk in serial_tree))
+            self.assertEqual(serial_tree, self._snapshot(parallel))
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import tempfile
 import unittest
 from pathlib import Path
@@ -111,6 +113,12 @@ def test_other_eos_residual_wrappers_zero_for_matching_data(model, residual, par
     np.testing.assert_allclose(residual(pars, energies, volumes), 0.0)
 
 
+def test_plotting_functions_keep_docstrings():
+    # matplotlib is imported lazily below the docstrings
+    assert "extrapolate the data points" in mfp_eosfit.ext_vec.__doc__
+    assert "extrapolate the lattice parameters" in mfp_eosfit.ext_velp.__doc__
+
+
 def test_read_ve_and_init_guess_from_data(tmp_path):
     ve_file = tmp_path / "ve.dat"
     ve_file.write_text("\n9.0 -2.9 extra\n10.0 -3.0\n11.0 -2.9\n")
@@ -201,6 +209,77 @@ def test_fit_birch_murnaghan_invalid_inputs_raise():
         mfp_eosfit.init_guess_from_data([1, 2], [1, 2])
 
 
+@pytest.mark.parametrize("model", list(mfp_eosfit.BATCH_EOS_MODELS))
+def test_batch_jacobians_match_finite_differences(model):
+    func, jac = mfp_eosfit.BATCH_EOS_MODELS[model]
+    vol = np.linspace(8.5, 11.5, 9)
+    pars = [-3.0, 0.5, 4.2, 10.0] + ([0.01] if model == "BM5" else [])
+    analytic = np.stack([np.broadcast_to(col, vol.shape) for col in jac(vol, pars)], axis=-1)
+    for ii in range(len(pars)):
+        step = 1e-6 * max(1.0, abs(pars[ii]))
+        upper, lower = list(pars), list(pars)
+        upper[ii] += step
+        lower[ii] -= step
+        numeric = (func(vol, upper) - func(vol, lower)) / (2 * step)
+        np.testing.assert_allclose(analytic[:, ii], numeric, rtol=1e-6, atol=1e-8)
+
+
+def test_fit_eos_batch_recovers_parameters_of_ragged_datasets():
+    truth = [[-3.5, 0.6, 4.5, 16.0], [-2.0, 1.1, 4.0, 12.0], [-6.1, 0.3, 5.2, 22.0]]
+    datasets = []
+    for pars, npoints in zip(truth, [7, 11, 9]):
+        vol = np.linspace(0.88, 1.12, npoints) * pars[3]
+        datasets.append((vol, mfp_eosfit.birch(vol, pars)))
+
+    fits = mfp_eosfit.fit_eos_batch(datasets)
+    models = list(mfp_eosfit.BATCH_EOS_MODELS)
+    assert fits.dtype == mfp_eosfit.BATCH_FIT_DTYPE
+    assert len(fits) == len(truth) * len(models)
+    assert fits["model"][: len(models)].tolist() == models
+    assert fits["n_points"].tolist() == [7] * len(models) + [11] * len(models) + [9] * len(models)
+    assert fits["converged"].all()
+
+    birch_fits = fits[fits["model"] == "birch"]
+    np.testing.assert_allclose(
+        np.column_stack([birch_fits[key] for key in ["e0", "b0", "bp", "v0"]]), truth, rtol=1e-6
+    )
+    assert np.all(birch_fits["rmse"] < 1e-9)
+    np.testing.assert_allclose(birch_fits["b0_GPa"], birch_fits["b0"] * mfp_eosfit.eV2GPa)
+    # the other models describe the same curve closely
+    np.testing.assert_allclose(fits["v0"], np.repeat([pars[3] for pars in truth], len(models)), rtol=2e-3)
+
+
+def test_fit_eos_batch_invalid_inputs_raise():
+    vol = np.linspace(9.0, 11.0, 7)
+    with pytest.raises(ValueError, match="no batch fit"):
+        mfp_eosfit.fit_eos_batch([(vol, vol)], ["LOG4"])
+    with pytest.raises(ValueError, match="at least 5"):
+        mfp_eosfit.fit_eos_batch([(vol[:4], vol[:4])])
+    assert len(mfp_eosfit.fit_eos_batch([])) == 0
+
+
+def test_repro_ve_and_vp_match_pointwise_evaluation():
+    vol = np.linspace(14.0, 18.0, 6)
+    pars = [-3.5, 0.6, 4.5, 16.0]
+    energies = mfp_eosfit.repro_ve("vinet", vol, pars)
+    np.testing.assert_allclose(energies, [mfp_eosfit.vinet(vv, pars) for vv in vol])
+    pressures = mfp_eosfit.repro_vp("vinet", vol, pars)
+    dv = 1e-5
+    expected = [
+        -(mfp_eosfit.vinet(vv + 0.5 * dv, pars) - mfp_eosfit.vinet(vv - 0.5 * dv, pars)) / dv * mfp_eosfit.eV2GPa
+        for vv in vol
+    ]
+    np.testing.assert_allclose(pressures, expected)
+    with pytest.raises(ValueError):
+        mfp_eosfit.repro_ve("no_such_eos", vol, pars)
+
+
+def test_import_does_not_load_matplotlib():
+    code = "import sys, apex.core.lib.mfp_eosfit; print('matplotlib' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
 class TestMfpEosfitCoverage(unittest.TestCase):
     def test_eos_lists_include_expected_models(self):
         test_eos_lists_include_expected_models()
@@ -279,3 +358,20 @@ class TestMfpEosfitCoverage(unittest.TestCase):
 
     def test_fit_birch_murnaghan_invalid_inputs_raise(self):
         test_fit_birch_murnaghan_invalid_inputs_raise()
+
+    def test_batch_jacobians_match_finite_differences(self):
+        for model in mfp_eosfit.BATCH_EOS_MODELS:
+            with self.subTest(model=model):
+                test_batch_jacobians_match_finite_differences(model)
+
+    def test_fit_eos_batch_recovers_parameters_of_ragged_datasets(self):
+        test_fit_eos_batch_recovers_parameters_of_ragged_datasets()
+
+    def test_fit_eos_batch_invalid_inputs_raise(self):
+        test_fit_eos_batch_invalid_inputs_raise()
+
+    def test_repro_ve_and_vp_match_pointwise_evaluation(self):
+        test_repro_ve_and_vp_match_pointwise_evaluation()
+
+    def test_import_does_not_load_matplotlib(self):
+        test_import_does_not_load_matplotlib()
@@ -12,10 +12,11 @@ from dflow.python import (
     Artifact,
     TransientError,
 )
+from unittest import mock
 from monty.serialization import loadfn
 
 from apex.op.relaxation_ops import RelaxMake, _check_relaxation_outputs
-from apex.op.property_ops import PropsMake, _is_failed_task_status
+from apex.op.property_ops import PropsMake, PropsPost, _is_failed_task_status
 from apex.op.RunLAMMPS import RunLAMMPS
 from apex.utils import apex_task_succeeded, all_apex_task_status_succeeded
 try:
@@ -137,6 +138,50 @@ class TestRunLAMMPSDebug(unittest.TestCase):
             self.assertEqual(status["retry_reason"], "header_only_lammps_log_after_nonzero_exit")
 
 
+class TestPropsPost(unittest.TestCase):
+    class _Prop:
+        parameter = {"type": "eos"}
+
+        def compute(self, output_file, print_file, path_to_work):
+            Path(output_file).write_text("{}")
+
+    def test_retrieves_only_property_subtree(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmp = Path(tmpdir)
+            input_all = tmp / "all"
+            input_post = tmp / "post"
+            for conf in ["std-bcc", "std-fcc"]:
+                (input_all / "confs" / conf / "relaxation" / "relax_task").mkdir(parents=True)
+                (input_all / "confs" / conf / "relaxation" / "relax_task" / "CONTCAR").write_text("relaxed")
+            task = input_post / "confs" / "std-bcc" / "eos_00" / "task.000000"
+            task.mkdir(parents=True)
+            (task / "log.lammps").write_text("Total wall time: 0:00:01")
+            (task / "frozen_model.pb").write_text("model")
+            (tmp / "out").mkdir()
+            os.chdir(tmp / "out")
+            try:
+                with mock.patch("apex.core.common_prop.make_property_instance",
+                                return_value=self._Prop()):
+                    out = PropsPost().execute(OPIO({
+                        "input_post": input_post,
+                        "input_all": input_all,
+                        "prop_param": {"type": "eos"},
+                        "inter_param": {"type": "deepmd", "model": "frozen_model.pb"},
+                        "task_names": ["confs/std-bcc/eos_00/task.000000"],
+                        "path_to_prop": "confs/std-bcc/eos_00",
+                    }))
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(out["retrieve_path"], [Path("confs/std-bcc/eos_00")])
+            prop_dir = tmp / "out" / "confs" / "std-bcc" / "eos_00"
+            self.assertTrue((prop_dir / "result.json").is_file())
+            self.assertTrue((prop_dir / "task.000000" / "log.lammps").is_file())
+            self.assertFalse((prop_dir / "task.000000" / "frozen_model.pb").exists())
+            self.assertFalse((tmp / "out" / "confs" / "std-bcc" / "relaxation").exists())
+            self.assertFalse((tmp / "out" / "confs" / "std-fcc").exists())
+
+
 class TestMakeRelaxOPs(unittest.TestCase):
     def setUp(self) -> None:
         cwd = os.getcwd()
@@ -327,3 +372,12 @@ class TestMakePropsOPs(unittest.TestCase):
             len(out['task_paths']),
             self._expected_eos_task_count(param['properties'][0])
         )
+        # tasks carry no model, RunLAMMPS links them to the model_store artifact
+        self.assertTrue(out['model_store'].is_dir())
+        task_dir = out['task_paths'][0]
+        self.assertFalse(os.path.lexists(task_dir / 'frozen_model.pb'))
+        self.assertTrue((task_dir / '.apex_model_links.json').is_file())
+        RunLAMMPS._resolve_model_links(task_dir, out['model_store'])
+        self.assertTrue((task_dir / 'frozen_model.pb').is_file())
+        RunLAMMPS._cleanup_model_links(task_dir)
+        self.assertFalse(os.path.lexists(task_dir / 'frozen_model.pb'))
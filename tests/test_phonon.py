@@ -84,6 +84,11 @@ class TestPhonon(unittest.TestCase):
                 "phonopy -d --dim='2 2 2' -c POSCAR",
             )
 
+    def test_reprod_trajectory_rejected(self):
+        with self.assertRaises(RuntimeError):
+            Phonon({"type": "phonon", "reproduce": True, "reprod_trajectory": True})
+        Phonon({"type": "phonon", "reproduce": True, "reprod_trajectory": False})
+
     def test_make_phonon_conf(self):
         if not os.path.exists(os.path.join(self.equi_path, "CONTCAR")):
             with self.assertRaises(RuntimeError):
@@ -0,0 +1,134 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.lib import phonon_mesh
+from apex.core.lib.phonon_mesh import MESH_CACHE_SUFFIX, load_mesh
+
+# layout written by phonopy, eigenvectors and group velocities included
+PHONOPY_MESH_YAML = """\
+mesh: [     2,     1,     1 ]
+nqpoint: 2
+reciprocal_lattice:
+- [  0.24689701,  0.00000000,  0.00000000 ] # a*
+- [  0.00000000,  0.24689701,  0.00000000 ] # b*
+- [  0.00000000,  0.00000000,  0.24689701 ] # c*
+natom:    1
+lattice:
+- [     4.050000000000000,     0.000000000000000,     0.000000000000000 ] # a
+- [     0.000000000000000,     4.050000000000000,     0.000000000000000 ] # b
+- [     0.000000000000000,     0.000000000000000,     4.050000000000000 ] # c
+points:
+- symbol: Al # 1
+  coordinates: [  0.000000000000000,  0.000000000000000,  0.000000000000000 ]
+  mass: 26.981539
+
+phonon:
+- q-position: [    0.0000000,    0.0000000,    0.0000000 ]
+  distance_from_gamma:  0.000000000
+  weight: 1
+  band:
+  - # 1
+    frequency:    -0.0000000065
+    group_velocity: [    -0.0000000,     0.0000000,     0.0000000 ]
+    eigenvector:
+    - # atom 1
+      - [  1.00000000000000,  0.00000000000000 ]
+      - [  0.00000000000000,  0.00000000000000 ]
+      - [  0.00000000000000,  0.00000000000000 ]
+  - # 2
+    frequency:     0.0000000031
+  - # 3
+    frequency:     1.2500000000e-01
+
+- q-position: [    0.5000000,    0.0000000,    0.0000000 ]
+  distance_from_gamma:  0.123448505
+  weight: 2
+  band:
+  - # 1
+    frequency:     4.1234567890
+    eigenvector:
+    - # atom 1
+      - [ -0.50000000000000,  0.00000000000000 ]
+      - [  0.00000000000000,  0.00000000000000 ]
+      - [  0.00000000000000,  0.00000000000000 ]
+  - # 2
+    frequency:     4.1234567890
+  - # 3
+    frequency:     8.2000000000
+"""
+
+EXPECTED_QPOINTS = [[0.0, 0.0, 0.0], [0.5, 0.0, 0.0]]
+EXPECTED_WEIGHTS = [1, 2]
+EXPECTED_FREQUENCIES = [[-0.0000000065, 0.0000000031, 0.125], [4.123456789, 4.123456789, 8.2]]
+
+
+class TestPhononMesh(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _assert_expected(self, mesh):
+        np.testing.assert_allclose(mesh["qpoints"], EXPECTED_QPOINTS)
+        self.assertEqual(mesh["weights"].tolist(), EXPECTED_WEIGHTS)
+        np.testing.assert_allclose(mesh["frequencies"], EXPECTED_FREQUENCIES, rtol=0, atol=1e-15)
+
+    def test_phonopy_yaml_is_scanned_and_cached(self):
+        (self.work / "mesh.yaml").write_text(PHONOPY_MESH_YAML)
+        self._assert_expected(load_mesh(str(self.work)))
+        self.assertTrue((self.work / ("mesh.yaml" + MESH_CACHE_SUFFIX)).is_file())
+
+        with mock.patch.object(phonon_mesh, "_load_mesh_yaml", side_effect=AssertionError("parsed again")):
+            self._assert_expected(load_mesh(str(self.work)))
+
+    def test_cache_is_refreshed_when_yaml_changes(self):
+        mesh_path = self.work / "mesh.yaml"
+        mesh_path.write_text(PHONOPY_MESH_YAML)
+        load_mesh(str(self.work))
+        mesh_path.write_text(PHONOPY_MESH_YAML.replace("8.2000000000", "9.5000000000"))
+        mesh = load_mesh(str(self.work))
+        self.assertEqual(mesh["frequencies"][1, 2], 9.5)
+
+    def test_block_style_yaml_matches_safe_load(self):
+        phonon = [
+            {
+                "weight": weight,
+                "q-position": qpoint,
+                "band": [{"frequency": freq} for freq in freqs],
+            }
+            for qpoint, weight, freqs in zip(EXPECTED_QPOINTS, EXPECTED_WEIGHTS, EXPECTED_FREQUENCIES)
+        ]
+        (self.work / "mesh.yaml").write_text(yaml.safe_dump({"nqpoint": 2, "phonon": phonon, "natom": 1}))
+        self._assert_expected(phonon_mesh._scan_mesh_yaml(str(self.work / "mesh.yaml")))
+
+    def test_hdf5_is_preferred(self):
+        try:
+            import h5py
+        except ImportError:
+            self.skipTest("h5py is not installed")
+        (self.work / "mesh.yaml").write_text("phonon: []\n")
+        with h5py.File(self.work / "mesh.hdf5", "w") as fp:
+            fp["qpoint"] = np.asarray(EXPECTED_QPOINTS)
+            fp["weight"] = np.asarray(EXPECTED_WEIGHTS)
+            fp["frequency"] = np.asarray(EXPECTED_FREQUENCIES)
+        self._assert_expected(load_mesh(str(self.work)))
+
+    def test_missing_mesh_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            load_mesh(str(self.work))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.lib.phonon_mesh import load_mesh
+from apex.core.lib.phonopy_driver import (
+    PhonopyDriver,
+    default_displacement_distance,
+    read_phonopy_conf,
+    resolve_phonopy_backend,
+    write_symmetry_cells,
+)
+
+BAND_CONF = """ATOM_NAME = Mo
+DIM = 2 2 2
+MESH = 4 4 4
+PRIMITIVE_AXES = P
+BAND = 0 0 1/2  0 0 0  1/2 -1/2 1/2, 1/4 1/4 1/4  0 0 0
+BAND_LABELS = H G N P G
+BAND_POINTS = 11
+BAND_CONNECTION = True
+FORCE_CONSTANTS=READ
+"""
+
+
+def write_harmonic_force_sets(driver, spring=5.0):
+    # restoring force on the displaced atom, balanced by the other atoms
+    phonon = driver.phonon
+    natom = len(phonon.supercell)
+    forces = []
+    for entry in phonon.dataset["first_atoms"]:
+        force = np.tile(spring * np.asarray(entry["displacement"]) / (natom - 1), (natom, 1))
+        force[entry["number"]] = -spring * np.asarray(entry["displacement"])
+        forces.append(force)
+    phonon.forces = np.asarray(forces)
+
+
+class TestPhonopyDriver(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work = Path(self.tmpdir.name)
+        self.cwd = os.getcwd()
+        shutil.copy(Path(__file__).resolve().parent / "equi" / "vasp" / "CONTCAR_Mo_bcc", self.work / "POSCAR")
+        (self.work / "band.conf").write_text(BAND_CONF)
+        os.chdir(self.work)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def test_resolve_backend(self):
+        self.assertEqual(resolve_phonopy_backend(), "api")
+        self.assertEqual(resolve_phonopy_backend("cli"), "cli")
+        with self.assertRaises(ValueError):
+            resolve_phonopy_backend("shell")
+
+    def test_read_phonopy_conf(self):
+        settings = read_phonopy_conf("band.conf")
+        self.assertEqual(settings["DIM"], "2 2 2")
+        self.assertEqual(settings["FORCE_CONSTANTS"], "READ")
+        self.assertEqual(settings["BAND_LABELS"], "H G N P G")
+
+    def test_generate_displacements_writes_cli_files(self):
+        driver = PhonopyDriver.from_unitcell("POSCAR", [2, 2, 2], "vasp", "P")
+        self.assertEqual(driver.generate_displacements(), 1)
+        for name in ["SPOSCAR", "POSCAR-001", "phonopy_disp.yaml"]:
+            self.assertTrue(os.path.isfile(name), name)
+        self.assertFalse(os.path.exists("POSCAR-002"))
+        reloaded = PhonopyDriver.from_disp_yaml("phonopy_disp.yaml", "band.conf")
+        self.assertEqual(len(reloaded.phonon.supercell), 16)
+        self.assertEqual(len(reloaded.phonon.dataset["first_atoms"]), 1)
+
+    def test_force_sets_to_band_and_mesh(self):
+        PhonopyDriver.from_unitcell("POSCAR", [2, 2, 2], "vasp", "P").generate_displacements()
+        driver = PhonopyDriver.from_disp_yaml("phonopy_disp.yaml", "band.conf")
+        write_harmonic_force_sets(driver)
+        from phonopy.file_IO import write_FORCE_SETS
+        write_FORCE_SETS(driver.phonon.dataset, filename="FORCE_SETS")
+
+        driver = PhonopyDriver.from_disp_yaml("phonopy_disp.yaml", "band.conf")
+        driver.read_force_sets("FORCE_SETS")
+        driver.produce_force_constants()
+        self.assertTrue(os.path.isfile("FORCE_CONSTANTS"))
+        driver.run_conf("band.conf", is_mesh_symmetry=False)
+
+        mesh = load_mesh(".")
+        self.assertEqual(mesh["frequencies"].shape, (64, 6))
+        band_dat = Path("band.dat").read_text().split("\n")
+        self.assertEqual(band_dat[0], "# End points of segments: ")
+        # one point per line for each of the 6 bands over 3 segments of 11 points
+        self.assertEqual(len([line for line in band_dat if line and not line.startswith("#")]), 6 * 33)
+        self.assertEqual(len(band_dat[1][4:].split()), 4)
+
+        # FORCE_CONSTANTS = READ gives the same frequencies in a fresh driver
+        fresh = PhonopyDriver.from_conf("band.conf", "POSCAR")
+        fresh.read_force_constants("FORCE_CONSTANTS")
+        fresh.run_mesh([4, 4, 4], is_mesh_symmetry=False)
+        np.testing.assert_allclose(load_mesh(".")["frequencies"], mesh["frequencies"], atol=1e-8)
+
+    def test_default_displacement_distance(self):
+        self.assertEqual(default_displacement_distance("vasp"), 0.01)
+        self.assertEqual(default_displacement_distance("abacus"), 0.02)
+
+    @unittest.skipUnless(shutil.which("phonopy-init") or shutil.which("phonopy"), "phonopy CLI not installed")
+    def test_abacus_displacements_match_cli(self):
+        stru = Path(__file__).resolve().parent / "equi" / "abacus" / "STRU"
+        for name in ["api", "cli"]:
+            Path(name).mkdir()
+            shutil.copy(stru, Path(name) / "STRU")
+            Path(name, "setting.conf").write_text("DIM = 2 2 2\n")
+        os.chdir("api")
+        self.assertEqual(PhonopyDriver.from_unitcell("STRU", [2, 2, 2], "abacus").generate_displacements(), 1)
+        os.chdir(os.path.join("..", "cli"))
+        executable = "phonopy-init" if shutil.which("phonopy-init") else "phonopy"
+        subprocess.run([executable, "setting.conf", "--abacus", "-d"], check=True, capture_output=True)
+        os.chdir("..")
+
+        import phonopy
+        api = phonopy.load(os.path.join("api", "phonopy_disp.yaml"), produce_fc=False, log_level=0)
+        cli = phonopy.load(os.path.join("cli", "phonopy_disp.yaml"), produce_fc=False, log_level=0)
+        self.assertEqual(len(api.dataset["first_atoms"]), len(cli.dataset["first_atoms"]))
+        for ii, jj in zip(api.dataset["first_atoms"], cli.dataset["first_atoms"]):
+            self.assertEqual(ii["number"], jj["number"])
+            np.testing.assert_allclose(ii["displacement"], jj["displacement"])
+            self.assertAlmostEqual(np.linalg.norm(ii["displacement"]), 0.02)
+        self.assertEqual(Path("api", "STRU-001").read_text(), Path("cli", "STRU-001").read_text())
+
+    def test_symmetry_cells(self):
+        write_symmetry_cells("POSCAR")
+        lines = Path("PPOSCAR").read_text().split("\n")
+        self.assertEqual(lines[6].split(), ["1"])
+        lines = Path("BPOSCAR").read_text().split("\n")
+        self.assertEqual(lines[6].split(), ["2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
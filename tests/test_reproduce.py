@@ -0,0 +1,225 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import dpdata
+import numpy as np
+from monty.serialization import dumpfn
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.calculator.Lammps import Lammps
+from apex.core.reproduce import (
+    REPRO_FRAMES_FILE,
+    REPRO_TRAJECTORY_DUMP,
+    load_repro_frames,
+    make_repro,
+    post_repro,
+    write_repro_frames,
+)
+
+MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lammps_input", "frozen_model.pb")
+INTER_PARAM = {"type": "deepmd", "model": MODEL, "type_map": {"Mg": 0, "Al": 1}}
+
+
+def make_trajectory(nframe, seed):
+    # two species listed as [Al, Mg] with interleaved atoms in a tilted cell
+    rng = np.random.default_rng(seed)
+    cells = np.array([[[4.0, 0.1, 0.2], [0.3, 4.1, 0.1], [0.2, 0.4, 3.9]]] * nframe)
+    cells += rng.normal(0, 0.02, cells.shape)
+    coords = rng.random((nframe, 4, 3)) @ cells[0]
+    return dpdata.LabeledSystem(
+        data={
+            "atom_names": ["Al", "Mg"],
+            "atom_numbs": [2, 2],
+            "atom_types": np.array([0, 1, 0, 1]),
+            "orig": np.zeros(3),
+            "cells": cells,
+            "coords": coords,
+            "energies": -10.0 + rng.normal(0, 0.1, nframe),
+            "forces": rng.normal(0, 0.1, (nframe, 4, 3)),
+            "virials": rng.normal(0, 0.1, (nframe, 3, 3)),
+        }
+    )
+
+
+def read_rerun_dump(dump):
+    frames = []
+    lines = Path(dump).read_text().split("\n")
+    while lines and lines[0] == "ITEM: TIMESTEP":
+        natoms = int(lines[3])
+        bounds = np.array([[float(ii) for ii in line.split()] for line in lines[5:8]])
+        atoms = np.array([[float(ii) for ii in line.split()] for line in lines[9 : 9 + natoms]])
+        frames.append({"step": int(lines[1]), "bounds": bounds, "atoms": atoms})
+        lines = lines[9 + natoms :]
+    return frames
+
+
+class TestReproduce(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work = Path(self.tmpdir.name)
+        self.trajectories = [make_trajectory(3, 0), make_trajectory(4, 1)]
+        for ii, system in enumerate(self.trajectories):
+            task = self.work / "init" / "std-fcc" / "eos_00" / ("task.%06d" % ii)
+            task.mkdir(parents=True)
+            dumpfn(system, task / "result_task.json")
+        self.path_to_work = self.work / "std-fcc" / "eos_01"
+        self.path_to_work.mkdir(parents=True)
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def _make_repro(self, trajectory):
+        return make_repro(
+            INTER_PARAM, str(self.work / "init"), "00", str(self.path_to_work), False, trajectory
+        )
+
+    def test_trajectory_mode_makes_one_task_per_trajectory(self):
+        task_list = self._make_repro(True)
+        self.assertEqual(len(task_list), 2)
+        for task, system in zip(task_list, self.trajectories):
+            frames = read_rerun_dump(os.path.join(task, REPRO_TRAJECTORY_DUMP))
+            self.assertEqual([frame["step"] for frame in frames], list(range(len(system))))
+            poscar = dpdata.System(os.path.join(task, "POSCAR"), fmt="vasp/poscar")
+            for frame, cell, coords in zip(frames, system["cells"], system["coords"]):
+                # Al atoms first, as in the POSCAR, typed by the Mg/Al type map
+                self.assertEqual(frame["atoms"][:, 1].tolist(), [2, 2, 1, 1])
+                xy, xz, yz = frame["bounds"][:, 2]
+                xx = frame["bounds"][0, 1] - frame["bounds"][0, 0] - abs(xy) - abs(xz)
+                yy = frame["bounds"][1, 1] - frame["bounds"][1, 0] - abs(yz)
+                zz = frame["bounds"][2, 1] - frame["bounds"][2, 0]
+                self.assertAlmostEqual(xx * yy * zz, abs(np.linalg.det(cell)))
+                # rotation keeps interatomic distances
+                xyz = frame["atoms"][:, 2:]
+                ordered = coords[[0, 2, 1, 3]]
+                np.testing.assert_allclose(
+                    np.linalg.norm(xyz[:, None] - xyz[None], axis=-1),
+                    np.linalg.norm(ordered[:, None] - ordered[None], axis=-1),
+                    atol=1e-10,
+                )
+            # conf.lmp is written from the rotated POSCAR, atom ids must match the first frame
+            np.testing.assert_allclose(poscar["coords"][0], frames[0]["atoms"][:, 2:], atol=1e-8)
+
+    def test_trajectory_mode_requires_lammps(self):
+        with self.assertRaises(RuntimeError):
+            make_repro(
+                {"type": "vasp"}, str(self.work / "init"), "00", str(self.path_to_work), False, True
+            )
+
+    def test_post_repro_reads_frame_arrays(self):
+        frame_tasks = self._make_repro(False)
+        self.assertEqual(len(frame_tasks), 7)
+        shift = 0.05
+        idx = 0
+        for system in self.trajectories:
+            for jj in range(len(system)):
+                result = system.sub_system([jj])
+                result.data["energies"] = result["energies"] + shift
+                dumpfn(result, os.path.join(frame_tasks[idx], "result_task.json"))
+                idx += 1
+        res_frames, ptr_frames = post_repro(
+            str(self.work / "init"), "00", frame_tasks, "", False, False
+        )
+
+        for task in frame_tasks:
+            for name in os.listdir(task):
+                os.remove(os.path.join(task, name))
+            os.rmdir(task)
+        traj_tasks = self._make_repro(True)
+        for task, system in zip(traj_tasks, self.trajectories):
+            write_repro_frames(task, system["energies"] + shift, system["forces"], system["virials"])
+        res_traj, ptr_traj = post_repro(
+            str(self.work / "init"), "00", traj_tasks, "", False, True
+        )
+        self.assertEqual(ptr_traj, ptr_frames)
+        self.assertEqual(list(res_traj), list(res_frames))
+        for key in res_frames:
+            self.assertEqual(res_traj[key]["nframes"], res_frames[key]["nframes"])
+            self.assertAlmostEqual(res_traj[key]["error"], res_frames[key]["error"])
+
+        write_repro_frames(traj_tasks[0], [-10.0], np.zeros((1, 4, 3)), np.zeros((1, 3, 3)))
+        with self.assertRaises(RuntimeError):
+            post_repro(str(self.work / "init"), "00", traj_tasks, "", False, True)
+
+    def test_post_repro_parity_in_reference_frame(self):
+        traj_tasks = self._make_repro(True)
+        # reproduced frames in POSCAR atom order and a rotated cell, energies shifted
+        rot, _ = np.linalg.qr(np.random.default_rng(2).normal(size=(3, 3)))
+        rot *= np.sign(np.linalg.det(rot))
+        order = [0, 2, 1, 3]
+        for task, system in zip(traj_tasks, self.trajectories):
+            forces = system["forces"][:, order] @ rot
+            forces[:, 0, 0] += 0.2
+            write_repro_frames(
+                task,
+                system["energies"] + 0.3,
+                forces,
+                np.einsum("ji,fjk,kl->fil", rot, system["virials"], rot),
+                system["cells"] @ rot,
+            )
+        res_data, ptr_data = post_repro(str(self.work / "init"), "00", traj_tasks, "", False, True)
+        for key, system in zip(sorted(res_data), self.trajectories):
+            self.assertEqual(res_data[key]["nframes"], len(system))
+            self.assertAlmostEqual(res_data[key]["error"], 0.0)
+            # one of 12 force components is off by 0.2 in every frame
+            self.assertAlmostEqual(res_data[key]["force_rmse"], 0.2 / np.sqrt(12))
+            self.assertAlmostEqual(res_data[key]["virial_rmse"], 0.0)
+        self.assertIn("Reproduce parity:", ptr_data)
+
+    def _run_rerun_task(self, inter_param):
+        task = self._make_repro(True)[0]
+        task_param = {
+            "type": "eos",
+            "reproduce": True,
+            "reprod_trajectory": True,
+            "cal_type": "static",
+            "cal_setting": {},
+        }
+        lammps = Lammps(inter_param, os.path.join(task, "POSCAR"))
+        lammps.make_input_file(task, "eos", task_param)
+
+        # stand-in for the rerun outputs of 3 frames
+        dump_frame = (
+            "ITEM: TIMESTEP\n{step}\nITEM: NUMBER OF ATOMS\n1\n"
+            "ITEM: BOX BOUNDS xy xz yz pp pp pp\n"
+            "0.0 2.0 0.0\n0.0 2.0 0.0\n0.0 2.0 0.0\n"
+            "ITEM: ATOMS id type xs ys zs fx fy fz\n"
+            "1 1 0.5 0.5 0.5 0.0 0.0 {step}.5\n"
+        )
+        Path(task, "dump.relax").write_text("".join(dump_frame.format(step=ii) for ii in range(3)))
+        log = "Step PotEng Pxx Pyy Pzz Pxy Pxz Pyz Lx Ly Lz Volume c_mype\n"
+        for ii in range(3):
+            log += "%d %f 1000 1000 1000 0 0 0 2 2 2 8 %f\n" % (ii, -3.0 - ii, -3.0 - ii)
+        log += "Loop time of 0.01 on 1 procs for 3 steps with 1 atoms\nTotal wall time: 0:00:00\n"
+        Path(task, "log.lammps").write_text(log)
+        return task, lammps.compute(task)
+
+    def test_lammps_rerun_input_and_frame_arrays(self):
+        task, result = self._run_rerun_task(INTER_PARAM)
+        contents = Path(task, "in.lammps").read_text()
+        self.assertIn("rerun           %s dump x y z box yes" % REPRO_TRAJECTORY_DUMP, contents)
+        self.assertIn("thermo          1\n", contents)
+
+        frames = load_repro_frames(task)
+        np.testing.assert_allclose(frames["energies"], [-3.0, -4.0, -5.0])
+        np.testing.assert_allclose(frames["forces"][:, 0, 2], [0.5, 1.5, 2.5])
+        self.assertEqual(frames["virials"].shape, (3, 3, 3))
+        self.assertTrue(os.path.isfile(os.path.join(task, REPRO_FRAMES_FILE)))
+        self.assertEqual(result["data"]["energies"]["data"], [-5.0])
+
+    def test_lammps_rerun_reads_all_frames_with_dump_frames_last(self):
+        task, result = self._run_rerun_task(dict(INTER_PARAM, dump_frames="last"))
+        frames = load_repro_frames(task)
+        np.testing.assert_allclose(frames["energies"], [-3.0, -4.0, -5.0])
+        np.testing.assert_allclose(frames["forces"][:, 0, 2], [0.5, 1.5, 2.5])
+        self.assertEqual(result["data"]["energies"]["data"], [-5.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,7 @@ from pathlib import Path
 from collections import Counter
 from unittest.mock import patch
 
+import numpy as np
 from pymatgen.core import Lattice, Structure
 from pymatgen.io.vasp import Poscar
 
@@ -22,12 +23,15 @@ from apex.core.lib.crys import (
 )
 from apex.core.lib.rss import (
     RSSInputError,
+    _IncrementalSRO,
+    _MetropolisChain,
     _assign_initial_species,
     _build_neighbor_shells,
     _build_sublattice_indices,
     _compute_warren_cowley_sro,
     _default_shell_cutoffs,
     _integerize_composition_counts,
+    _neighbor_shell,
     _normalize_shell_weights,
     _normalize_sro_targets,
     _normalize_validate_compositions,
@@ -352,6 +356,74 @@ class TestRSS(unittest.TestCase):
         self.assertEqual(meta["sampling"]["sampled_steps"], [4, -1])
         self.assertEqual(meta["sampling"]["sampled_rmses"], [0.10, 0.50])
 
+    def test_independent_chains_run_in_one_segment(self):
+        st = fcc("Ni", a=3.6)
+        st.make_supercell([2, 2, 2])
+        run = _MetropolisChain.run
+        calls = []
+
+        def counting_run(chain, *args, **kwargs):
+            calls.append(args[1])
+            return run(chain, *args, **kwargs)
+
+        common = dict(
+            structure=st,
+            compositions={"all": {"Co": 0.5, "Ni": 0.5}},
+            shell_cutoffs=[2.6],
+            max_steps=60,
+            seed=3,
+            exchange_interval=20,
+            processes=1,
+        )
+        with warnings.catch_warnings(), patch.object(_MetropolisChain, "run", counting_run):
+            warnings.simplefilter("ignore", UserWarning)
+            generate_rss(num_chains=3, **common)
+            self.assertEqual(calls, [60, 60, 60])
+            calls.clear()
+            # tempering exchanges still need segments
+            generate_rss(temperatures=[0.01, 0.1, 1.0], **common)
+            self.assertEqual(calls, [20] * 9)
+
+    def test_parallel_chains_are_deterministic_and_merge_samples(self):
+        st = fcc("Ni", a=3.6)
+        st.make_supercell([3, 3, 3])
+        common = dict(
+            structure=st,
+            compositions={"all": {"Co": 1 / 3, "Cr": 1 / 3, "Ni": 1 / 3}},
+            shell_cutoffs=[2.6],
+            max_steps=60,
+            interval=20,
+            num_configs=4,
+            seed=11,
+            exchange_interval=20,
+            show_progress=False,
+            return_metadata=True,
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            serial, serial_meta = generate_rss(num_chains=3, processes=1, **common)
+            pooled, pooled_meta = generate_rss(num_chains=3, processes=2, **common)
+            _, ladder_meta = generate_rss(temperatures=[0.01, 0.1, 1.0], processes=2, **common)
+
+        self.assertEqual(
+            [[str(site.specie) for site in s] for s in serial],
+            [[str(site.specie) for site in s] for s in pooled],
+        )
+        self.assertEqual(serial_meta["parallel"], pooled_meta["parallel"])
+        self.assertEqual(serial_meta["parallel"]["mode"], "independent")
+        self.assertEqual(len(set(serial_meta["parallel"]["seeds"])), 3)
+        self.assertEqual(serial_meta["attempted_moves"], 180)
+        self.assertEqual(serial_meta["best_objective"], min(serial_meta["parallel"]["chain_best_objectives"]))
+        signatures = {tuple(str(site.specie) for site in s) for s in serial}
+        self.assertEqual(len(signatures), 4)
+        self.assertEqual(ladder_meta["parallel"]["mode"], "parallel_tempering")
+        self.assertEqual(ladder_meta["parallel"]["exchange_attempted"], 3)
+
+        with self.assertRaises(RSSInputError):
+            generate_rss(num_chains=2, temperatures=[0.1, 0.2, 0.3], **common)
+        with self.assertRaises(RSSInputError):
+            generate_rss(temperatures=[-0.1, 0.2], **common)
+
     def test_invalid_structure_type_raises(self):
         with self.assertRaises(RSSInputError):
             generate_rss(
@@ -924,8 +996,10 @@ class TestRSSInternalHelpers(unittest.TestCase):
                 _integerize_composition_counts(1, {"A": 1.0, "B": 1.0}, 1e-6)
 
         single_site = Structure(Lattice.cubic(3.0), ["Ni"], [[0, 0, 0]])
+        # the only neighbours are periodic images of the site itself
+        self.assertAlmostEqual(_default_shell_cutoffs(single_site)[0], 1.05 * 3.0)
         with self.assertRaises(RSSInputError):
-            _default_shell_cutoffs(single_site)
+            _default_shell_cutoffs(Structure(Lattice.cubic(3.0), [], []))
 
         with self.assertRaises(RSSInputError):
             _build_neighbor_shells(single_site, [0.0])
@@ -985,12 +1059,54 @@ class TestRSSInternalHelpers(unittest.TestCase):
     def test_compute_warren_cowley_handles_missing_species(self):
         achieved = _compute_warren_cowley_sro(
             species_state=["A", "A"],
-            shell_pairs={0: [(0, 1)]},
+            shells={0: _neighbor_shell(2, [0, 1], [1, 0])},
             pair_keys=[("B", "B")],
             composition_fractions={"A": 1.0},
         )
         self.assertEqual(achieved[0][("B", "B")], 0.0)
 
+    def test_neighbor_shells_count_all_periodic_images(self):
+        st = bcc("Fe", a=2.85)
+        shells = _build_neighbor_shells(st, [2.6, 2.9])
+        # 8 nearest neighbours are images of the other site, 6 second ones of the site itself
+        self.assertEqual(shells[0].indptr.tolist(), [0, 1, 2])
+        self.assertEqual(shells[0].indices.tolist(), [1, 0])
+        self.assertEqual(shells[0].multiplicity.tolist(), [8, 8])
+        self.assertEqual(shells[1].indices.tolist(), [0, 1])
+        self.assertEqual(shells[1].multiplicity.tolist(), [6, 6])
+        self.assertEqual(shells[0].num_bonds, 8)
+
+        large = fcc("Ni", a=3.6)
+        large.make_supercell([3, 3, 3])
+        shell = _build_neighbor_shells(large, [2.6])[0]
+        self.assertEqual(np.diff(shell.indptr).tolist(), [12] * len(large))
+        self.assertEqual(shell.num_bonds, 6 * len(large))
+
+    def test_incremental_sro_matches_full_recompute(self):
+        rng = random.Random(5)
+        pair_keys = [("Co", "Co"), ("Co", "Cr"), ("Co", "Ni"), ("Cr", "Cr"), ("Cr", "Ni"), ("Fe", "Ni"), ("Ni", "Ni")]
+        for supercell in ([2, 2, 1], [3, 3, 3]):
+            st = fcc("Ni", a=3.6)
+            st.make_supercell(supercell)
+            species = [rng.choice(["Co", "Cr", "Ni"]) for _ in range(len(st))]
+            shells = _build_neighbor_shells(st, [2.6, 3.7])
+            engine = _IncrementalSRO(species, shells, pair_keys)
+            fractions = engine.composition_fractions
+            for _ in range(200):
+                i, j = rng.sample(range(len(species)), 2)
+                deltas = engine.swap_deltas(i, j)
+                trial = engine.sro(deltas)
+                species[i], species[j] = species[j], species[i]
+                self.assertEqual(trial, _compute_warren_cowley_sro(species, shells, pair_keys, fractions))
+                if rng.random() < 0.5:
+                    engine.apply_swap(i, j, deltas)
+                else:
+                    species[i], species[j] = species[j], species[i]
+            self.assertTrue(engine.verify(species))
+        engine.counts[0][0, 0] += 1
+        self.assertFalse(engine.verify(species))
+        self.assertTrue(engine.verify(species))
+
     def test_pick_swap_no_valid_names_and_same_species(self):
         self.assertIsNone(_pick_swap(["A"], {"all": [0]}, random.Random(1)))
         self.assertIsNone(_pick_swap(["A", "A"], {"all": [0, 1]}, random.Random(1), max_tries=3))
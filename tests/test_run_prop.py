@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.common_prop import run_pool_size, run_scheduled_jobs
+
+
+def _record(path, label):
+    with open(path, "a") as fp:
+        fp.write(label + "\n")
+
+
+def _fail(label):
+    raise ValueError(label)
+
+
+class TestRunScheduledJobs(unittest.TestCase):
+    def test_pool_size_is_bounded(self):
+        self.assertEqual(run_pool_size({"run_pool_size": 4}, 10), 4)
+        self.assertEqual(run_pool_size({"run_pool_size": 4}, 2), 2)
+        self.assertEqual(run_pool_size({"run_pool_size": -1}, 7), 7)
+        self.assertEqual(run_pool_size({}, 1), 1)
+        self.assertLessEqual(run_pool_size({}, 1000), os.cpu_count())
+        local = {"machine": {"batch_type": "Shell", "context_type": "LocalContext"}}
+        self.assertLessEqual(run_pool_size(local, 1000), os.cpu_count())
+        # remote and batch submissions are not capped by the local CPU count
+        remote = {"machine": {"batch_type": "Slurm", "context_type": "SSHContext"}}
+        self.assertEqual(run_pool_size(remote, 1000), 1000)
+        self.assertEqual(run_pool_size({"machine": {"batch_type": "Slurm", "context_type": "LocalContext"}}, 1000), 1000)
+        self.assertEqual(run_pool_size(dict(remote, run_pool_size=8), 1000), 8)
+
+    def test_jobs_run_longest_first(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            record = os.path.join(tmpdir, "record")
+            jobs = [
+                (1, "eos", _record, (record, "eos")),
+                (20, "finite_t_latt", _record, (record, "finite_t_latt")),
+                (5, "phonon", _record, (record, "phonon")),
+            ]
+            run_scheduled_jobs(jobs, 1)
+            with open(record) as fp:
+                self.assertEqual(fp.read().split(), ["finite_t_latt", "phonon", "eos"])
+
+    def test_failed_job_raises_after_others_finish(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            record = os.path.join(tmpdir, "record")
+            jobs = [
+                (3, "bad", _fail, ("bad",)),
+                (1, "good", _record, (record, "good")),
+            ]
+            with self.assertRaises(RuntimeError):
+                run_scheduled_jobs(jobs, 2)
+            self.assertTrue(os.path.isfile(record))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from pymatgen.core import Structure
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.lib import slab_cache
+from apex.core.lib.slab_cache import (
+    SlabCache,
+    get_all_slabs,
+    get_slabs,
+    slab_digest,
+    structure_digest,
+)
+
+GENERATOR_KWARGS = {
+    "center_slab": True,
+    "in_unit_planes": False,
+    "lll_reduce": True,
+    "reorient_lattice": False,
+    "primitive": False,
+}
+
+
+class TestSlabCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work = Path(self.tmpdir.name)
+        source = Path(__file__).resolve().parent / "equi" / "vasp" / "CONTCAR_Al_fcc"
+        self.structure = Structure.from_file(str(source)).to_conventional()
+        slab_cache._SLAB_MEMO.clear()
+
+    def tearDown(self):
+        slab_cache._SLAB_MEMO.clear()
+        self.tmpdir.cleanup()
+
+    def assertSameSlabs(self, slabs, other):
+        self.assertEqual(len(slabs), len(other))
+        for slab, ref in zip(slabs, other):
+            self.assertEqual(slab.miller_index, ref.miller_index)
+            self.assertEqual([str(ii) for ii in slab.species], [str(ii) for ii in ref.species])
+            np.testing.assert_allclose(slab.lattice.matrix, ref.lattice.matrix)
+            np.testing.assert_allclose(slab.frac_coords, ref.frac_coords)
+
+    def test_digest(self):
+        digest = slab_digest(self.structure, "get_slabs", {"miller_index": [1, 1, 1]})
+        self.assertEqual(digest, slab_digest(self.structure.copy(), "get_slabs", {"miller_index": [1, 1, 1]}))
+        self.assertNotEqual(digest, slab_digest(self.structure, "get_slabs", {"miller_index": [1, 1, 0]}))
+        strained = self.structure.copy()
+        strained.scale_lattice(self.structure.volume * 1.01)
+        self.assertNotEqual(structure_digest(self.structure), structure_digest(strained))
+
+    def test_slabs_reused_in_process(self):
+        slabs = get_slabs(self.structure, (1, 1, 1), 10, **GENERATOR_KWARGS)
+        self.assertTrue(slabs)
+        slabs[0].translate_sites([0], [0.1, 0, 0])
+        with mock.patch.object(slab_cache, "SlabGenerator", side_effect=AssertionError):
+            again = get_slabs(self.structure, (1, 1, 1), 10, **GENERATOR_KWARGS)
+        # the caller got a copy, the memo is untouched
+        self.assertFalse(np.allclose(again[0].frac_coords, slabs[0].frac_coords))
+        self.assertEqual(again[0].miller_index, (1, 1, 1))
+        # another slab size is another entry
+        self.assertGreater(len(get_slabs(self.structure, (1, 1, 1), 15, **GENERATOR_KWARGS)[0]), len(again[0]))
+
+    def test_slabs_restored_from_disk(self):
+        self.assertIsNone(SlabCache.from_parameter({}))
+        cache = SlabCache.from_parameter({"slab_cache_dir": str(self.work / "slab_cache")})
+        slabs = get_all_slabs(self.structure, 1, 10, 11, cache=cache)
+        self.assertEqual(len(list((self.work / "slab_cache").glob("*/*/slabs.json"))), 1)
+
+        slab_cache._SLAB_MEMO.clear()
+        with mock.patch.object(slab_cache, "generate_all_slabs", side_effect=AssertionError):
+            restored = get_all_slabs(self.structure, 1, 10, 11, cache=cache)
+        self.assertSameSlabs(restored, slabs)
+        self.assertTrue(all(isinstance(slab.miller_index, tuple) for slab in restored))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,9 @@ import unittest
 import tempfile
 import os
 import json
+import tarfile
+
+from apex.core.lib import model_store
 
 from apex.submit import (
     validate_submit_paths,
@@ -249,6 +252,52 @@ class TestSubmitPathValidation(unittest.TestCase):
                 self.assertEqual(fp.read(), "raw-poscar\n")
             self.assertEqual(prop_param["pre_relaxed_structures"], ["confs/std-001"])
 
+    def test_pack_uploads_model_bytes_once(self):
+        model_bytes = b"frozen-model-" * 1000
+        with tempfile.TemporaryDirectory() as work_dir, \
+                tempfile.TemporaryDirectory() as upload_dir, \
+                tempfile.TemporaryDirectory() as tar_dir:
+            model = os.path.join(work_dir, "frozen_model.pb")
+            with open(model, "wb") as fp:
+                fp.write(model_bytes)
+            stored = model_store.store_model(model, model_store.model_store_root(model))
+            for ii in range(3):
+                conf_dir = os.path.join(work_dir, "confs", "std-%03d" % ii)
+                task_dir = os.path.join(conf_dir, "relaxation", "relax_task")
+                os.makedirs(task_dir)
+                with open(os.path.join(conf_dir, "POSCAR"), "w", encoding="utf-8") as fp:
+                    fp.write("poscar\n")
+                model_store.link_model(stored, os.path.join(conf_dir, "frozen_model.pb"))
+                model_store.link_model(stored, os.path.join(task_dir, "frozen_model.pb"),
+                                       "hardlink" if ii == 2 else "symlink")
+            prop_param = {
+                "structures": ["confs/std-*"],
+                "interaction": {"type": "deepmd", "model": "frozen_model.pb"},
+                "properties": [{"type": "eos"}],
+            }
+            pack_upload_dir(
+                work_dir=work_dir,
+                upload_dir=upload_dir,
+                relax_param=None,
+                prop_param=prop_param,
+                flow_type="props",
+                exclude_upload_files=[],
+            )
+
+            # the way dflow's upload_artifact archives a directory
+            os.symlink(upload_dir, os.path.join(tar_dir, "upload"))
+            tgz = os.path.join(tar_dir, "upload.tgz")
+            with tarfile.open(tgz, "w:gz", dereference=True) as tf:
+                tf.add(os.path.join(tar_dir, "upload"), arcname="upload")
+            with tarfile.open(tgz, "r:gz") as tf:
+                copies = [member.name for member in tf.getmembers()
+                          if member.isfile() and tf.extractfile(member).read() == model_bytes]
+            self.assertEqual(copies, ["upload/frozen_model.pb"])
+
+            staged_task = os.path.join(upload_dir, "confs", "std-002", "relaxation", "relax_task")
+            with open(os.path.join(staged_task, model_store.MODEL_LINKS_FILE)) as fp:
+                self.assertEqual(json.load(fp), {"frozen_model.pb": os.path.relpath(stored, os.path.dirname(os.path.dirname(stored)))})
+
     def test_pack_joint_requires_poscar_when_relaxation_req_calc_false(self):
         with tempfile.TemporaryDirectory() as work_dir, \
                 tempfile.TemporaryDirectory() as upload_dir:
@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from dflow.python import OPIO
+from monty.serialization import dumpfn, loadfn
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+__package__ = "tests"
+
+from apex.core.lib.task_cache import (
+    TASK_CACHE_ENV,
+    TaskCache,
+    restore_cached_tasks,
+    store_finished_tasks,
+    task_digest,
+)
+from apex.op.RunLAMMPS import RunLAMMPS
+
+INPUT_FILES = ["conf.lmp", "in.lammps", "frozen_model.pb"]
+OUTPUT_FILES = ["log.lammps", "outlog", "dump.relax"]
+
+
+class TestTaskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work = Path(self.tmpdir.name)
+        (self.work / "frozen_model.pb").write_bytes(b"\x00\xffmodel")
+        (self.work / "in.lammps").write_text("run 0\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _make_task(self, name, conf="Al 0 0 0\n"):
+        task_dir = self.work / name
+        task_dir.mkdir()
+        (task_dir / "conf.lmp").write_text(conf)
+        os.symlink("../in.lammps", task_dir / "in.lammps")
+        return task_dir
+
+    def _finish(self, task_dir):
+        (task_dir / "log.lammps").write_text("Step\nTotal wall time: 0:00:01\n")
+        (task_dir / "dump.relax").write_text("ITEM: TIMESTEP\n0\n")
+
+    def test_digest_depends_on_contents_only(self):
+        task_a = self._make_task("task.000000")
+        task_b = self._make_task("task.000001", conf="Al 0 0 0   \r\n\n")
+        task_c = self._make_task("task.000002", conf="Al 0 0 0.1\n")
+        digest = task_digest(task_a, INPUT_FILES, "deepmd", "lmp -i in.lammps")
+        self.assertEqual(digest, task_digest(task_b, INPUT_FILES, "deepmd", "lmp -i in.lammps"))
+        self.assertNotEqual(digest, task_digest(task_c, INPUT_FILES, "deepmd", "lmp -i in.lammps"))
+        self.assertNotEqual(digest, task_digest(task_a, INPUT_FILES, "deepmd", "lmp -k on -i in.lammps"))
+
+    def test_finished_tasks_are_stored_and_restored(self):
+        cache = TaskCache(str(self.work / "cache"))
+        task_a = self._make_task("task.000000")
+        task_b = self._make_task("task.000001")
+        run_task, digests = restore_cached_tasks(cache, [str(task_a), str(task_b)], INPUT_FILES, "deepmd", "lmp")
+        self.assertEqual(run_task, [str(task_a), str(task_b)])
+        self._finish(task_a)
+        store_finished_tasks(cache, digests, OUTPUT_FILES, "deepmd")
+        self.assertTrue(cache.contains(digests[str(task_a)]))
+
+        task_c = self._make_task("task.000002")
+        run_task, _ = restore_cached_tasks(cache, [str(task_c)], INPUT_FILES, "deepmd", "lmp")
+        self.assertEqual(run_task, [])
+        self.assertEqual((task_c / "log.lammps").read_text(), (task_a / "log.lammps").read_text())
+        self.assertTrue((task_c / "dump.relax").is_file())
+
+    def test_run_lammps_reuses_mounted_cache(self):
+        for name in ["task.000000", "task.000001"]:
+            task_dir = self._make_task(name)
+            dumpfn({"type": "deepmd", "model": "frozen_model.pb", "type_map": {"Al": 0}},
+                   task_dir / "inter.json")
+            dumpfn({"type": "eos"}, task_dir / "task.json")
+        cmd = "echo 'Total wall time: 0:00:01' > log.lammps"
+        with mock.patch.dict(os.environ, {TASK_CACHE_ENV: str(self.work / "cache")}):
+            RunLAMMPS().execute(OPIO({"input_lammps": self.work / "task.000000", "run_command": cmd}))
+            RunLAMMPS().execute(OPIO({"input_lammps": self.work / "task.000001", "run_command": cmd}))
+        status = loadfn(self.work / "task.000001" / "apex_task_status.json")
+        self.assertEqual(status["state"], "succeeded")
+        self.assertEqual(status["run_command"], "<task cache>")
+        self.assertIn("Total wall time", (self.work / "task.000001" / "log.lammps").read_text())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,11 +5,13 @@ import sys
 import unittest
 
 import numpy as np
+from monty.serialization import loadfn
 from pymatgen.analysis.defects.core import Vacancy as pmg_Vacancy
 from pymatgen.core import Structure
 from pymatgen.io.vasp import Incar
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
+from apex.core.lib.defect_sites import DEFECT_SITE_FILE
 from apex.core.property.Vacancy import Vacancy
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -90,3 +92,18 @@ class TestVacancy(unittest.TestCase):
             st0_coords = [format(st0.sites[ii].coords[jj], '.4f') for jj in range(3)]
             st1_coords = [format(st1.sites[ii].coords[jj], '.4f') for jj in range(3)]
         self.assertEqual(st0_coords, st1_coords)
+
+    def test_make_confs_site_grouping(self):
+        shutil.copy(
+            os.path.join(self.source_path, "CONTCAR"),
+            os.path.join(self.equi_path, "CONTCAR"),
+        )
+        vacancy = Vacancy({"type": "vacancy", "supercell": [1, 1, 1], "site_grouping": True})
+        task_list = vacancy.make_confs(self.target_path, self.equi_path)
+        self.assertLessEqual(len(task_list), 5)
+        natoms = len(Structure.from_file(os.path.join(self.equi_path, "CONTCAR")))
+        records = [loadfn(os.path.join(ii, DEFECT_SITE_FILE)) for ii in task_list]
+        # every site of the cell is represented by exactly one task
+        self.assertEqual(sum(ii["multiplicity"] for ii in records), natoms)
+        for ii in task_list:
+            self.assertEqual(len(Structure.from_file(os.path.join(ii, "POSCAR"))), natoms - 1)